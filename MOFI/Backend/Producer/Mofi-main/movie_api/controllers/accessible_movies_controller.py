@@ -1,9 +1,76 @@
 from fastapi import APIRouter, HTTPException
 from movie_api.db.mongo import db, crew_collection
+from mofi_common.crew import memberships_to_dict
+from movie_api.utils.crew import CREATOR_PERMISSIONS
 from typing import List, Dict, Any
 
 router = APIRouter(prefix="/accessible/Movie", tags=["crew Accessible Movies"])
 
+# Only the fields the dashboard needs are pulled from movies_collection
+MOVIE_PROJECTION = {
+    "_id": 0,
+    "movie_id": 1,
+    "user_id": 1,
+    "title": 1,
+    "description": 1,
+    "image1": 1,
+    "image2": 1,
+    "directors": 1,
+    "writers": 1,
+    "genres": 1,
+    "release_date": 1,
+    "duration": 1,
+    "type": 1,
+    "imdbID": 1
+}
+
+
+def format_movie(movie: Dict[str, Any]) -> Dict[str, Any]:
+    """Format a movie document for the frontend"""
+    return {
+        "movie_id": movie.get("movie_id"),
+        "title": movie.get("title"),
+        "description": movie.get("description"),
+        "image1": movie.get("image1"),
+        "image2": movie.get("image2"),
+        "directors": movie.get("directors", []),
+        "writers": movie.get("writers", []),
+        "genres": movie.get("genres", []),
+        "release_date": movie.get("release_date"),
+        "duration": movie.get("duration"),
+        "type": movie.get("type"),
+        "imdbID": movie.get("imdbID")
+    }
+
+
+async def get_crew_movies_map(linkedin_id: str) -> Dict[str, Dict[str, Any]]:
+    """Return {movie_id: movie_data} for every movie the user is on in crew_collection"""
+    crew_member = await crew_collection.find_one(
+        {"linkedin_id": linkedin_id},
+        {"_id": 0, "movies": 1, "memberships": 1}
+    )
+    if not crew_member:
+        return {}
+    return memberships_to_dict(crew_member)
+
+
+async def find_movies(movie_ids: List[str], creator_id: str = None) -> List[Dict[str, Any]]:
+    """
+    Fetch every movie in movie_ids (and, optionally, every movie whose user_id
+    is creator_id) with a single query instead of one find_one per movie.
+    """
+    conditions = []
+    if movie_ids:
+        conditions.append({"movie_id": {"$in": movie_ids}})
+    if creator_id:
+        conditions.append({"user_id": creator_id})
+    if not conditions:
+        return []
+
+    query = conditions[0] if len(conditions) == 1 else {"$or": conditions}
+    return await db.movies.find(query, MOVIE_PROJECTION).to_list(length=None)
+
+
 @router.get("/{linkedin_id}/accessible-movies", response_model=Dict[str, Any])
 async def get_accessible_movies(linkedin_id: str):
     """
@@ -14,86 +81,56 @@ async def get_accessible_movies(linkedin_id: str):
     """
     try:
         accessible_movies = []
-        
-        # 1. Check crew_collection first (primary source for permissions)
-        crew_member = await crew_collection.find_one({"linkedin_id": linkedin_id})
-        
-        if crew_member:
-            for movie_id, movie_data in crew_member.get("movies", {}).items():
-                # Get full movie details from movies_collection
-                movie = await db.movies.find_one({"movie_id": movie_id})
-                
-                if movie:
-                    # Determine access type based on contribution
-                    is_creator = movie_data.get("contribution") == "Creator"
-                    access_type = "creator" if is_creator else "crew_member"
-                    
-                    # Format movie for frontend
-                    formatted_movie = {
-                        "movie_id": movie.get("movie_id"),
-                        "title": movie.get("title"),
-                        "description": movie.get("description"),
-                        "image1": movie.get("image1"),
-                        "image2": movie.get("image2"),
-                        "directors": movie.get("directors", []),
-                        "writers": movie.get("writers", []),
-                        "genres": movie.get("genres", []),
-                        "release_date": movie.get("release_date"),
-                        "duration": movie.get("duration"),
-                        "type": movie.get("type"),
-                        "imdbID": movie.get("imdbID"),
-                        "access_type": access_type,
-                        "contribution": movie_data.get("contribution", ""),
-                        "permissions": movie_data.get("permissions", {}),
-                        "is_creator": is_creator
-                    }
-                    accessible_movies.append(formatted_movie)
-        
-        # 2. For backward compatibility: Check movies_collection
-        # (For movies created before crew collection was implemented)
-        created_movies_cursor = db.movies.find({"user_id": linkedin_id})
-        created_movies = await created_movies_cursor.to_list(length=None)
-        
-        for movie in created_movies:
-            # Check if already added from crew_collection
-            if not any(m["movie_id"] == movie["movie_id"] for m in accessible_movies):
-                formatted_movie = {
-                    "movie_id": movie.get("movie_id"),
-                    "title": movie.get("title"),
-                    "description": movie.get("description"),
-                    "image1": movie.get("image1"),
-                    "image2": movie.get("image2"),
-                    "directors": movie.get("directors", []),
-                    "writers": movie.get("writers", []),
-                    "genres": movie.get("genres", []),
-                    "release_date": movie.get("release_date"),
-                    "duration": movie.get("duration"),
-                    "type": movie.get("type"),
-                    "imdbID": movie.get("imdbID"),
-                    "access_type": "creator",
-                    "contribution": "Creator",
-                    "permissions": {
-                        "video": True,
-                        "image": True,
-                        "live": True,
-                        "scripts": True,
-                        "crew": True
-                    },
-                    "is_creator": True
-                }
-                accessible_movies.append(formatted_movie)
-        
+
+        # 1. crew_collection is the primary source for permissions
+        crew_movies = await get_crew_movies_map(linkedin_id)
+
+        # 2. Load crew movies and legacy created movies in one round trip
+        movies = await find_movies(list(crew_movies.keys()), creator_id=linkedin_id)
+        movies_by_id = {movie["movie_id"]: movie for movie in movies}
+
+        for movie_id, movie_data in crew_movies.items():
+            movie = movies_by_id.get(movie_id)
+            if not movie:
+                continue
+
+            # Determine access type based on contribution
+            is_creator = movie_data.get("contribution") == "Creator"
+            formatted_movie = format_movie(movie)
+            formatted_movie.update({
+                "access_type": "creator" if is_creator else "crew_member",
+                "contribution": movie_data.get("contribution", ""),
+                "permissions": movie_data.get("permissions", {}),
+                "is_creator": is_creator
+            })
+            accessible_movies.append(formatted_movie)
+
+        # 3. For backward compatibility: movies created before crew collection
+        # was implemented (skip any already added from crew_collection)
+        for movie in movies:
+            if movie.get("user_id") != linkedin_id or movie["movie_id"] in crew_movies:
+                continue
+
+            formatted_movie = format_movie(movie)
+            formatted_movie.update({
+                "access_type": "creator",
+                "contribution": "Creator",
+                "permissions": dict(CREATOR_PERMISSIONS),
+                "is_creator": True
+            })
+            accessible_movies.append(formatted_movie)
+
         # Count movies by access type
-        created_count = len([m for m in accessible_movies if m["access_type"] == "creator"])
-        crew_member_count = len([m for m in accessible_movies if m["access_type"] == "crew_member"])
-        
+        created_count = sum(1 for m in accessible_movies if m["access_type"] == "creator")
+        crew_member_count = len(accessible_movies) - created_count
+
         return {
             "accessible_movies": accessible_movies,
             "created_count": created_count,
             "crew_member_count": crew_member_count,
             "total_count": len(accessible_movies)
         }
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch accessible movies: {str(e)}")
 
@@ -103,14 +140,19 @@ async def get_movie_permissions(linkedin_id: str, movie_id: str):
     Get specific permissions for a user on a particular movie
     """
     try:
-        # First check crew_collection (covers both creators and crew members)
-        crew_member = await crew_collection.find_one({
-            "linkedin_id": linkedin_id,
-            f"movies.{movie_id}": {"$exists": True}
-        })
+        # First check crew_collection (covers both creators and crew members);
+        # only this movie's membership (or legacy movies.<id> key) is projected
+        crew_member = await crew_collection.find_one(
+            {"linkedin_id": linkedin_id},
+            {
+                "_id": 0,
+                "memberships": {"$elemMatch": {"movie_id": movie_id}},
+                f"movies.{movie_id}": 1
+            }
+        )
+        movie_data = memberships_to_dict(crew_member).get(movie_id) if crew_member else None
         
-        if crew_member:
-            movie_data = crew_member["movies"][movie_id]
+        if movie_data is not None:
             movie = await db.movies.find_one({"movie_id": movie_id})
             
             is_creator = movie_data.get("contribution") == "Creator"
@@ -133,13 +175,7 @@ async def get_movie_permissions(linkedin_id: str, movie_id: str):
             return {
                 "has_access": True,
                 "access_type": "creator",
-                "permissions": {
-                    "video": True,
-                    "image": True,
-                    "live": True,
-                    "scripts": True,
-                    "crew": True
-                },
+                "permissions": dict(CREATOR_PERMISSIONS),
                 "contribution": "Creator",
                 "movie_details": {
                     "title": movie.get("title"),
@@ -164,56 +200,32 @@ async def get_created_movies(linkedin_id: str):
     Get only movies created by this user
     """
     try:
+        crew_movies = await get_crew_movies_map(linkedin_id)
+        creator_ids = [
+            movie_id for movie_id, movie_data in crew_movies.items()
+            if movie_data.get("contribution") == "Creator"
+        ]
+
+        # Crew collection creators plus legacy movies_collection creators, one query
+        movies = await find_movies(creator_ids, creator_id=linkedin_id)
+        movies_by_id = {movie["movie_id"]: movie for movie in movies}
+
         created_movies = []
-        
-        # Check crew_collection first
-        crew_member = await crew_collection.find_one({"linkedin_id": linkedin_id})
-        
-        if crew_member:
-            for movie_id, movie_data in crew_member.get("movies", {}).items():
-                if movie_data.get("contribution") == "Creator":
-                    movie = await db.movies.find_one({"movie_id": movie_id})
-                    if movie:
-                        created_movies.append({
-                            "movie_id": movie.get("movie_id"),
-                            "title": movie.get("title"),
-                            "description": movie.get("description"),
-                            "image1": movie.get("image1"),
-                            "image2": movie.get("image2"),
-                            "directors": movie.get("directors", []),
-                            "writers": movie.get("writers", []),
-                            "genres": movie.get("genres", []),
-                            "release_date": movie.get("release_date"),
-                            "duration": movie.get("duration"),
-                            "type": movie.get("type"),
-                            "imdbID": movie.get("imdbID"),
-                            "access_type": "creator"
-                        })
-        
-        # Also check movies_collection for backward compatibility
-        movies_cursor = db.movies.find({"user_id": linkedin_id})
-        movies = await movies_cursor.to_list(length=None)
-        
-        for movie in movies:
-            if not any(m["movie_id"] == movie["movie_id"] for m in created_movies):
-                created_movies.append({
-                    "movie_id": movie.get("movie_id"),
-                    "title": movie.get("title"),
-                    "description": movie.get("description"),
-                    "image1": movie.get("image1"),
-                    "image2": movie.get("image2"),
-                    "directors": movie.get("directors", []),
-                    "writers": movie.get("writers", []),
-                    "genres": movie.get("genres", []),
-                    "release_date": movie.get("release_date"),
-                    "duration": movie.get("duration"),
-                    "type": movie.get("type"),
-                    "imdbID": movie.get("imdbID"),
-                    "access_type": "creator"
-                })
-        
+        seen = set()
+        ordered = [movies_by_id[movie_id] for movie_id in creator_ids if movie_id in movies_by_id]
+        ordered += [movie for movie in movies if movie.get("user_id") == linkedin_id]
+
+        for movie in ordered:
+            if movie["movie_id"] in seen:
+                continue
+            seen.add(movie["movie_id"])
+
+            formatted_movie = format_movie(movie)
+            formatted_movie["access_type"] = "creator"
+            created_movies.append(formatted_movie)
+
         return created_movies
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch created movies: {str(e)}")
 
@@ -223,29 +235,37 @@ async def get_crew_movies(linkedin_id: str):
     Get movies where user is a crew member (not creator)
     """
     try:
-        crew_member = await crew_collection.find_one({"linkedin_id": linkedin_id})
-        if not crew_member:
+        crew_movies = await get_crew_movies_map(linkedin_id)
+
+        # Only non-creator roles
+        crew_roles = {
+            movie_id: movie_data for movie_id, movie_data in crew_movies.items()
+            if movie_data.get("contribution") != "Creator"
+        }
+        if not crew_roles:
             return []
-        
+
+        movies = await find_movies(list(crew_roles.keys()))
+        movies_by_id = {movie["movie_id"]: movie for movie in movies}
+
         result = []
-        for movie_id, movie_data in crew_member.get("movies", {}).items():
-            if movie_data.get("contribution") != "Creator":  # Only non-creator roles
-                movie = await db.movies.find_one({"movie_id": movie_id})
-                if movie:
-                    result.append({
-                        "movie_id": movie.get("movie_id"),
-                        "title": movie.get("title"),
-                        "description": movie.get("description"),
-                        "image1": movie.get("image1"),
-                        "image2": movie.get("image2"),
-                        "directors": movie.get("directors", []),
-                        "genres": movie.get("genres", []),
-                        "contribution": movie_data.get("contribution", ""),
-                        "permissions": movie_data.get("permissions", {}),
-                        "access_type": "crew_member"
-                    })
-        
+        for movie_id, movie_data in crew_roles.items():
+            movie = movies_by_id.get(movie_id)
+            if movie:
+                result.append({
+                    "movie_id": movie.get("movie_id"),
+                    "title": movie.get("title"),
+                    "description": movie.get("description"),
+                    "image1": movie.get("image1"),
+                    "image2": movie.get("image2"),
+                    "directors": movie.get("directors", []),
+                    "genres": movie.get("genres", []),
+                    "contribution": movie_data.get("contribution", ""),
+                    "permissions": movie_data.get("permissions", {}),
+                    "access_type": "crew_member"
+                })
+
         return result
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch crew movies: {str(e)}")
\ No newline at end of file
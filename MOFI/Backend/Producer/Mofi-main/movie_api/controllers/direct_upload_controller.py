@@ -0,0 +1,92 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Form, HTTPException, Request
+
+from movie_api.schemas import DirectUploadFinalize
+from movie_api.services.direct_upload_service import DirectUploadService, DirectUploadError
+
+router = APIRouter(prefix="/direct-uploads", tags=["direct-uploads"])
+
+
+@router.post("/movie_image", response_model=dict)
+async def issue_movie_image_upload(
+    movie_id: str = Form(...),
+    title: str = Form(...),
+    people: str = Form(...),
+    description: Optional[str] = Form(None)
+):
+    """
+    Get signed parameters to upload a movie image straight to Cloudinary.
+    - POST the file with uploads.image.params to uploads.image.upload_url
+    - Then POST the Cloudinary response to /direct-uploads/{upload_id}/finalize
+    """
+    try:
+        upload = await DirectUploadService.issue("movie_image", movie_id, {
+            "title": title,
+            "people": people,
+            "description": description,
+        })
+    except DirectUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return {"message": "Upload parameters issued", "upload": upload}
+
+
+@router.post("/trailer", response_model=dict)
+async def issue_trailer_upload(
+    movie_id: str = Form(...),
+    trailer_name: str = Form(...)
+):
+    """
+    Get signed parameters to upload a trailer's thumbnail and video straight
+    to Cloudinary, then finalize with both responses.
+    """
+    try:
+        upload = await DirectUploadService.issue("trailer", movie_id, {"trailer_name": trailer_name})
+    except DirectUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return {"message": "Upload parameters issued", "upload": upload}
+
+
+@router.post("/notify", response_model=dict)
+async def upload_notification(request: Request):
+    """Cloudinary upload notifications (notification_url of issued uploads)"""
+    body = (await request.body()).decode("utf-8")
+    try:
+        handled = await DirectUploadService.notify(
+            body,
+            request.headers.get("x-cld-timestamp"),
+            request.headers.get("x-cld-signature"),
+            json.loads(body)
+        )
+    except DirectUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid notification body")
+    return {"handled": handled}
+
+
+@router.post("/{upload_id}/finalize", response_model=dict)
+async def finalize_upload(upload_id: str, data: DirectUploadFinalize):
+    """
+    Record a direct upload from the Cloudinary upload responses
+    ({"assets": {"image": {"public_id", "version", "signature"}}}).
+    Files can be finalized one at a time; the movie image or trailer is
+    created when the last one is in.
+    """
+    try:
+        upload = await DirectUploadService.finalize(
+            upload_id,
+            {name: asset.dict() for name, asset in data.assets.items()}
+        )
+    except DirectUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return {"message": f"Upload {upload['status']}", "upload": upload}
+
+
+@router.get("/{upload_id}", response_model=dict)
+async def get_upload(upload_id: str):
+    upload = await DirectUploadService.get_upload(upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
@@ -1,7 +1,9 @@
 # controllers/movie_controller.py
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from movie_api.services.movie_service import MovieService
-from movie_api.utils.cloudinary import upload_image
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Query
+from movie_api.services.movie_service import MovieService, movie_variants, full_movie_variants
+from movie_api.services.media_hash_service import MediaHashService, image_details
+from mofi_common.images import validate_image_upload
+from movie_api.utils.variants import variant_width
 from movie_api.schemas import MovieCreate, MovieUpdate
 from typing import List, Optional
 from datetime import datetime
@@ -29,42 +31,64 @@ async def create_movie(
     - Automatically adds creator to crew collection with full permissions
     """
     try:
-        # Upload images to Cloudinary
-        img1_url = upload_image(image1, "movie_db/movies")
-        img2_url = upload_image(image2, "movie_db/movies")
-
-        # Create MovieCreate object
-        movie_data = MovieCreate(
-            user_id=user_id,
-            imdbID=imdbID,
-            type=type,
-            title=title,
-            description=description,
-            directors=directors.split(","), 
-            writers=writers.split(","),
-            genres=genres.split(","),
-            release_date=release_date,
-            duration=duration,
-            image1=img1_url,
-            image2=img2_url
-        )
-
-        # Create movie (this will also add creator to crew collection)
-        movie = await MovieService.create_movie(movie_data)
+        validate_image_upload(image1)
+        validate_image_upload(image2)
+        # Checked before uploading so a duplicate costs no upload or reference
+        if await MovieService.imdb_id_exists(imdbID):
+            raise Exception("Movie with this IMDb ID already exists")
+
+        # Re-encode and upload both images concurrently, reusing stored copies of identical files
+        poster1, poster2 = await MediaHashService.upload_images([image1, image2], "movie_db/movies")
+        img1_url, img2_url = poster1["url"], poster2["url"]
+
+        try:
+            # Create MovieCreate object
+            movie_data = MovieCreate(
+                user_id=user_id,
+                imdbID=imdbID,
+                type=type,
+                title=title,
+                description=description,
+                directors=directors.split(","), 
+                writers=writers.split(","),
+                genres=genres.split(","),
+                release_date=release_date,
+                duration=duration,
+                image1=img1_url,
+                image2=img2_url,
+                image_details={"image1": image_details(poster1), "image2": image_details(poster2)}
+            )
+
+            # Create movie (this will also add creator to crew collection)
+            movie = await MovieService.create_movie(movie_data)
+        except Exception:
+            # Nothing references the posters; give back their references
+            await MediaHashService.release_many([img1_url, img2_url])
+            raise
         return {"message": "Movie created successfully", "movie": movie}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/user/getallmovies", response_model=list)
-async def get_all_movies():
-    return await MovieService.get_all_movies()
+async def get_all_movies(
+    variant: Optional[str] = Query(None, description="original, thumb, card, medium or large"),
+    srcset: bool = Query(False)
+):
+    width = variant_width(variant)
+    movies = await MovieService.get_all_movies()
+    return [movie_variants(movie, width, srcset) for movie in movies]
 
 @router.get("/movie_details/{movie_id}", response_model=dict)
-async def get_movie(movie_id: str):
+async def get_movie(
+    movie_id: str,
+    variant: Optional[str] = Query(None),
+    srcset: bool = Query(False)
+):
+    width = variant_width(variant)
     movie = await MovieService.get_movie(movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return movie
+    return movie_variants(movie, width, srcset)
 
 @router.put("update/{movie_id}", response_model=dict)
 async def update_movie(
@@ -91,11 +115,33 @@ async def update_movie(
     if duration: update_data.duration = duration
     if user_id: update_data.user_id = user_id
 
+    try:
+        for image in (image1, image2):
+            if image:
+                validate_image_upload(image)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not await MovieService.movie_exists(movie_id):
+        raise HTTPException(status_code=404, detail="Movie not found")
+
+    uploaded = await MediaHashService.upload_images(
+        [image for image in (image1, image2) if image], "movie_db/movies"
+    )
+    posters = iter(uploaded)
+    details = {}
     if image1:
-        update_data.image1 = await upload_image(image1, "movie_db/movies")
+        poster = next(posters)
+        update_data.image1 = poster["url"]
+        details["image1"] = image_details(poster)
     if image2:
-        update_data.image2 = await upload_image(image2, "movie_db/movies")
+        poster = next(posters)
+        update_data.image2 = poster["url"]
+        details["image2"] = image_details(poster)
+    if details:
+        update_data.image_details = details
 
+    # Releases the new posters itself if they do not end up on the movie
     updated = await MovieService.update_movie(movie_id, update_data)
 
     if not updated:
@@ -104,22 +150,38 @@ async def update_movie(
     return {"message": "Movie updated successfully", "movie": updated}
 
 @router.delete("/delete/{movie_id}", response_model=dict)
-async def delete_movie(movie_id: str):
-    deleted = await MovieService.delete_movie(movie_id)
-    if not deleted:
+async def delete_movie(movie_id: str, background_tasks: BackgroundTasks):
+    media_urls = await MovieService.delete_movie(movie_id)
+    if media_urls is None:
         raise HTTPException(status_code=404, detail="Movie not found")
+
+    # Metadata is gone; storage cleanup runs after the response is sent
+    if media_urls:
+        background_tasks.add_task(MediaHashService.release_many, media_urls)
+
     return {"message": "Movie deleted successfully"}
 
 @router.get("/getmoviebyuserId/{user_id}", response_model=list)
-async def get_movies_by_user(user_id: str):
-    return await MovieService.get_movies_by_user(user_id)
+async def get_movies_by_user(
+    user_id: str,
+    variant: Optional[str] = Query(None),
+    srcset: bool = Query(False)
+):
+    width = variant_width(variant)
+    movies = await MovieService.get_movies_by_user(user_id)
+    return [movie_variants(movie, width, srcset) for movie in movies]
 
 
 @router.get("/getfull_movie/{movie_id}/full", response_model=dict)
-async def get_full_movie(movie_id: str):
+async def get_full_movie(
+    movie_id: str,
+    variant: Optional[str] = Query(None),
+    srcset: bool = Query(False)
+):
+    width = variant_width(variant)
     data = await MovieService.get_full_movie_details(movie_id)
 
     if not data:
         raise HTTPException(status_code=404, detail="Movie not found")
 
-    return data
\ No newline at end of file
+    return full_movie_variants(data, width, srcset)
\ No newline at end of file
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import Optional
-from movie_api.services.movie_image_service import MovieImageService
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+from typing import List, Optional
+import json
+from movie_api.services.movie_image_service import MovieImageService, image_variants, IMAGE_BATCH_MAX_FILES
+from movie_api.utils.variants import variant_width
+from mofi_common.images import validate_image_upload
 
 router = APIRouter(prefix="/movie-images", tags=["movie-images"])
 
@@ -20,26 +23,14 @@ async def upload_movie_image(
     - title: Title of the image
     - people: Comma-separated list of people in the image
     - description: Optional description of the image
-    - image: The image file (PNG, JPG, GIF up to 10MB)
+    - image: The image file (PNG, JPG, GIF, WEBP up to 10MB)
     """
-    # Validate file type
-    allowed_types = ['image/png', 'image/jpeg', 'image/jpg', 'image/gif']
-    if image.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=400, 
-            detail="Invalid file type. Only PNG, JPG, GIF are allowed"
-        )
-    
-    # Validate file size (10MB)
-    image.file.seek(0, 2)  # Seek to end
-    file_size = image.file.tell()
-    image.file.seek(0)  # Reset to beginning
-    
-    if file_size > 10 * 1024 * 1024:  # 10MB
-        raise HTTPException(
-            status_code=400, 
-            detail="File too large. Maximum size is 10MB"
-        )
+    # Validate file type (by content) and size; UploadLimitMiddleware already
+    # rejected oversized or mistyped bodies while they were arriving
+    try:
+        validate_image_upload(image)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Upload image
     image_data = await MovieImageService.upload_movie_image(
@@ -55,13 +46,70 @@ async def upload_movie_image(
         "image": image_data
     }
 
+@router.post("/create/movie_images", response_model=dict)
+async def upload_movie_images(
+    movie_id: str = Form(...),
+    metadata: str = Form(...),
+    images: List[UploadFile] = File(...)
+):
+    """
+    Upload several images for one movie in a single request.
+
+    Parameters:
+    - movie_id: ID of the movie the images belong to
+    - metadata: JSON array with one {"title", "people", "description"} object
+      per file, in the same order as the files
+    - images: The image files (PNG, JPG, GIF, WEBP up to 10MB each)
+
+    Each file gets its own result; one bad file does not fail the batch.
+    """
+    if len(images) > IMAGE_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files. Maximum is {IMAGE_BATCH_MAX_FILES} per request"
+        )
+
+    try:
+        entries = json.loads(metadata)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="metadata must be a JSON array")
+
+    if not isinstance(entries, list) or len(entries) != len(images):
+        raise HTTPException(
+            status_code=400,
+            detail="metadata must be a JSON array with one entry per file"
+        )
+
+    items = []
+    for index, (image, entry) in enumerate(zip(images, entries)):
+        if not isinstance(entry, dict) or not str(entry.get("title") or "").strip():
+            raise HTTPException(status_code=400, detail=f"metadata[{index}] needs a title")
+        items.append({
+            "file": image,
+            "title": str(entry["title"]),
+            "people": str(entry.get("people") or ""),
+            "description": entry.get("description")
+        })
+
+    result = await MovieImageService.upload_movie_images(movie_id, items)
+
+    return {
+        "message": f"Uploaded {result['uploaded']} of {len(items)} movie images",
+        **result
+    }
+
 @router.get("/movie/image/{movie_id}", response_model=dict)
-async def get_all_movie_images(movie_id: str):
+async def get_all_movie_images(
+    movie_id: str,
+    variant: Optional[str] = Query(None),
+    srcset: bool = Query(False)
+):
     """Get all images for a specific movie"""
+    width = variant_width(variant)
     images = await MovieImageService.get_movie_images(movie_id)
     return {
         "movie_id": movie_id,
-        "images": images,
+        "images": [image_variants(image, width, srcset) for image in images],
         "count": len(images)
     }
 
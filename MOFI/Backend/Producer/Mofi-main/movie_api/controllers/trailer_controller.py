@@ -1,8 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Query
 from typing import Optional, List
+import asyncio
 from movie_api.services.trailer_service import TrailerService
+from movie_api.services.trailer_job_service import TrailerJobService
 from movie_api.utils.cloudinary import upload_image, upload_video
 from movie_api.schemas import TrailerCreate, TrailerUpdate, Trailer
+from movie_api.utils.variants import variant_width
 
 router = APIRouter()
 
@@ -14,9 +17,11 @@ async def create_trailer(
     thumbnail: UploadFile = File(...),
     video: UploadFile = File(...)
 ):
-    # Upload thumbnail + video
-    thumbnail_url = upload_image(thumbnail, "movie_db/trailers")
-    video_url = upload_video(video, "movie_db/trailers")
+    # Upload thumbnail + video concurrently
+    thumbnail_url, video_url = await asyncio.gather(
+        upload_image(thumbnail, "movie_db/trailers"),
+        upload_video(video, "movie_db/trailers")
+    )
 
     # Create Pydantic model
     trailer_data = TrailerCreate(
@@ -32,6 +37,32 @@ async def create_trailer(
     return {"message": "Trailer created successfully", "trailer": trailer}
 
 
+@router.post("/jobs", response_model=dict, status_code=202)
+async def create_trailer_job(
+    background_tasks: BackgroundTasks,
+    movie_id: str = Form(...),
+    trailer_name: str = Form(...),
+    thumbnail: UploadFile = File(...),
+    video: UploadFile = File(...)
+):
+    """
+    Accept a trailer for background upload
+    - Files are saved locally and the request returns immediately
+    - Poll GET /trailers/jobs/{job_id} for progress and the created trailer
+    """
+    job = await TrailerJobService.submit(movie_id, trailer_name, thumbnail, video)
+    background_tasks.add_task(TrailerJobService.run, job["job_id"])
+    return {"message": "Trailer upload queued", "job": job}
+
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def get_trailer_job(job_id: str):
+    job = await TrailerJobService.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trailer job not found")
+    return job
+
+
 @router.get("/{trailer_id}", response_model=Trailer)
 async def get_one(trailer_id: str):
     trailer = await TrailerService.get_trailer_by_id(trailer_id)
@@ -40,9 +71,14 @@ async def get_one(trailer_id: str):
     return trailer
 
 @router.get("/movie/{movie_id}", response_model=List[Trailer])
-async def get_trailers_by_movie(movie_id: str):
+async def get_trailers_by_movie(
+    movie_id: str,
+    variant: Optional[str] = Query(None),
+    srcset: bool = Query(False)
+):
+    width = variant_width(variant)
     trailers = await TrailerService.get_trailers_by_movie_id(movie_id)
-    return trailers
+    return [TrailerService.thumbnail_variants(trailer, width, srcset) for trailer in trailers]
 
 
 @router.put("/{trailer_id}", response_model=dict)
@@ -57,9 +93,9 @@ async def update_trailer(
     if trailer_name:
         update_data.trailer_name = trailer_name
     if thumbnail:
-        update_data.thumbnail_url = upload_image(thumbnail, "movie_db/trailers")
+        update_data.thumbnail_url = await upload_image(thumbnail, "movie_db/trailers")
     if video:
-        update_data.video_url = upload_video(video, "movie_db/trailers")
+        update_data.video_url = await upload_video(video, "movie_db/trailers")
 
     # Convert Pydantic model → dict
     updated = await TrailerService.update_trailer(trailer_id, update_data)
@@ -1,4 +1,4 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from mofi_common.mongo import get_client
 from dotenv import load_dotenv
 import os
 
@@ -15,12 +15,16 @@ if not MONGO_URI:
 if not MONGO_DB_NAME:
     raise Exception("MONGO_DB_NAME is missing in .env file")
 
-client = AsyncIOMotorClient(MONGO_URI)
+# Shared, configured pool (mofi_common.mongo); opened in the app lifespan
+client = get_client(MONGO_URI)
 db = client[MONGO_DB_NAME]
 
 movies_collection = db["movies"]
 trailers_collection = db["trailers"]
 images_collection = db["movie_images"]
+trailer_jobs_collection = db["trailer_jobs"]
+media_hashes_collection = db["media_hashes"]
+direct_uploads_collection = db["direct_uploads"]
 
 
 
@@ -1,3 +1,11 @@
+import asyncio
+import os
+import sys
+
+# Make the backend-wide mofi_common package importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -6,16 +14,78 @@ from movie_api.controllers.movie_controller import router as movie_router
 from movie_api.controllers.trailer_controller import router as trailer_router
 from movie_api.controllers.movie_image_controller import router as movie_image_router
 from movie_api.controllers.accessible_movies_controller import router as accessible_movies_router
+from movie_api.controllers.direct_upload_controller import router as direct_upload_router
+from movie_api.db.mongo import (
+    client, movies_collection, trailers_collection, images_collection, trailer_jobs_collection,
+    media_hashes_collection, direct_uploads_collection, producer_collection
+)
+from movie_api.utils.cache import catalog_cache
+from movie_api.services.trailer_job_service import TrailerJobService
+from mofi_common.indexes import apply_indexes
+from mofi_common import mongo
+from mofi_common import loopwatch
+from mofi_common.metrics import MetricsMiddleware, metrics_router
+from mofi_common.tracing import TracingMiddleware
+from mofi_common.query_audit import audit_router
+from mofi_common.profiling import ProfilingMiddleware, profile_router
+from mofi_common.storage import storage_backend
+from mofi_common import images
+from mofi_common.reconcile import MEDIA_RECONCILE_INTERVAL_HOURS, run_periodically
+from mofi_common.uploads import UploadLimitMiddleware
+from movie_api.utils.upload_rules import UPLOAD_RULES
 load_dotenv()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loopwatch.start()
+    await mongo.connect(client)
+    await apply_indexes({
+        "movies": movies_collection,
+        "trailers": trailers_collection,
+        "trailer_jobs": trailer_jobs_collection,
+        "movie_images": images_collection,
+        "media_hashes": media_hashes_collection,
+        "direct_uploads": direct_uploads_collection,
+    })
+    # Jobs a previous run of this service left queued or running
+    try:
+        await TrailerJobService.recover()
+    except Exception as e:
+        print(f"Trailer job recovery failed: {str(e)}")
+
+    # Orphaned media sweep; users/profile_pics is left to the CLI since the
+    # users database is not configured here
+    reconciler = None
+    if MEDIA_RECONCILE_INTERVAL_HOURS > 0:
+        reconciler = asyncio.create_task(run_periodically({
+            "movies": movies_collection,
+            "trailers": trailers_collection,
+            "movie_images": images_collection,
+            "Producers": producer_collection,
+            "media_hashes": media_hashes_collection,
+            "direct_uploads": direct_uploads_collection,
+        }))
+
+    yield
+
+    if reconciler:
+        reconciler.cancel()
+    images.shutdown()
+    loopwatch.stop()
+    mongo.close(client)
+
+
 app = FastAPI(
     title="Movie API",
     description="Handle Movie + Trailer Services",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
+# Added before CORS so CORS headers are also set on 413/415 rejections
+app.add_middleware(UploadLimitMiddleware, rules=UPLOAD_RULES)
 
 origins = [
     "http://localhost:5174",
@@ -29,11 +99,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ProfilingMiddleware, app_name="movie")
+
+# Added last so they are the outermost middleware and time every response
+app.add_middleware(MetricsMiddleware, app_name="movie")
+app.add_middleware(TracingMiddleware, service_name="movie")
+
 app.include_router(movie_router, prefix="/movies", tags=["Movies"])
 app.include_router(trailer_router, prefix="/trailers", tags=["Trailers"])
 app.include_router(movie_image_router)
 app .include_router(accessible_movies_router)
+app.include_router(direct_upload_router)
+app.include_router(metrics_router)
+app.include_router(loopwatch.loop_router)
+app.include_router(audit_router)
+app.include_router(profile_router)
+
+# Locally stored media is served by the app itself
+if storage_backend() == "local":
+    from mofi_common.storage.local import media_router
+    app.include_router(media_router)
 
 @app.get("/")
 def home():
     return {"message": "Movie API is running"}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return catalog_cache.stats()
+
+@app.get("/db/pool")
+def db_pool_stats():
+    return mongo.pool_stats()
+
+@app.get("/images/stats")
+def image_stats():
+    return images.stats()
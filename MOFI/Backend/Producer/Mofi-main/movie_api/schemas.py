@@ -17,6 +17,8 @@ class MovieCreate(MovieBase):
     user_id: str
     image1: str
     image2: str
+    # Width, height, placeholder and sizes per poster field
+    image_details: Dict[str, Dict[str, Any]] = {}
 
 class MovieUpdate(BaseModel):
     imdbID: Optional[str] = None
@@ -31,6 +33,7 @@ class MovieUpdate(BaseModel):
     user_id: Optional[str] = None
     image1: Optional[str] = None
     image2: Optional[str] = None
+    image_details: Optional[Dict[str, Dict[str, Any]]] = None
 
 class Movie(MovieBase):
     movie_id: str
@@ -111,11 +114,22 @@ class TrailerUpdate(BaseModel):
     thumbnail_url: Optional[str] = None
     video_url: Optional[str] = None
 
+class DirectUploadAsset(BaseModel):
+    # Fields of Cloudinary's upload response
+    public_id: str
+    version: int
+    signature: str
+
+class DirectUploadFinalize(BaseModel):
+    # Cloudinary upload response per asset name ("image", "thumbnail", "video")
+    assets: Dict[str, DirectUploadAsset]
+
 class Trailer(BaseModel):
     trailer_id: str
     movie_id: str
     trailer_name: str
     thumbnail_url: Optional[str] = None
+    thumbnail_url_srcset: Optional[str] = None
     video_url: Optional[str] = None
 
     class Config:
@@ -0,0 +1,352 @@
+# services/direct_upload_service.py
+"""
+Signed direct uploads: files go from the client straight to Cloudinary.
+
+POST /direct-uploads/movie_image or /direct-uploads/trailer records what the
+upload is for and returns signed Cloudinary upload parameters per file. The
+public id, allowed formats, maximum file size and notification URL are part
+of the signature, so the client cannot change where a file lands or what it
+may be. The client
+posts each file (videos in chunks, same parameters for every chunk) to the
+returned upload_url.
+
+The movie image or trailer is recorded once every file is in, by whichever
+arrives first:
+
+- POST /direct-uploads/{upload_id}/finalize with the Cloudinary upload
+  responses, checked with verify_api_response_signature
+- Cloudinary's upload notification to POST /direct-uploads/notify (when
+  DIRECT_UPLOAD_NOTIFY_URL is set), checked with verify_notification_signature
+
+Size, format and dimensions are read back through the Admin API rather than
+taken from the client; a file over its limit is deleted from storage and the
+upload fails.
+Pending uploads expire after DIRECT_UPLOAD_TTL_MINUTES (Cloudinary itself
+rejects signatures older than an hour).
+
+Direct uploads skip re-encoding and content-hash deduplication, which need
+the bytes on an API worker, and are only available with Cloudinary storage.
+
+Signing and verification use the credentials of the app handling the request
+(mofi_common.settings), not the cloudinary module's global config, which the
+gateway shares between apps.
+"""
+import hmac
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import cloudinary.utils
+from pymongo import ReturnDocument
+
+from movie_api.db.mongo import direct_uploads_collection, movies_collection
+from movie_api.schemas import TrailerCreate
+from movie_api.services.movie_image_service import MovieImageService
+from movie_api.services.trailer_service import TrailerService
+from movie_api.utils.upload_rules import MAX_TRAILER_UPLOAD_BYTES
+from mofi_common.images import MAX_IMAGE_UPLOAD_BYTES
+from mofi_common.media import MEDIA_CHUNK_SIZE, media_client
+from mofi_common.settings import cloudinary_config
+from mofi_common.storage import get_storage, storage_backend
+
+DIRECT_UPLOAD_TTL_MINUTES = int(os.getenv("DIRECT_UPLOAD_TTL_MINUTES", 120))
+# Public URL of POST /direct-uploads/notify; no notifications when unset
+DIRECT_UPLOAD_NOTIFY_URL = os.getenv("DIRECT_UPLOAD_NOTIFY_URL")
+# Cloudinary's own default for verify_notification_signature
+NOTIFICATION_VALID_SECONDS = 7200
+
+# Files each kind of upload is made of, and their resource type
+UPLOAD_ASSETS = {
+    "movie_image": {"image": "image"},
+    "trailer": {"thumbnail": "image", "video": "video"},
+}
+UPLOAD_FOLDERS = {
+    "movie_image": "movie_db/movie_images",
+    "trailer": "movie_db/trailers",
+}
+ALLOWED_FORMATS = {
+    "image": "jpg,png,gif,webp",
+    "video": "mp4,mov,webm,avi",
+}
+MAX_ASSET_BYTES = {
+    "image": MAX_IMAGE_UPLOAD_BYTES,
+    "video": MAX_TRAILER_UPLOAD_BYTES,
+}
+
+
+class DirectUploadError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def serialize_upload(upload):
+    return {
+        "upload_id": upload["upload_id"],
+        "kind": upload["kind"],
+        "movie_id": upload["movie_id"],
+        "status": upload["status"],
+        "assets": {
+            name: {"uploaded": bool(asset.get("url")), "url": asset.get("url")}
+            for name, asset in upload["assets"].items()
+        },
+        "result": upload.get("result"),
+        "error": upload.get("error"),
+        "created_at": upload["created_at"],
+        "expires_at": upload.get("expires_at"),
+    }
+
+
+def _upload_params(public_id: str, resource_type: str, timestamp: int) -> dict:
+    """Signed form fields for one file of a direct upload"""
+    config = cloudinary_config()
+    params = {
+        "public_id": public_id,
+        "timestamp": timestamp,
+        "allowed_formats": ALLOWED_FORMATS[resource_type],
+        "max_file_size": MAX_ASSET_BYTES[resource_type],
+    }
+    if DIRECT_UPLOAD_NOTIFY_URL:
+        params["notification_url"] = DIRECT_UPLOAD_NOTIFY_URL
+    params["signature"] = cloudinary.utils.api_sign_request(
+        params, config.api_secret, config.signature_algorithm
+    )
+    params["api_key"] = config.api_key
+    return params
+
+
+def _signature_matches(expected: str, signature) -> bool:
+    return isinstance(signature, str) and hmac.compare_digest(expected, signature)
+
+
+def verify_response_signature(public_id: str, version, signature) -> bool:
+    """cloudinary.utils.verify_api_response_signature, with this app's secret"""
+    config = cloudinary_config()
+    if not config.api_secret:
+        return False
+    expected = cloudinary.utils.api_sign_request(
+        {"public_id": public_id, "version": version}, config.api_secret,
+        config.signature_algorithm, signature_version=1
+    )
+    return _signature_matches(expected, signature)
+
+
+def verify_notification_signature(body: str, timestamp: int, signature) -> bool:
+    """cloudinary.utils.verify_notification_signature, with this app's secret"""
+    if timestamp < time.time() - NOTIFICATION_VALID_SECONDS:
+        return False
+    config = cloudinary_config()
+    if not config.api_secret:
+        return False
+    expected = cloudinary.utils.compute_hex_hash(
+        f"{body}{timestamp}{config.api_secret}", config.signature_algorithm
+    )
+    return _signature_matches(expected, signature)
+
+
+class DirectUploadService:
+
+    @staticmethod
+    async def issue(kind: str, movie_id: str, fields: dict) -> dict:
+        """
+        Start a direct upload of kind ("movie_image" or "trailer"). fields
+        holds the form values the record is created with later.
+        """
+        if storage_backend() != "cloudinary":
+            raise DirectUploadError(400, "Direct uploads need MEDIA_STORAGE=cloudinary")
+
+        movie = await movies_collection.find_one({"movie_id": movie_id}, {"_id": 1})
+        if not movie:
+            raise DirectUploadError(404, f"Movie with ID {movie_id} not found")
+
+        upload_id = str(uuid.uuid4())
+        folder = UPLOAD_FOLDERS[kind]
+        timestamp = int(time.time())
+        cloud_name = cloudinary_config().cloud_name
+
+        assets = {}
+        uploads = {}
+        for name, resource_type in UPLOAD_ASSETS[kind].items():
+            public_id = f"{folder}/{upload_id}_{name}"
+            assets[name] = {"public_id": public_id, "resource_type": resource_type, "url": None}
+            uploads[name] = {
+                "upload_url": f"https://api.cloudinary.com/v1_1/{cloud_name}/{resource_type}/upload",
+                "params": _upload_params(public_id, resource_type, timestamp),
+                "max_bytes": MAX_ASSET_BYTES[resource_type],
+            }
+            if resource_type == "video":
+                # Larger files must be sent in parts with X-Unique-Upload-Id
+                uploads[name]["chunk_size"] = MEDIA_CHUNK_SIZE
+
+        now = datetime.utcnow()
+        upload = {
+            "upload_id": upload_id,
+            "kind": kind,
+            "movie_id": movie_id,
+            "fields": fields,
+            "assets": assets,
+            "public_ids": [asset["public_id"] for asset in assets.values()],
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now,
+            "expires_at": now + timedelta(minutes=DIRECT_UPLOAD_TTL_MINUTES),
+        }
+        await direct_uploads_collection.insert_one(upload)
+
+        return {**serialize_upload(upload), "uploads": uploads}
+
+    @staticmethod
+    async def get_upload(upload_id: str):
+        upload = await direct_uploads_collection.find_one({"upload_id": upload_id})
+        return serialize_upload(upload) if upload else None
+
+    @staticmethod
+    async def finalize(upload_id: str, responses: dict) -> dict:
+        """
+        Accept the Cloudinary upload responses the client got back, as
+        {asset name: {"public_id", "version", "signature"}}, and record the
+        upload once all its files are in.
+        """
+        upload = await direct_uploads_collection.find_one({"upload_id": upload_id})
+        if not upload:
+            raise DirectUploadError(404, "Upload not found")
+
+        for name, response in responses.items():
+            asset = upload["assets"].get(name)
+            if asset is None:
+                raise DirectUploadError(400, f"Unknown asset '{name}' for a {upload['kind']} upload")
+            if response["public_id"] != asset["public_id"]:
+                raise DirectUploadError(400, f"Asset '{name}' was not uploaded with the issued parameters")
+            if not verify_response_signature(
+                response["public_id"], response["version"], response["signature"]
+            ):
+                raise DirectUploadError(400, f"Invalid upload signature for asset '{name}'")
+
+        for name in responses:
+            if not upload["assets"][name].get("url"):
+                upload = await DirectUploadService._accept_asset(upload, name)
+
+        return serialize_upload(await DirectUploadService._complete(upload))
+
+    @staticmethod
+    async def notify(body: str, timestamp: str, signature: str, notification: dict) -> bool:
+        """
+        Handle a Cloudinary upload notification. Returns False for
+        notifications that are not about a pending direct upload.
+        """
+        if not timestamp or not signature or not verify_notification_signature(
+            body, int(timestamp), signature
+        ):
+            raise DirectUploadError(401, "Invalid notification signature")
+
+        if notification.get("notification_type") != "upload":
+            return False
+
+        public_id = notification.get("public_id")
+        upload = await direct_uploads_collection.find_one({"public_ids": public_id})
+        if not upload:
+            return False
+
+        name = next(name for name, asset in upload["assets"].items() if asset["public_id"] == public_id)
+        if not upload["assets"][name].get("url"):
+            upload = await DirectUploadService._accept_asset(upload, name)
+        await DirectUploadService._complete(upload)
+        return True
+
+    @staticmethod
+    async def _accept_asset(upload: dict, name: str) -> dict:
+        """Check an uploaded file against its limits and store its details"""
+        asset = upload["assets"][name]
+        resource_type = asset["resource_type"]
+        try:
+            details = await media_client.resource(asset["public_id"], resource_type=resource_type)
+        except Exception as e:
+            raise DirectUploadError(400, f"Asset '{name}' has not been uploaded: {str(e)}")
+
+        max_bytes = MAX_ASSET_BYTES[resource_type]
+        if details.get("bytes", 0) > max_bytes:
+            await DirectUploadService._delete_assets([asset])
+            await DirectUploadService._fail(upload["upload_id"], f"Asset '{name}' is larger than {max_bytes} bytes")
+            raise DirectUploadError(413, f"Asset '{name}' is larger than {max_bytes} bytes")
+
+        prefix = f"assets.{name}"
+        return await direct_uploads_collection.find_one_and_update(
+            {"upload_id": upload["upload_id"]},
+            {"$set": {
+                f"{prefix}.url": details["secure_url"],
+                f"{prefix}.bytes": details.get("bytes"),
+                f"{prefix}.width": details.get("width"),
+                f"{prefix}.height": details.get("height"),
+                "updated_at": datetime.utcnow(),
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    async def _delete_assets(assets):
+        """
+        Delete rejected files. Direct uploads are never in media_hashes, so
+        they go straight to storage rather than through MediaHashService.
+        """
+        for asset in assets:
+            try:
+                await get_storage().delete(asset["public_id"], asset["resource_type"])
+            except Exception as e:
+                print(f"Failed to delete direct upload asset {asset['public_id']}: {str(e)}")
+
+    @staticmethod
+    async def _fail(upload_id: str, error: str):
+        await direct_uploads_collection.update_one(
+            {"upload_id": upload_id, "status": {"$in": ["pending", "recording"]}},
+            {"$set": {"status": "failed", "error": error, "updated_at": datetime.utcnow()}}
+        )
+
+    @staticmethod
+    async def _complete(upload: dict) -> dict:
+        """Create the movie image or trailer once, when every asset is in"""
+        if upload["status"] != "pending" or not all(a.get("url") for a in upload["assets"].values()):
+            return upload
+
+        # Finalize and the notification can race; only one of them records
+        claimed = await direct_uploads_collection.find_one_and_update(
+            {"upload_id": upload["upload_id"], "status": "pending"},
+            {"$set": {"status": "recording", "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not claimed:
+            return await direct_uploads_collection.find_one({"upload_id": upload["upload_id"]})
+
+        assets = claimed["assets"]
+        fields = claimed["fields"]
+        try:
+            if claimed["kind"] == "movie_image":
+                image = assets["image"]
+                result = await MovieImageService.save_movie_image(
+                    # Stored as uploaded, so both sizes are the same
+                    {"url": image["url"], "width": image.get("width"), "height": image.get("height"),
+                     "bytes": image.get("bytes"), "original_bytes": image.get("bytes")},
+                    claimed["movie_id"],
+                    fields["title"],
+                    fields.get("people"),
+                    fields.get("description")
+                )
+            else:
+                result = await TrailerService.create_trailer(TrailerCreate(
+                    movie_id=claimed["movie_id"],
+                    trailer_name=fields["trailer_name"],
+                    thumbnail_url=assets["thumbnail"]["url"],
+                    video_url=assets["video"]["url"]
+                ))
+        except Exception as e:
+            print(f"Failed to record direct upload {claimed['upload_id']}: {str(e)}")
+            await DirectUploadService._fail(claimed["upload_id"], str(getattr(e, "detail", e)))
+            await DirectUploadService._delete_assets(assets.values())
+            return await direct_uploads_collection.find_one({"upload_id": claimed["upload_id"]})
+
+        return await direct_uploads_collection.find_one_and_update(
+            {"upload_id": claimed["upload_id"]},
+            {"$set": {"status": "completed", "result": result, "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
@@ -0,0 +1,214 @@
+# services/media_hash_service.py
+"""
+Content-hash deduplication for posters and movie stills.
+
+Before uploading, the file's SHA-256 is computed while streaming it from the
+spooled upload and looked up in media_hashes. A match reuses the stored URL
+and bumps its reference count instead of uploading again; otherwise the image
+is re-encoded (mofi_common.images) and uploaded. Releasing a URL
+decrements the count; the asset is only removed from storage once the last
+reference is gone.
+
+An entry is found by its hash when acquiring and by its URL when releasing
+or when its URL is already taken; a file is only deleted while no entry
+with references points at its URL.
+
+URLs that were never tracked (trailers, uploads from before this collection
+existed) have no entry and are deleted straight away on release.
+"""
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import List
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from movie_api.db.mongo import media_hashes_collection
+from movie_api.utils.cloudinary import delete_cloudinary_file, delete_cloudinary_files
+from mofi_common.images import process_image
+from mofi_common.media import media_client
+from mofi_common.storage import get_storage
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# What callers get back for a stored image
+MEDIA_PROJECTION = {
+    "_id": 0, "url": 1, "width": 1, "height": 1, "placeholder": 1, "bytes": 1, "original_bytes": 1
+}
+
+
+def sha256_file(file) -> str:
+    """Hash a file object chunk by chunk and rewind it for the upload"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def image_details(stored: dict) -> dict:
+    """Layout and size fields kept next to an image URL on movie and image documents"""
+    return {
+        "width": stored.get("width"),
+        "height": stored.get("height"),
+        "placeholder": stored.get("placeholder"),
+        "bytes": stored.get("bytes"),
+        "original_bytes": stored.get("original_bytes"),
+    }
+
+
+class MediaHashService:
+
+    @staticmethod
+    async def _acquire(query: dict):
+        """Take a reference to the entry matching query; None if there is none"""
+        return await media_hashes_collection.find_one_and_update(
+            query,
+            {"$inc": {"refs": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            projection=MEDIA_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    async def upload_image(upload_file, folder: str) -> dict:
+        """
+        Upload an image unless identical content is already stored.
+        Returns {"url", "width", "height", "placeholder", "bytes", "original_bytes"}.
+        """
+        sha256 = await media_client.run(sha256_file, upload_file.file)
+
+        existing = await MediaHashService._acquire({"sha256": sha256})
+        if existing:
+            return existing
+
+        processed = await process_image(upload_file)
+        saved = await get_storage().save(
+            processed["file"],
+            folder,
+            resource_type="image",
+            filename=processed["filename"]
+        )
+        url = saved["url"]
+        details = {
+            "url": url,
+            "width": processed["width"],
+            "height": processed["height"],
+            "placeholder": processed["placeholder"],
+            "bytes": processed["bytes"],
+            "original_bytes": processed["original_bytes"],
+        }
+
+        now = datetime.utcnow()
+        try:
+            entry = await media_hashes_collection.find_one_and_update(
+                {"sha256": sha256},
+                {
+                    "$inc": {"refs": 1},
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {**details, "folder": folder, "created_at": now}
+                },
+                projection=MEDIA_PROJECTION,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # A concurrent upload of the same content inserted first, or
+            # another entry already points at this URL (unique on both)
+            entry = (await MediaHashService._acquire({"sha256": sha256})
+                     or await MediaHashService._acquire({"url": url}))
+            if entry is None:
+                # The clashing entry was released in the meantime; keep
+                # ours untracked, it is deleted on its first release
+                print(f"Could not track media hash {sha256} for {url}")
+                return details
+
+        if entry["url"] != url:
+            # Lost the race; keep the first copy and drop ours
+            await MediaHashService._delete_unreferenced(url)
+        return entry
+
+    @staticmethod
+    async def upload_images(upload_files: list, folder: str) -> list:
+        """
+        upload_image for several files concurrently. All or nothing: if one
+        fails, the references taken for the others are released and the
+        error is raised.
+        """
+        results = await asyncio.gather(
+            *(MediaHashService.upload_image(upload_file, folder) for upload_file in upload_files),
+            return_exceptions=True
+        )
+        failed = [result for result in results if isinstance(result, BaseException)]
+        if failed:
+            uploaded = [result["url"] for result in results if not isinstance(result, BaseException)]
+            if uploaded:
+                await MediaHashService.release_many(uploaded)
+            raise failed[0]
+        return results
+
+    @staticmethod
+    async def _referenced(url: str) -> bool:
+        """Whether an entry with live references points at url"""
+        entry = await media_hashes_collection.find_one({"url": url, "refs": {"$gt": 0}}, {"_id": 1})
+        return entry is not None
+
+    @staticmethod
+    async def _delete_unreferenced(url: str) -> bool:
+        if await MediaHashService._referenced(url):
+            return False
+        return await delete_cloudinary_file(url)
+
+    @staticmethod
+    async def _release(url: str) -> bool:
+        """Drop one reference; True when nothing references the asset any more"""
+        entry = await media_hashes_collection.find_one_and_update(
+            {"url": url},
+            {"$inc": {"refs": -1}, "$set": {"updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if entry is None:
+            return True
+        if entry["refs"] > 0:
+            return False
+
+        # Only delete if no upload re-acquired it in the meantime
+        result = await media_hashes_collection.delete_one({"_id": entry["_id"], "refs": {"$lte": 0}})
+        return result.deleted_count == 1
+
+    @staticmethod
+    async def release(url: str) -> bool:
+        """Release one reference to url, deleting the asset if it was the last"""
+        if await MediaHashService._release(url):
+            return await MediaHashService._delete_unreferenced(url)
+        return False
+
+    @staticmethod
+    async def release_many(urls: List[str]) -> dict:
+        """
+        Release one reference per URL (repeat a URL to release it twice) and
+        batch-delete the assets left unreferenced. Meant to run as a
+        background task.
+        """
+        unreferenced = []
+        for url in urls:
+            try:
+                if await MediaHashService._release(url):
+                    unreferenced.append(url)
+            except Exception as e:
+                print(f"Failed to release media reference {url}: {str(e)}")
+
+        # An upload may have re-acquired one of them since its entry went
+        try:
+            unreferenced = [
+                url for url in dict.fromkeys(unreferenced)
+                if not await MediaHashService._referenced(url)
+            ]
+        except Exception as e:
+            print(f"Failed to re-check media references: {str(e)}")
+            unreferenced = []
+
+        summary = await delete_cloudinary_files(unreferenced)
+        summary["kept"] = len(urls) - len(unreferenced)
+        return summary
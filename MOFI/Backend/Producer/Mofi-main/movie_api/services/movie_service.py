@@ -1,10 +1,19 @@
 # services/movie_service.py
 from movie_api.db.mongo import db, movies_collection, crew_collection
+import asyncio
 import uuid
 from movie_api.schemas import MovieCreate, MovieUpdate
-from typing import Optional
+from mofi_common.crew import build_membership, membership_query
+from movie_api.utils.crew import CREATOR_PERMISSIONS
+from movie_api.utils.cache import catalog_cache, movie_key, full_movie_key, trailers_key
+from movie_api.services.trailer_service import TrailerService
+from movie_api.services.movie_image_service import serialize_movie_image, image_variants
+from movie_api.services.media_hash_service import MediaHashService
+from typing import List, Optional
 from bson import ObjectId
+from pymongo import DeleteMany, UpdateMany
 from datetime import datetime
+from mofi_common.variants import with_variants
 
 
 def serialize_movie(movie):
@@ -22,19 +31,95 @@ def serialize_movie(movie):
         "duration": movie["duration"],
         "image1": movie["image1"],
         "image2": movie["image2"],
+        "image_details": movie.get("image_details", {}),
         "rate": movie.get("rate", {}),
         "reactions": movie.get("reactions", {}),
     }
 
 
+def movie_variants(movie: dict, width: Optional[int] = None, srcset: bool = False) -> dict:
+    """Resize/srcset the poster URLs of a serialized movie (see mofi_common.variants)"""
+    details = movie.get("image_details") or {}
+    return with_variants(
+        movie,
+        ("image1", "image2"),
+        width,
+        srcset,
+        max_widths={field: (details.get(field) or {}).get("width") for field in ("image1", "image2")}
+    )
+
+
+def full_movie_variants(data: dict, width: Optional[int] = None, srcset: bool = False) -> dict:
+    movie_variants(data["movie"], width, srcset)
+    for trailer in data["trailers"]:
+        TrailerService.thumbnail_variants(trailer, width, srcset)
+    for image in data["images"]:
+        image_variants(image, width, srcset)
+    return data
+
+
+async def rating_summary(collection, movie_id: str) -> dict:
+    """Aggregate a pre_ratings/post_ratings collection into count, sum, average and star histogram"""
+    buckets = await collection.aggregate([
+        {"$match": {"movie_id": movie_id}},
+        {"$group": {"_id": "$stars", "count": {"$sum": 1}}}
+    ]).to_list(None)
+
+    distribution = {str(stars): 0 for stars in range(1, 6)}
+    rate_count = rate_vote = 0
+    for bucket in buckets:
+        if bucket["_id"] is None:
+            continue
+        distribution[str(bucket["_id"])] = bucket["count"]
+        rate_count += bucket["count"]
+        rate_vote += bucket["_id"] * bucket["count"]
+
+    return {
+        "rate_vote": rate_vote,
+        "rate_count": rate_count,
+        "rate": round(rate_vote / rate_count, 2) if rate_count > 0 else 0,
+        "distribution": distribution
+    }
+
+
+async def reaction_summary(movie_id: str) -> dict:
+    """Count emoji reactions and like/dislike preferences in one aggregation"""
+    result = await db.reactions.aggregate([
+        {"$match": {"movie_id": movie_id}},
+        {"$facet": {
+            "emoji_reactions": [
+                {"$match": {"reaction": {"$ne": None}}},
+                {"$group": {"_id": "$reaction", "count": {"$sum": 1}}}
+            ],
+            "preferences": [
+                {"$match": {"preference": {"$ne": None}}},
+                {"$group": {"_id": "$preference", "count": {"$sum": 1}}}
+            ]
+        }}
+    ]).to_list(None)
+
+    facets = result[0] if result else {}
+    return {
+        "emoji_reactions": {b["_id"]: b["count"] for b in facets.get("emoji_reactions", [])},
+        "preferences": {b["_id"]: b["count"] for b in facets.get("preferences", [])}
+    }
+
+
 class MovieService:
+    @staticmethod
+    async def imdb_id_exists(imdb_id: str) -> bool:
+        return await db.movies.find_one({"imdbID": imdb_id}, {"_id": 1}) is not None
+
+    @staticmethod
+    async def movie_exists(movie_id: str) -> bool:
+        return await db.movies.find_one({"movie_id": movie_id}, {"_id": 1}) is not None
+
     @staticmethod
     async def create_movie(movie_data: MovieCreate) -> dict:
         movie_dict = movie_data.dict()
 
         # Check if movie with same IMDb ID exists
-        existing = await db.movies.find_one({"imdbID": movie_dict["imdbID"]})
-        if existing:
+        if await MovieService.imdb_id_exists(movie_dict["imdbID"]):
             raise Exception("Movie with this IMDb ID already exists")
         
         # Generate unique movie_id
@@ -62,53 +147,22 @@ class MovieService:
         user_id = movie_dict["user_id"]
         movie_id = movie_dict["movie_id"]
         
-        # Check if user already exists in crew_collection
-        existing_crew = await crew_collection.find_one({"linkedin_id": user_id})
-        
-        if existing_crew:
-            # Add new movie to existing crew member as Creator
-            await crew_collection.update_one(
-                {"linkedin_id": user_id},
-                {"$set": {
-                    f"movies.{movie_id}": {
-                        "contribution": "Creator",
-                        "permissions": {
-                            "video": True,
-                            "image": True,
-                            "live": True,
-                            "scripts": True,
-                            "crew": True
-                        },
-                        "created_at": now,
-                        "updated_at": now,
-                        "access_type": "creator"
-                    },
-                    "updated_at": now
-                }}
-            )
-        else:
-            # Create new crew entry for the creator
-            crew_member = {
-                "linkedin_id": user_id,
-                "movies": {
-                    movie_id: {
-                        "contribution": "Creator",
-                        "permissions": {
-                            "video": True,
-                            "image": True,
-                            "live": True,
-                            "scripts": True,
-                            "crew": True
-                        },
-                        "created_at": now,
-                        "updated_at": now,
-                        "access_type": "creator"
-                    }
-                },
-                "created_at": now,
-                "updated_at": now
-            }
-            await crew_collection.insert_one(crew_member)
+        # Append the Creator membership, creating the crew entry if needed
+        await crew_collection.update_one(
+            {"linkedin_id": user_id},
+            {
+                "$push": {"memberships": build_membership(
+                    movie_id,
+                    "Creator",
+                    dict(CREATOR_PERMISSIONS),
+                    now,
+                    access_type="creator"
+                )},
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
         # ========== END OF CREW ADDITION ==========
 
         return serialize_movie(movie_dict)
@@ -124,12 +178,15 @@ class MovieService:
 
     @staticmethod
     async def get_movie(movie_id: str) -> Optional[dict]:
-        movie = await db.movies.find_one({"movie_id": movie_id})
+        async def load():
+            movie = await db.movies.find_one({"movie_id": movie_id})
 
-        if movie:
-            return serialize_movie(movie)
+            if movie:
+                return serialize_movie(movie)
 
-        return None
+            return None
+
+        return await catalog_cache.get_or_load(movie_key(movie_id), load)
 
 
     @staticmethod
@@ -143,41 +200,112 @@ class MovieService:
         if not update_fields:
             return None
 
-        result = await db.movies.update_one(
-            {"movie_id": movie_id},
-            {"$set": update_fields}
-        )
+        # Only replace the details of the posters being updated
+        for field, details in update_fields.pop("image_details", {}).items():
+            update_fields[f"image_details.{field}"] = details
+
+        poster_fields = [field for field in ("image1", "image2") if field in update_fields]
+        new_posters = [update_fields[field] for field in poster_fields]
+        previous = {}
+        try:
+            if poster_fields:
+                previous = await db.movies.find_one(
+                    {"movie_id": movie_id},
+                    {"_id": 0, "image1": 1, "image2": 1}
+                ) or {}
+
+            result = await db.movies.update_one(
+                {"movie_id": movie_id},
+                {"$set": update_fields}
+            )
+        except Exception:
+            # The new posters' references would otherwise never be released
+            if new_posters:
+                await MediaHashService.release_many(new_posters)
+            raise
+
+        if result.matched_count == 0:
+            if new_posters:
+                await MediaHashService.release_many(new_posters)
+            return None
+
+        # Release the posters that were replaced. A re-upload of the same
+        # content took a second reference to the same URL, so this is
+        # released even when the URL did not change.
+        replaced = [previous[field] for field in poster_fields if previous.get(field)]
+        if replaced:
+            await MediaHashService.release_many(replaced)
 
         if result.modified_count == 0:
             return None
 
+        await catalog_cache.invalidate(movie_key(movie_id), full_movie_key(movie_id))
+
         updated_movie = await db.movies.find_one({"movie_id": movie_id})
         return serialize_movie(updated_movie)
 
 
     @staticmethod
-    async def delete_movie(movie_id: str) -> bool:
-        # Also remove movie from crew_collection entries
-        # Find all crew members who have this movie
-        crew_members = await crew_collection.find(
-            {f"movies.{movie_id}": {"$exists": True}}
-        ).to_list(length=None)
-        
-        # Remove movie from each crew member
-        for member in crew_members:
-            await crew_collection.update_one(
-                {"_id": member["_id"]},
-                {"$unset": {f"movies.{movie_id}": ""}}
-            )
-            
-            # If crew member has no more movies, delete the entry
-            updated = await crew_collection.find_one({"_id": member["_id"]})
-            if not updated.get("movies"):
-                await crew_collection.delete_one({"_id": member["_id"]})
-        
-        # Delete movie from movies collection
-        result = await db.movies.delete_one({"movie_id": movie_id})
-        return result.deleted_count == 1
+    async def delete_movie(movie_id: str) -> Optional[List[str]]:
+        """
+        Cascade-delete a movie and everything that references it.
+
+        Returns the media URLs that are no longer referenced so the caller can
+        remove them from storage in the background, or None if the movie does
+        not exist.
+        """
+        movie = await db.movies.find_one_and_delete(
+            {"movie_id": movie_id},
+            {"_id": 0, "image1": 1, "image2": 1}
+        )
+        if not movie:
+            return None
+
+        # Collect media URLs and crew ids before their documents disappear
+        trailers, images, crew_members = await asyncio.gather(
+            db.trailers.find(
+                {"movie_id": movie_id}, {"_id": 0, "thumbnail_url": 1, "video_url": 1}
+            ).to_list(None),
+            db.movie_images.find(
+                {"movie_id": movie_id}, {"_id": 0, "image_url": 1}
+            ).to_list(None),
+            crew_collection.find(membership_query(movie_id), {"_id": 1}).to_list(None),
+        )
+
+        writes = [
+            db.trailers.delete_many({"movie_id": movie_id}),
+            db.movie_images.delete_many({"movie_id": movie_id}),
+            db.streams.delete_many({"movie_id": movie_id}),
+            db.pre_ratings.delete_many({"movie_id": movie_id}),
+            db.post_ratings.delete_many({"movie_id": movie_id}),
+            db.reactions.delete_many({"movie_id": movie_id}),
+        ]
+
+        crew_ids = [member["_id"] for member in crew_members]
+        if crew_ids:
+            # Remove the membership, then drop crew entries left with no movies
+            writes.append(crew_collection.bulk_write([
+                UpdateMany(
+                    {"_id": {"$in": crew_ids}},
+                    {"$pull": {"memberships": {"movie_id": movie_id}}}
+                ),
+                DeleteMany({
+                    "_id": {"$in": crew_ids},
+                    "memberships.0": {"$exists": False},
+                    "movies": {"$in": [None, {}]}
+                })
+            ], ordered=True))
+
+        await asyncio.gather(*writes)
+        await catalog_cache.invalidate(
+            movie_key(movie_id), full_movie_key(movie_id), trailers_key(movie_id)
+        )
+
+        media_urls = [movie.get("image1"), movie.get("image2")]
+        for trailer in trailers:
+            media_urls += [trailer.get("thumbnail_url"), trailer.get("video_url")]
+        media_urls += [image.get("image_url") for image in images]
+        return [url for url in media_urls if url]
 
     
     @staticmethod
@@ -225,36 +353,50 @@ class MovieService:
             {"movie_id": movie_id},
             {"$set": {"rate": rate}}
         )
+        await catalog_cache.invalidate(movie_key(movie_id), full_movie_key(movie_id))
 
     
     @staticmethod
     async def get_full_movie_details(movie_id: str) -> dict:
-        movie = await db.movies.find_one({"movie_id": movie_id})
-        if not movie:
-            return None
-
-        ratings = await db.ratings.find_one({"movie_id": movie_id})
-        reactions = await db.reactions.find_one({"movie_id": movie_id})
-
-        trailers = []
-        async for trailer in db.trailers.find({"movie_id": movie_id}):
-            trailer["trailer_id"] = str(trailer["_id"])
-            trailer.pop("_id", None)
-            trailers.append(trailer)
+        return await catalog_cache.get_or_load(
+            full_movie_key(movie_id),
+            lambda: MovieService._load_full_movie_details(movie_id)
+        )
 
-        stream = await db.streams.find_one({"movie_id": movie_id})
+    @staticmethod
+    async def _load_full_movie_details(movie_id: str) -> dict:
+        # Every part is independent, so fetch them concurrently: latency is
+        # bounded by the slowest query instead of the sum of all of them
+        (
+            movie,
+            pre_ratings,
+            post_ratings,
+            reactions,
+            trailers,
+            images,
+            stream,
+        ) = await asyncio.gather(
+            db.movies.find_one({"movie_id": movie_id}, {"_id": 0}),
+            rating_summary(db.pre_ratings, movie_id),
+            rating_summary(db.post_ratings, movie_id),
+            reaction_summary(movie_id),
+            db.trailers.find({"movie_id": movie_id}).to_list(None),
+            db.movie_images.find({"movie_id": movie_id}).sort("uploaded_at", -1).to_list(None),
+            # stream_key is the broadcaster's secret; never expose it here
+            db.streams.find_one({"movie_id": movie_id}, {"_id": 0, "stream_key": 0}),
+        )
 
-        # remove Mongo _id safely
-        movie.pop("_id", None)
-        if ratings: ratings.pop("_id", None)
-        if reactions: reactions.pop("_id", None)
-        if stream: stream.pop("_id", None)
+        if not movie:
+            return None
 
         return {
             "movie": movie,
-            "ratings": ratings or {},
-            "reactions": reactions or {},
-            "trailers": trailers,
+            "ratings": {
+                "pre": pre_ratings,
+                "post": post_ratings
+            },
+            "reactions": reactions,
+            "trailers": [TrailerService.to_trailer_dict(t) for t in trailers],
+            "images": [serialize_movie_image(img) for img in images],
             "stream": stream or {}
         }
-
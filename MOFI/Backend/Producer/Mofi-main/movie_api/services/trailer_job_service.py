@@ -0,0 +1,301 @@
+# services/trailer_job_service.py
+"""
+Background trailer ingestion.
+
+POST /trailers/jobs saves the thumbnail and video to TRAILER_JOB_DIR and
+returns a job id straight away; the upload to media storage and the
+TrailerService.create_trailer call happen after the response is sent. At most
+TRAILER_JOB_CONCURRENCY jobs upload at once per process, the rest wait in
+"queued". Job documents expire TRAILER_JOB_TTL_HOURS after they finish.
+
+Jobs live in the process that accepted them. On startup, recover() takes
+over jobs left queued or running for TRAILER_JOB_STALE_MINUTES (their
+process stopped): they are queued again when their files are still in
+TRAILER_JOB_DIR on this host, otherwise failed and left to expire. Spool
+directories no job is waiting for are removed. Whatever a restarted job had
+already uploaded is left to the media reconciler.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+from movie_api.db.mongo import trailer_jobs_collection
+from movie_api.schemas import TrailerCreate
+from movie_api.services.trailer_service import TrailerService
+from mofi_common.storage import get_storage
+
+TRAILER_JOB_DIR = os.getenv("TRAILER_JOB_DIR", os.path.join(tempfile.gettempdir(), "mofi_trailer_jobs"))
+TRAILER_JOB_CONCURRENCY = int(os.getenv("TRAILER_JOB_CONCURRENCY", 2))
+TRAILER_JOB_TTL_HOURS = int(os.getenv("TRAILER_JOB_TTL_HOURS", 24))
+# Queued/running jobs untouched this long belong to a stopped process
+TRAILER_JOB_STALE_MINUTES = int(os.getenv("TRAILER_JOB_STALE_MINUTES", 60))
+TRAILER_FOLDER = "movie_db/trailers"
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Overall progress (percent) at the start of each stage; the video upload
+# fills the range up to "creating" as its chunks are sent
+STAGE_PROGRESS = {
+    "queued": 0,
+    "uploading_thumbnail": 5,
+    "uploading_video": 10,
+    "creating": 95,
+    "completed": 100,
+}
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+_job_slots = asyncio.Semaphore(TRAILER_JOB_CONCURRENCY)
+# Jobs restarted by recover(); referenced so they are not garbage collected
+_recovered_jobs = set()
+
+
+def serialize_job(job):
+    return {
+        "job_id": job["job_id"],
+        "movie_id": job["movie_id"],
+        "trailer_name": job["trailer_name"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "bytes_uploaded": job.get("bytes_uploaded", 0),
+        "bytes_total": job.get("bytes_total", 0),
+        "trailer": job.get("trailer"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+def _remove_orphaned_spools(active_job_ids: set, before: datetime) -> int:
+    """Delete spool directories of jobs nobody will run (older than before)"""
+    if not os.path.isdir(TRAILER_JOB_DIR):
+        return 0
+    removed = 0
+    for entry in os.listdir(TRAILER_JOB_DIR):
+        path = os.path.join(TRAILER_JOB_DIR, entry)
+        # A job being submitted has its directory before its document
+        if entry in active_job_ids or datetime.utcfromtimestamp(os.path.getmtime(path)) >= before:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def _save_upload(upload_file, path: str) -> int:
+    upload_file.file.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(upload_file.file, out, COPY_BUFFER_SIZE)
+    return os.path.getsize(path)
+
+
+class _ProgressReader:
+    """File wrapper that reports how many bytes upload_large has read"""
+
+    def __init__(self, path: str, on_read):
+        self._file = open(path, "rb")
+        self._on_read = on_read
+        self.name = os.path.basename(path)
+
+    def read(self, size=-1):
+        chunk = self._file.read(size)
+        if chunk:
+            self._on_read(self._file.tell())
+        return chunk
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+class TrailerJobService:
+
+    @staticmethod
+    async def submit(movie_id: str, trailer_name: str, thumbnail, video) -> dict:
+        """Persist both files and record a queued job."""
+        job_id = str(uuid.uuid4())
+        job_dir = os.path.join(TRAILER_JOB_DIR, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+
+        thumbnail_path = os.path.join(job_dir, "thumbnail" + os.path.splitext(thumbnail.filename or "")[1])
+        video_path = os.path.join(job_dir, "video" + os.path.splitext(video.filename or "")[1])
+        try:
+            _, video_size = await asyncio.gather(
+                asyncio.to_thread(_save_upload, thumbnail, thumbnail_path),
+                asyncio.to_thread(_save_upload, video, video_path)
+            )
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        now = datetime.utcnow()
+        job = {
+            "job_id": job_id,
+            "movie_id": movie_id,
+            "trailer_name": trailer_name,
+            "status": "queued",
+            "stage": "queued",
+            "progress": STAGE_PROGRESS["queued"],
+            "bytes_uploaded": 0,
+            "bytes_total": video_size,
+            "thumbnail_path": thumbnail_path,
+            "video_path": video_path,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await trailer_jobs_collection.insert_one(job)
+        return serialize_job(job)
+
+    @staticmethod
+    async def get_job(job_id: str):
+        job = await trailer_jobs_collection.find_one({"job_id": job_id})
+        if job:
+            return serialize_job(job)
+        return None
+
+    @staticmethod
+    async def _update(job_id: str, **fields):
+        fields["updated_at"] = datetime.utcnow()
+        await trailer_jobs_collection.update_one({"job_id": job_id}, {"$set": fields})
+
+    @staticmethod
+    async def _set_stage(job_id: str, stage: str, **fields):
+        await TrailerJobService._update(
+            job_id, status="running", stage=stage, progress=STAGE_PROGRESS[stage], **fields
+        )
+
+    @staticmethod
+    async def _claim(job_id: str) -> bool:
+        """Start a queued job; False when it is not queued (any more)"""
+        result = await trailer_jobs_collection.update_one(
+            {"job_id": job_id, "status": "queued"},
+            {"$set": {
+                "status": "running",
+                "stage": "uploading_thumbnail",
+                "progress": STAGE_PROGRESS["uploading_thumbnail"],
+                "updated_at": datetime.utcnow(),
+            }}
+        )
+        return result.modified_count == 1
+
+    @staticmethod
+    async def recover() -> dict:
+        """
+        Requeue or fail the jobs a stopped process left behind and remove
+        orphaned spool directories. Called from the lifespan on startup.
+        """
+        now = datetime.utcnow()
+        stale_before = now - timedelta(minutes=TRAILER_JOB_STALE_MINUTES)
+        requeued = failed = 0
+
+        stale = trailer_jobs_collection.find({"status": {"$in": ACTIVE_STATUSES}, "updated_at": {"$lt": stale_before}})
+        async for job in stale:
+            spooled = all(os.path.exists(job[path]) for path in ("thumbnail_path", "video_path"))
+            if spooled:
+                update = {"status": "queued", "stage": "queued", "progress": STAGE_PROGRESS["queued"],
+                          "bytes_uploaded": 0, "updated_at": now}
+            else:
+                update = {"status": "failed", "error": "Interrupted by a restart; upload the trailer again",
+                          "updated_at": now, "expires_at": now + timedelta(hours=TRAILER_JOB_TTL_HOURS)}
+            # Only one starting worker takes each job
+            result = await trailer_jobs_collection.update_one(
+                {"job_id": job["job_id"], "status": job["status"], "updated_at": job["updated_at"]},
+                {"$set": update}
+            )
+            if result.modified_count == 0:
+                continue
+            if spooled:
+                requeued += 1
+                task = asyncio.create_task(TrailerJobService.run(job["job_id"]))
+                _recovered_jobs.add(task)
+                task.add_done_callback(_recovered_jobs.discard)
+            else:
+                failed += 1
+
+        active = trailer_jobs_collection.find({"status": {"$in": ACTIVE_STATUSES}}, {"_id": 0, "job_id": 1})
+        active_job_ids = {job["job_id"] async for job in active}
+        removed = await asyncio.to_thread(_remove_orphaned_spools, active_job_ids, stale_before)
+
+        summary = {"requeued": requeued, "failed": failed, "spools_removed": removed}
+        if requeued or failed or removed:
+            print(f"Recovered trailer jobs: {summary}")
+        return summary
+
+    @staticmethod
+    async def run(job_id: str):
+        """Upload a queued job's files and create the trailer. Meant to run as a background task."""
+        job = await trailer_jobs_collection.find_one({"job_id": job_id})
+        if not job or job["status"] != "queued":
+            return
+
+        loop = asyncio.get_running_loop()
+        total = job["bytes_total"] or 1
+        span = STAGE_PROGRESS["creating"] - STAGE_PROGRESS["uploading_video"]
+
+        def on_read(position: int):
+            # Called from the media thread once per chunk
+            progress = STAGE_PROGRESS["uploading_video"] + int(span * min(position, total) / total)
+            asyncio.run_coroutine_threadsafe(
+                trailer_jobs_collection.update_one(
+                    {"job_id": job_id, "stage": "uploading_video"},
+                    {
+                        "$max": {"bytes_uploaded": position, "progress": progress},
+                        "$set": {"updated_at": datetime.utcnow()}
+                    }
+                ),
+                loop
+            )
+
+        claimed = False
+        try:
+            async with _job_slots:
+                # Another worker may have recovered it while it waited
+                claimed = await TrailerJobService._claim(job_id)
+                if not claimed:
+                    return
+                thumbnail = await get_storage().save(
+                    job["thumbnail_path"], TRAILER_FOLDER, resource_type="image"
+                )
+
+                await TrailerJobService._set_stage(job_id, "uploading_video")
+                with _ProgressReader(job["video_path"], on_read) as reader:
+                    video = await get_storage().save(reader, TRAILER_FOLDER, resource_type="video")
+
+            await TrailerJobService._set_stage(job_id, "creating", bytes_uploaded=job["bytes_total"])
+            trailer = await TrailerService.create_trailer(TrailerCreate(
+                movie_id=job["movie_id"],
+                trailer_name=job["trailer_name"],
+                thumbnail_url=thumbnail["url"],
+                video_url=video["url"]
+            ))
+
+            await TrailerJobService._update(
+                job_id,
+                status="completed",
+                stage="completed",
+                progress=STAGE_PROGRESS["completed"],
+                trailer=trailer,
+                expires_at=datetime.utcnow() + timedelta(hours=TRAILER_JOB_TTL_HOURS)
+            )
+        except Exception as e:
+            print(f"Trailer job {job_id} failed: {str(e)}")
+            await TrailerJobService._update(
+                job_id,
+                status="failed",
+                error=str(e),
+                expires_at=datetime.utcnow() + timedelta(hours=TRAILER_JOB_TTL_HOURS)
+            )
+        finally:
+            if claimed:
+                shutil.rmtree(os.path.dirname(job["video_path"]), ignore_errors=True)
@@ -3,12 +3,19 @@ from typing import Optional, List
 from bson import ObjectId
 from movie_api.db.mongo import db
 from movie_api.schemas import TrailerCreate, TrailerUpdate
+from movie_api.utils.cache import catalog_cache, full_movie_key, trailers_key
+from mofi_common.variants import with_variants
 
 trailer_collection = db["trailers"]
 
 
 class TrailerService:
 
+    @staticmethod
+    async def invalidate_movie(movie_id: str):
+        """Drop cached reads that include this movie's trailers."""
+        await catalog_cache.invalidate(trailers_key(movie_id), full_movie_key(movie_id))
+
     @staticmethod
     def to_trailer_dict(tr):
         """Convert MongoDB document to dictionary format."""
@@ -20,6 +27,11 @@ class TrailerService:
             "video_url": tr.get("video_url"),
         }
 
+    @staticmethod
+    def thumbnail_variants(trailer: dict, width: Optional[int] = None, srcset: bool = False) -> dict:
+        """Resize/srcset the thumbnail of a serialized trailer"""
+        return with_variants(trailer, ("thumbnail_url",), width, srcset)
+
     @staticmethod
     async def create_trailer(data: TrailerCreate):
         """Create a new trailer."""
@@ -27,6 +39,7 @@ class TrailerService:
         trailer_dict["trailer_id"] = str(uuid.uuid4())   # Custom ID like movies
 
         await trailer_collection.insert_one(trailer_dict)
+        await TrailerService.invalidate_movie(trailer_dict["movie_id"])
 
         return TrailerService.to_trailer_dict(trailer_dict)
 
@@ -41,8 +54,11 @@ class TrailerService:
     @staticmethod
     async def get_trailers_by_movie_id(movie_id: str):
         """Get all trailers for a specific movie."""
-        trailers = await trailer_collection.find({"movie_id": movie_id}).to_list(None)
-        return [TrailerService.to_trailer_dict(t) for t in trailers]
+        async def load():
+            trailers = await trailer_collection.find({"movie_id": movie_id}).to_list(None)
+            return [TrailerService.to_trailer_dict(t) for t in trailers]
+
+        return await catalog_cache.get_or_load(trailers_key(movie_id), load)
 
     @staticmethod
     async def get_all_trailers():
@@ -73,10 +89,15 @@ class TrailerService:
             return None
 
         updated = await trailer_collection.find_one({"trailer_id": trailer_id})
+        await TrailerService.invalidate_movie(updated["movie_id"])
         return TrailerService.to_trailer_dict(updated)
 
     @staticmethod
     async def delete_trailer(trailer_id: str) -> bool:
         """Delete a trailer."""
-        result = await trailer_collection.delete_one({"trailer_id": trailer_id})
-        return result.deleted_count == 1
\ No newline at end of file
+        deleted = await trailer_collection.find_one_and_delete({"trailer_id": trailer_id})
+        if not deleted:
+            return False
+
+        await TrailerService.invalidate_movie(deleted["movie_id"])
+        return True
\ No newline at end of file
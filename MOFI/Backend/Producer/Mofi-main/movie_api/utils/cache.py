@@ -0,0 +1,192 @@
+# utils/cache.py
+"""
+Read-through cache for hot catalog reads (movie details, full movie details,
+trailers by movie).
+
+The default backend is a bounded in-process LRU with per-entry TTL. Setting
+CATALOG_CACHE_BACKEND=redis (and REDIS_URL) shares entries between workers
+through Redis instead; the `redis` package is only needed in that case.
+
+Writers call catalog_cache.invalidate(...) with the keys built by the *_key
+helpers below. Ratings and reactions are written by other services, so their
+counters on cached movies are only as fresh as CATALOG_CACHE_TTL.
+
+Invalidation reaches the worker that made the write: with the memory backend
+every worker (uvicorn --workers, gunicorn) keeps its own entries, and the
+others go on serving theirs for up to CATALOG_CACHE_TTL. Use Redis when
+writes must show up everywhere straight away. A load already running when its
+key is invalidated returns its result to its callers but does not cache it;
+with Redis that only holds for loads in the invalidating worker.
+"""
+import asyncio
+import copy
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+CACHE_BACKEND = os.getenv("CATALOG_CACHE_BACKEND", "memory")
+CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", 30))
+CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", 1024))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_MISSING = object()
+
+
+def movie_key(movie_id: str) -> str:
+    return f"movie:{movie_id}"
+
+
+def full_movie_key(movie_id: str) -> str:
+    return f"movie_full:{movie_id}"
+
+
+def trailers_key(movie_id: str) -> str:
+    return f"trailers:{movie_id}"
+
+
+class MemoryBackend:
+    """Bounded LRU with a TTL per entry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return _MISSING
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return _MISSING
+
+        self.entries.move_to_end(key)
+        # Hand out copies so callers cannot mutate the cached value
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value, ttl: float):
+        self.entries[key] = (time.monotonic() + ttl, copy.deepcopy(value))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self.entries)
+
+
+class RedisBackend:
+    """Shares entries between workers/processes through Redis"""
+
+    def __init__(self, url: str, prefix: str = "mofi:catalog:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    async def get(self, key: str):
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return _MISSING
+        return pickle.loads(raw)
+
+    async def set(self, key: str, value, ttl: float):
+        await self.client.set(self.prefix + key, pickle.dumps(value), px=int(ttl * 1000))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    def size(self):
+        return None
+
+
+class CatalogCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Concurrent misses for the same key share one loader call;
+        # invalidate() drops the entry so a stale load is not cached
+        self._inflight = {}
+
+    async def get_or_load(self, key: str, loader):
+        """
+        Return the cached value for key, or await loader(), cache and return
+        its result. None results are not cached.
+        """
+        value = await self.backend.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        future = self._inflight.get(key)
+        while future is not None:
+            try:
+                return copy.deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                # Only retry when the loading caller was cancelled, not us
+                if not future.cancelled():
+                    raise
+            future = self._inflight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            if value is not None and self._inflight.get(key) is future:
+                await self.backend.set(key, value, self.ttl)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; mark the exception as retrieved
+            future.exception()
+            raise
+        finally:
+            # A cancelled loader must still release callers waiting on it
+            if not future.done():
+                future.cancel()
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def invalidate(self, *keys: str):
+        self.invalidations += len(keys)
+        for key in keys:
+            # Loads started before the write may have read the old document
+            self._inflight.pop(key, None)
+        await self.backend.delete(*keys)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl_seconds": self.ttl,
+            "entries": self.backend.size(),
+            "max_entries": getattr(self.backend, "max_entries", None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.backend.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+def _build_backend():
+    if CACHE_BACKEND == "redis":
+        return RedisBackend(REDIS_URL)
+    return MemoryBackend(CACHE_MAX_ENTRIES)
+
+
+catalog_cache = CatalogCache(_build_backend(), CACHE_TTL)
@@ -1,8 +1,7 @@
 import cloudinary
-import cloudinary.uploader
 from dotenv import load_dotenv
 import os
-import re
+from mofi_common.storage import get_storage
 
 load_dotenv()
 
@@ -12,63 +11,42 @@ cloudinary.config(
     api_secret=os.getenv("CLOUD_API_SECRET"),
 )
 
-def upload_image(upload_file, folder: str):
-    file_bytes = upload_file.file.read()   
+# Uploads and deletes go through the MEDIA_STORAGE driver (Cloudinary by
+# default, or the local filesystem); the function names predate the switch.
 
-    return cloudinary.uploader.upload(
-        file_bytes,
-        folder=folder,
-        resource_type="image"
-    )["secure_url"]
-
-def upload_video(upload_file, folder: str):
-    file_bytes = upload_file.file.read()
-    result = cloudinary.uploader.upload(
-        file_bytes,
-        folder=folder,
-        resource_type="video"
+async def upload_image(upload_file, folder: str):
+    # The file is read and sent on the media thread pool, not the event loop
+    saved = await get_storage().save(
+        upload_file.file,
+        folder,
+        resource_type="image",
+        filename=upload_file.filename
     )
-    return result.get("secure_url")
-
+    return saved["url"]
+
+async def upload_video(upload_file, folder: str):
+    # Streamed from the spooled temp file in chunks, never read whole
+    saved = await get_storage().save(
+        upload_file.file,
+        folder,
+        resource_type="video",
+        filename=upload_file.filename
+    )
+    return saved["url"]
 
-def extract_public_id_from_url(url: str) -> str:
-    """Extract public ID from Cloudinary URL"""
-    # Remove protocol and split
-    url_parts = url.split('/')
-    
-    # Find the index of 'upload'
-    try:
-        upload_index = url_parts.index('upload')
-        # Get everything after upload
-        if len(url_parts) > upload_index + 1:
-            # Check if next part is a version (starts with 'v')
-            if url_parts[upload_index + 1].startswith('v'):
-                public_id_parts = url_parts[upload_index + 2:]
-            else:
-                public_id_parts = url_parts[upload_index + 1:]
-            
-            # Join parts and remove file extension
-            public_id = '/'.join(public_id_parts)
-            # Remove file extension if present
-            public_id = re.sub(r'\.[^/.]+$', '', public_id)
-            return public_id
-    except (ValueError, IndexError):
-        pass
-    
-    # Fallback: try to extract from URL pattern
-    pattern = r'/(?:v\d+/)?([^/]+/)*[^/.]+(?=\.\w+$)'
-    match = re.search(pattern, url)
-    if match:
-        return match.group(0).lstrip('/v0123456789/')
-    
-    raise ValueError(f"Cannot extract public ID from URL: {url}")
 
-def delete_cloudinary_file(file_url: str) -> bool:
-    """Delete file from Cloudinary by URL"""
+async def delete_cloudinary_file(file_url: str) -> bool:
+    """Delete a stored file by URL"""
     try:
-        public_id = extract_public_id_from_url(file_url)
-        result = cloudinary.uploader.destroy(public_id)
-        return result.get('result') == 'ok'
+        return await get_storage().delete_url(file_url)
     except Exception as e:
-        print(f"Failed to delete file from Cloudinary: {str(e)}")
-        return False
\ No newline at end of file
+        print(f"Failed to delete file from storage: {str(e)}")
+        return False
+
+async def delete_cloudinary_files(file_urls) -> dict:
+    """
+    Delete many stored files by URL (Cloudinary batches them through the
+    Admin API). Meant to run as a background task; failures are reported,
+    not raised.
+    """
+    return await get_storage().delete_urls(file_urls)
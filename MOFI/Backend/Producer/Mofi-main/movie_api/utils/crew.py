@@ -0,0 +1,14 @@
+# utils/crew.py
+"""
+Crew constants for the movie and accessible-movies code. The membership
+helpers themselves live in mofi_common.crew.
+"""
+
+# Full permission set granted to a movie's creator
+CREATOR_PERMISSIONS = {
+    "video": True,
+    "image": True,
+    "live": True,
+    "scripts": True,
+    "crew": True
+}
@@ -0,0 +1,36 @@
+# utils/upload_rules.py
+"""Per-route upload limits enforced by mofi_common.uploads.UploadLimitMiddleware"""
+import os
+from mofi_common.images import MAX_IMAGE_UPLOAD_BYTES
+from mofi_common.uploads import UploadRule
+from movie_api.services.movie_image_service import IMAGE_BATCH_MAX_FILES
+
+MAX_TRAILER_UPLOAD_BYTES = int(os.getenv("MAX_TRAILER_UPLOAD_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Room for the text fields and multipart headers around the files
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+POSTER_FILES = {"image1": "image", "image2": "image"}
+TRAILER_FILES = {"thumbnail": "image", "video": "video"}
+TRAILER_FILE_LIMITS = {"thumbnail": MAX_IMAGE_UPLOAD_BYTES, "video": MAX_TRAILER_UPLOAD_BYTES}
+
+UPLOAD_RULES = [
+    # Movies: two posters
+    UploadRule(["POST"], r"/movies/?", 2 * MAX_IMAGE_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+               files=POSTER_FILES, max_file_bytes=MAX_IMAGE_UPLOAD_BYTES),
+    UploadRule(["PUT"], r"/movies/?update/[^/]+", 2 * MAX_IMAGE_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+               files=POSTER_FILES, max_file_bytes=MAX_IMAGE_UPLOAD_BYTES),
+    # Trailers: thumbnail + video, each with its own limit
+    UploadRule(["POST"], r"/trailers/(create|jobs)",
+               MAX_TRAILER_UPLOAD_BYTES + MAX_IMAGE_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+               files=TRAILER_FILES, file_limits=TRAILER_FILE_LIMITS),
+    UploadRule(["PUT"], r"/trailers/[^/]+",
+               MAX_TRAILER_UPLOAD_BYTES + MAX_IMAGE_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+               files=TRAILER_FILES, file_limits=TRAILER_FILE_LIMITS),
+    # Movie stills
+    UploadRule(["POST"], r"/movie-images/create/movie_image", MAX_IMAGE_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+               files={"image": "image"}, max_file_bytes=MAX_IMAGE_UPLOAD_BYTES),
+    UploadRule(["POST"], r"/movie-images/create/movie_images",
+               IMAGE_BATCH_MAX_FILES * MAX_IMAGE_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+               files={"images": "image"}, max_file_bytes=MAX_IMAGE_UPLOAD_BYTES),
+]
@@ -0,0 +1,12 @@
+# utils/variants.py
+from typing import Optional
+from fastapi import HTTPException
+from mofi_common.variants import resolve_variant
+
+
+def variant_width(variant: Optional[str]) -> Optional[int]:
+    """Width for a ?variant= query value; raises HTTPException(400) for unknown names"""
+    try:
+        return resolve_variant(variant)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,5 +1,5 @@
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from mofi_common.mongo import get_client
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,7 +8,8 @@ MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("MONGO_DB_NAME")
 
 
-client = AsyncIOMotorClient(MONGO_URI)
+# Shared, configured pool (mofi_common.mongo); opened in the app lifespan
+client = get_client(MONGO_URI)
 db = client[DB_NAME]
 
 movies_collection = db["movies"]
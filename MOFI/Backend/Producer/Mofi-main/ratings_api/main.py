@@ -1,10 +1,52 @@
+import os
+import sys
+
+# Make the backend-wide mofi_common package importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from ratings_api.controllers.rating_controller import router
+from ratings_api.db.mongo import client, movies_collection, pre_ratings_collection, post_ratings_collection
+from mofi_common.indexes import apply_indexes
+from mofi_common import mongo
+from mofi_common import loopwatch
+from mofi_common.metrics import MetricsMiddleware, metrics_router
+from mofi_common.tracing import TracingMiddleware
+from mofi_common.query_audit import audit_router
+from mofi_common.profiling import ProfilingMiddleware, profile_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loopwatch.start()
+    await mongo.connect(client)
+    await apply_indexes({
+        "movies": movies_collection,
+        "pre_ratings": pre_ratings_collection,
+        "post_ratings": post_ratings_collection,
+    })
+    yield
+    loopwatch.stop()
+    mongo.close(client)
 
-app = FastAPI(title="Ratings API")
+
+app = FastAPI(title="Ratings API", lifespan=lifespan)
+
+app.add_middleware(ProfilingMiddleware, app_name="ratings")
+app.add_middleware(MetricsMiddleware, app_name="ratings")
+app.add_middleware(TracingMiddleware, service_name="ratings")
 
 app.include_router(router, tags=["Ratings"])
+app.include_router(metrics_router)
+app.include_router(loopwatch.loop_router)
+app.include_router(audit_router)
+app.include_router(profile_router)
 
 @app.get("/")
 def health():
     return {"message": "Ratings API running"}
+
+@app.get("/db/pool")
+def db_pool_stats():
+    return mongo.pool_stats()
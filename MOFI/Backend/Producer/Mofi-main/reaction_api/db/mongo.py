@@ -1,4 +1,4 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from mofi_common.mongo import get_client
 from dotenv import load_dotenv
 import os
 
@@ -12,7 +12,8 @@ MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 if not MONGO_URI or not MONGO_DB_NAME:
     raise Exception("MONGO_URI or MONGO_DB_NAME missing in .env")
 
-client = AsyncIOMotorClient(MONGO_URI)
+# Shared, configured pool (mofi_common.mongo); opened in the app lifespan
+client = get_client(MONGO_URI)
 db = client[MONGO_DB_NAME]
 
 # collections
@@ -1,6 +1,47 @@
+import os
+import sys
+
+# Make the backend-wide mofi_common package importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from reaction_api.controllers.reaction_controller import router
+from reaction_api.db.mongo import client, movies_collection, reactions_collection
+from mofi_common.indexes import apply_indexes
+from mofi_common import mongo
+from mofi_common import loopwatch
+from mofi_common.metrics import MetricsMiddleware, metrics_router
+from mofi_common.tracing import TracingMiddleware
+from mofi_common.query_audit import audit_router
+from mofi_common.profiling import ProfilingMiddleware, profile_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loopwatch.start()
+    await mongo.connect(client)
+    await apply_indexes({
+        "movies": movies_collection,
+        "reactions": reactions_collection,
+    })
+    yield
+    loopwatch.stop()
+    mongo.close(client)
 
-app = FastAPI(title="Reaction API")
+
+app = FastAPI(title="Reaction API", lifespan=lifespan)
+
+app.add_middleware(ProfilingMiddleware, app_name="reaction")
+app.add_middleware(MetricsMiddleware, app_name="reaction")
+app.add_middleware(TracingMiddleware, service_name="reaction")
 
 app.include_router(router)
+app.include_router(metrics_router)
+app.include_router(loopwatch.loop_router)
+app.include_router(audit_router)
+app.include_router(profile_router)
+
+@app.get("/db/pool")
+def db_pool_stats():
+    return mongo.pool_stats()
@@ -1,11 +1,38 @@
+import os
+import sys
+
+# Make the backend-wide mofi_common package importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from stream_api.controllers.stream_controller import router as stream_router
+from stream_api.db.mongo import client, streams_collection
+from mofi_common.indexes import apply_indexes
+from mofi_common import mongo
+from mofi_common import loopwatch
+from mofi_common.metrics import MetricsMiddleware, metrics_router
+from mofi_common.tracing import TracingMiddleware
+from mofi_common.query_audit import audit_router
+from mofi_common.profiling import ProfilingMiddleware, profile_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loopwatch.start()
+    await mongo.connect(client)
+    await apply_indexes({"streams": streams_collection})
+    yield
+    loopwatch.stop()
+    mongo.close(client)
+
 
 app = FastAPI(
     title="Live Stream API",
     description="Create and manage movie live streams",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -16,8 +43,22 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+app.add_middleware(ProfilingMiddleware, app_name="stream")
+
+# Added last so they are the outermost middleware and time every response
+app.add_middleware(MetricsMiddleware, app_name="stream")
+app.add_middleware(TracingMiddleware, service_name="stream")
+
 app.include_router(stream_router)
+app.include_router(metrics_router)
+app.include_router(loopwatch.loop_router)
+app.include_router(audit_router)
+app.include_router(profile_router)
 
 @app.get("/")
 def home():
     return {"message": "Stream API is running"}
+
+@app.get("/db/pool")
+def db_pool_stats():
+    return mongo.pool_stats()
@@ -1,13 +1,57 @@
+import os
+import sys
+
+# Make the backend-wide mofi_common package importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+# Imported before configuration so their Mongo command listeners see the client
+from mofi_common.metrics import MetricsMiddleware, metrics_router
+from mofi_common.tracing import TracingMiddleware
+from mofi_common.query_audit import audit_router
+from mofi_common.profiling import ProfilingMiddleware, profile_router
 from fastapi import APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from route.producer_auth import router as producer_router
 from route.producer_profile import router as producer_profile_router
 from route.producer_manage import router as producer_manage_router
 from route.crew import router as crew_router
+from configuration import producer_collection, crew_collection
+from mofi_common.indexes import apply_indexes
+from mofi_common import mongo
+from mofi_common import loopwatch
+from mofi_common.storage import storage_backend
+from mofi_common.images import MAX_IMAGE_UPLOAD_BYTES
+from mofi_common.uploads import UploadLimitMiddleware, UploadRule
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # configuration.py owns the client; build it with mofi_common.mongo.get_client
+    # to get the shared pool settings and metrics
+    client = producer_collection.database.client
+    loopwatch.start()
+    await mongo.connect(client)
+    await apply_indexes({
+        "Producers": producer_collection,
+        "crew_members": crew_collection,
+    })
+    yield
+    loopwatch.stop()
+    mongo.close(client)
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Profile pictures: size and type enforced while the body arrives.
+# Added before CORS so CORS headers are also set on 413/415 rejections
+app.add_middleware(UploadLimitMiddleware, rules=[
+    UploadRule(["POST"], r"/auth/register", MAX_IMAGE_UPLOAD_BYTES + 1024 * 1024,
+               files={"profile_pic": "image"}, max_file_bytes=MAX_IMAGE_UPLOAD_BYTES),
+    UploadRule(["PUT"], r"/producer/update/profile", MAX_IMAGE_UPLOAD_BYTES + 1024 * 1024,
+               files={"profile_pic": "image"}, max_file_bytes=MAX_IMAGE_UPLOAD_BYTES),
+])
 
 origins = ["http://localhost:5174"]
 
@@ -19,7 +63,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ProfilingMiddleware, app_name="producer")
+
+# Added last so they are the outermost middleware and time every response
+app.add_middleware(MetricsMiddleware, app_name="producer")
+app.add_middleware(TracingMiddleware, service_name="producer")
+
 app.include_router(producer_router)
 app.include_router(producer_profile_router)
 app.include_router(producer_manage_router)
 app.include_router(crew_router)
+app.include_router(metrics_router)
+app.include_router(loopwatch.loop_router)
+app.include_router(audit_router)
+app.include_router(profile_router)
+
+# Locally stored media is served by the app itself
+if storage_backend() == "local":
+    from mofi_common.storage.local import media_router
+    app.include_router(media_router)
@@ -4,6 +4,8 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from configuration import crew_collection  
+from mofi_common.crew import build_membership, membership_query, memberships_to_dict
+from utils.crew_utils import find_membership, migrate_member
 
 router = APIRouter(prefix="/crew", tags=["crew"])
 
@@ -45,24 +47,25 @@ async def get_crew_members(movie_id: str):
     Returns flattened structure for frontend
     """
     try:
-        # Find crew members who have worked on this movie
+        # Served by the (memberships.movie_id, linkedin_id) index; only this
+        # movie's membership is projected
         crew_members = await crew_collection.find(
-            {f"movies.{movie_id}": {"$exists": True}}
+            membership_query(movie_id),
+            {"linkedin_id": 1, "memberships": {"$elemMatch": {"movie_id": movie_id}}}
         ).to_list(length=None)
         
         response = []
         for member in crew_members:
-            movie_data = member["movies"].get(movie_id)
-            if movie_data:
-                response.append({
-                    "id": str(member["_id"]),
-                    "linkedin_id": member["linkedin_id"],
-                    "movie_id": movie_id,
-                    "contribution": movie_data.get("contribution", ""),
-                    "permissions": movie_data.get("permissions", {}),
-                    "created_at": movie_data.get("created_at"),
-                    "updated_at": movie_data.get("updated_at")
-                })
+            movie_data = memberships_to_dict(member)[movie_id]
+            response.append({
+                "id": str(member["_id"]),
+                "linkedin_id": member["linkedin_id"],
+                "movie_id": movie_id,
+                "contribution": movie_data.get("contribution", ""),
+                "permissions": movie_data.get("permissions", {}),
+                "created_at": movie_data.get("created_at"),
+                "updated_at": movie_data.get("updated_at")
+            })
         
         return response
     except Exception as e:
@@ -73,6 +76,19 @@ async def get_crew_members(movie_id: str):
 async def add_crew_member(crew_data: CrewMemberCreate):
     try:
         now = datetime.utcnow()
+        movie_id = crew_data.movie_data.movie_id
+        membership = build_membership(
+            movie_id,
+            crew_data.movie_data.contribution,
+            {
+                "video": crew_data.movie_data.permissions.video,
+                "image": crew_data.movie_data.permissions.image,
+                "live": crew_data.movie_data.permissions.live,
+                "scripts": crew_data.movie_data.permissions.scripts,
+                "crew": crew_data.movie_data.permissions.crew
+            },
+            now
+        )
         
         # Check if crew member already exists
         existing_crew = await crew_collection.find_one({
@@ -80,85 +96,50 @@ async def add_crew_member(crew_data: CrewMemberCreate):
         })
         
         if existing_crew:
-            # Crew member exists, add new movie data
-            movie_id = crew_data.movie_data.movie_id
+            # Convert legacy movies map before touching memberships
+            existing_crew = await migrate_member(crew_collection, existing_crew)
             
             # Check if already working on this movie
-            if movie_id in existing_crew.get("movies", {}):
+            if find_membership(existing_crew, movie_id):
                 raise HTTPException(
                     status_code=400, 
                     detail=f"Crew member already added to movie {movie_id}"
                 )
             
             # Add new movie data
-            update_data = {
-                f"movies.{movie_id}": {
-                    "contribution": crew_data.movie_data.contribution,
-                    "permissions": {
-                        "video": crew_data.movie_data.permissions.video,
-                        "image": crew_data.movie_data.permissions.image,
-                        "live": crew_data.movie_data.permissions.live,
-                        "scripts": crew_data.movie_data.permissions.scripts,
-                        "crew": crew_data.movie_data.permissions.crew
-                    },
-                    "created_at": now,
-                    "updated_at": now
-                },
-                "updated_at": now
-            }
-            
             result = await crew_collection.update_one(
-                {"_id": existing_crew["_id"]},
-                {"$set": update_data}
+                {"_id": existing_crew["_id"], "memberships.movie_id": {"$ne": movie_id}},
+                {"$push": {"memberships": membership}, "$set": {"updated_at": now}}
             )
             
-            # Get updated document
-            updated = await crew_collection.find_one({"_id": existing_crew["_id"]})
-            movie_data = updated["movies"][movie_id]
+            if result.modified_count == 0:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Crew member already added to movie {movie_id}"
+                )
             
-            return {
-                "id": str(updated["_id"]),
-                "linkedin_id": updated["linkedin_id"],
-                "movie_id": movie_id,
-                "contribution": movie_data["contribution"],
-                "permissions": movie_data["permissions"],
-                "created_at": movie_data["created_at"],
-                "updated_at": movie_data["updated_at"]
-            }
+            crew_id = existing_crew["_id"]
         else:
             # Create new crew member
             crew_member = {
                 "linkedin_id": crew_data.linkedin_id,
-                "movies": {
-                    crew_data.movie_data.movie_id: {
-                        "contribution": crew_data.movie_data.contribution,
-                        "permissions": {
-                            "video": crew_data.movie_data.permissions.video,
-                            "image": crew_data.movie_data.permissions.image,
-                            "live": crew_data.movie_data.permissions.live,
-                            "scripts": crew_data.movie_data.permissions.scripts,
-                            "crew": crew_data.movie_data.permissions.crew
-                        },
-                        "created_at": now,
-                        "updated_at": now
-                    }
-                },
+                "memberships": [membership],
                 "created_at": now,
                 "updated_at": now
             }
             
             result = await crew_collection.insert_one(crew_member)
-            movie_data = crew_member["movies"][crew_data.movie_data.movie_id]
-            
-            return {
-                "id": str(result.inserted_id),
-                "linkedin_id": crew_data.linkedin_id,
-                "movie_id": crew_data.movie_data.movie_id,
-                "contribution": movie_data["contribution"],
-                "permissions": movie_data["permissions"],
-                "created_at": movie_data["created_at"],
-                "updated_at": movie_data["updated_at"]
-            }
+            crew_id = result.inserted_id
+        
+        return {
+            "id": str(crew_id),
+            "linkedin_id": crew_data.linkedin_id,
+            "movie_id": movie_id,
+            "contribution": membership["contribution"],
+            "permissions": membership["permissions"],
+            "created_at": membership["created_at"],
+            "updated_at": membership["updated_at"]
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -168,21 +149,28 @@ async def add_crew_member(crew_data: CrewMemberCreate):
 @router.delete("/{crew_id}/movie/{movie_id}")
 async def delete_crew_member_from_movie(crew_id: str, movie_id: str):
     try:
+        # Pull from memberships and drop any legacy movies.<id> key in one write
         result = await crew_collection.update_one(
             {"_id": ObjectId(crew_id)},
-            {"$unset": {f"movies.{movie_id}": ""}}
+            {
+                "$pull": {"memberships": {"movie_id": movie_id}},
+                "$unset": {f"movies.{movie_id}": ""}
+            }
         )
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Crew member not found or not associated with this movie")
         
-        # Check if crew member has any other movies
-        crew = await crew_collection.find_one({"_id": ObjectId(crew_id)})
-        if not crew.get("movies"):
-            # Delete entire crew member if no movies left
-            await crew_collection.delete_one({"_id": ObjectId(crew_id)})
+        # Delete entire crew member if no movies left
+        await crew_collection.delete_one({
+            "_id": ObjectId(crew_id),
+            "memberships.0": {"$exists": False},
+            "movies": {"$in": [None, {}]}
+        })
         
         return {"message": "Crew member removed from movie successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete crew member: {str(e)}")
 
@@ -202,14 +190,14 @@ async def edit_crew_member_for_movie(crew_id: str, movie_id: str, crew_data: Cre
         # Update movie-specific data if provided
         if crew_data.movie_data is not None:
             movie_update = {
-                f"movies.{movie_id}.updated_at": datetime.utcnow()
+                "memberships.$.updated_at": datetime.utcnow()
             }
             
             if crew_data.movie_data.contribution:
-                movie_update[f"movies.{movie_id}.contribution"] = crew_data.movie_data.contribution
+                movie_update["memberships.$.contribution"] = crew_data.movie_data.contribution
             
             if crew_data.movie_data.permissions:
-                movie_update[f"movies.{movie_id}.permissions"] = {
+                movie_update["memberships.$.permissions"] = {
                     "video": crew_data.movie_data.permissions.video,
                     "image": crew_data.movie_data.permissions.image,
                     "live": crew_data.movie_data.permissions.live,
@@ -221,17 +209,22 @@ async def edit_crew_member_for_movie(crew_id: str, movie_id: str, crew_data: Cre
             if len(movie_update) > 1:  # More than just updated_at
                 update_fields.update(movie_update)
         
-        result = await crew_collection.update_one(
-            {"_id": ObjectId(crew_id), f"movies.{movie_id}": {"$exists": True}},
-            {"$set": update_fields}
-        )
+        query = {"_id": ObjectId(crew_id), "memberships.movie_id": movie_id}
+        result = await crew_collection.update_one(query, {"$set": update_fields})
+        
+        if result.matched_count == 0:
+            # The document may still use the legacy movies map
+            crew = await crew_collection.find_one({"_id": ObjectId(crew_id)})
+            if crew and crew.get("movies"):
+                await migrate_member(crew_collection, crew)
+                result = await crew_collection.update_one(query, {"$set": update_fields})
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Crew member not found for this movie")
         
-        # Get updated document
-        updated = await crew_collection.find_one({"_id": ObjectId(crew_id)})
-        movie_data = updated["movies"][movie_id]
+        # Get updated membership only
+        updated = await crew_collection.find_one(query, {"linkedin_id": 1, "memberships.$": 1})
+        movie_data = updated["memberships"][0]
         
         return {
             "id": str(updated["_id"]),
@@ -242,6 +235,8 @@ async def edit_crew_member_for_movie(crew_id: str, movie_id: str, crew_data: Cre
             "created_at": movie_data["created_at"],
             "updated_at": movie_data["updated_at"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update crew member: {str(e)}")
 
@@ -256,9 +251,11 @@ async def get_crew_member(crew_id: str):
         return {
             "id": str(crew["_id"]),
             "linkedin_id": crew["linkedin_id"],
-            "movies": crew.get("movies", {}),
+            "movies": memberships_to_dict(crew),
             "created_at": crew.get("created_at"),
             "updated_at": crew.get("updated_at", crew.get("created_at"))
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch crew member: {str(e)}")
\ No newline at end of file
@@ -9,6 +9,7 @@ import asyncio
 from configuration import producer_collection
 from utils.password_utils import hash_password, verify_password
 from utils.cloudinary_utils import upload_profile_image_file, delete_image
+from mofi_common.variants import avatar_srcset
 from utils.email_utils import send_verification_email
 from utils.token_utils import create_access_token, create_refresh_token, decode_access_token, decode_refresh_token
 from bson import ObjectId
@@ -18,6 +19,7 @@ JWT_SECRET = os.getenv("JWT_SECRET")
 ALGO = "HS256"
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5174")
 UNVERIFIED_DELETE_DAYS = int(os.getenv("UNVERIFIED_DELETE_DAYS", 7))
+REFRESH_EXPIRE_DAYS = int(os.getenv("REFRESH_EXPIRE_DAYS", 15))
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -56,7 +58,7 @@ async def register_user(
 
     try:
         if profile_pic:
-            up = upload_profile_image_file(profile_pic)
+            up = await upload_profile_image_file(profile_pic)
             if not up:
                 raise HTTPException(status_code=400, detail="Profile upload failed")
             pic_url, pic_id = up["url"], up["public_id"]
@@ -64,7 +66,7 @@ async def register_user(
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
        
-        if pic_id: delete_image(pic_id)
+        if pic_id: await delete_image(pic_id)
         raise HTTPException(status_code=400, detail="Image upload error")
 
     now = datetime.utcnow()
@@ -170,6 +172,7 @@ async def login(payload: dict, response: Response):
             "first_name": user.get("first_name"),  # null for assistant
             "professionalName": user.get("professionalName"),
             "profile_pic": user.get("profile_pic"),
+            "profile_pic_srcset": avatar_srcset(user.get("profile_pic")),
         }
     }
 
@@ -202,7 +205,7 @@ async def refresh(request: Request, response: Response):
         httponly=True,
         secure=False, 
         samesite="lax",
-        max_age=60 * 60 * 24 * int(os.getenv("REFRESH_EXPIRE_DAYS", 15))
+        max_age=60 * 60 * 24 * REFRESH_EXPIRE_DAYS
     )
 
     return {
@@ -247,6 +250,7 @@ async def me(request: Request):
         "professionalName": user.get("professionalName"),
         "first_name": user.get("first_name"),
         "profile_pic": user.get("profile_pic"),
+        "profile_pic_srcset": avatar_srcset(user.get("profile_pic")),
     }
 
 
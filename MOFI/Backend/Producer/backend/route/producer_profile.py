@@ -2,6 +2,7 @@ from datetime import datetime
 from configuration import producer_collection,assistant_collection
 from utils.password_utils import hash_password, verify_password
 from utils.cloudinary_utils import upload_profile_image_file, delete_image
+from mofi_common.variants import avatar_srcset
 from utils.email_utils import send_verification_email
 from utils.token_utils import create_access_token, create_refresh_token, decode_access_token, decode_refresh_token
 from bson import ObjectId
@@ -37,6 +38,7 @@ async def get_profile(request: Request):
         "last_name": user.get("last_name"),
         "professionalName": user.get("professionalName"),
         "profile_pic": user.get("profile_pic"),
+        "profile_pic_srcset": avatar_srcset(user.get("profile_pic")),
         "contact": user.get("contact"),
         "dob": user.get("dob"),
         "nic_number": user.get("nic_number"),
@@ -118,7 +120,7 @@ async def update_profile(
                 background_tasks.add_task(delete_image, old_pic_id)
             
             # Upload new picture
-            up = upload_profile_image_file(profile_pic)
+            up = await upload_profile_image_file(profile_pic)
             if not up:
                 raise HTTPException(status_code=400, detail="Profile upload failed")
             
@@ -148,6 +150,7 @@ async def update_profile(
             "last_name": updated_user.get("last_name"),
             "professionalName": updated_user.get("professionalName"),
             "profile_pic": updated_user.get("profile_pic"),
+            "profile_pic_srcset": avatar_srcset(updated_user.get("profile_pic")),
             "contact": updated_user.get("contact"),
             "dob": updated_user.get("dob"),
             "nic_number": updated_user.get("nic_number"),
@@ -0,0 +1,78 @@
+# scripts/migrate_crew_memberships.py
+"""
+Online migration: crew_members `movies.<movie_id>` map -> `memberships` array.
+
+Safe to run while the API is serving traffic. Each document is rewritten with a
+filter pinned to its current `movies` value, so a concurrent write causes that
+document to be skipped and picked up again on the next pass instead of being
+overwritten. The routes also convert documents lazily when they touch them.
+
+Required deploy step: lookups by movie only match the `memberships` array, so
+run this (until "remaining" is 0) before serving the new code.
+
+Usage (from the backend folder):
+    python -m scripts.migrate_crew_memberships [--batch-size 500] [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from configuration import crew_collection
+from utils.crew_utils import migration_update
+from mofi_common.indexes import apply_indexes
+
+MAX_PASSES = 10
+
+
+async def migrate(batch_size: int, dry_run: bool) -> dict:
+    stats = {"scanned": 0, "migrated": 0, "passes": 0}
+
+    for _ in range(MAX_PASSES):
+        stats["passes"] += 1
+        pending = 0
+        ops = []
+
+        cursor = crew_collection.find({"movies": {"$exists": True}}).batch_size(batch_size)
+        async for member in cursor:
+            stats["scanned"] += 1
+            op = migration_update(member)
+            if op is None:
+                continue
+            pending += 1
+            ops.append(op)
+
+            if len(ops) >= batch_size:
+                if not dry_run:
+                    result = await crew_collection.bulk_write(ops, ordered=False)
+                    stats["migrated"] += result.modified_count
+                ops = []
+
+        if ops and not dry_run:
+            result = await crew_collection.bulk_write(ops, ordered=False)
+            stats["migrated"] += result.modified_count
+
+        if dry_run or pending == 0:
+            break
+
+    stats["remaining"] = await crew_collection.count_documents({"movies": {"$exists": True}})
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Migrate crew_members to the memberships array")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        await apply_indexes({"crew_members": crew_collection})
+
+    stats = await migrate(args.batch_size, args.dry_run)
+    print(f"Crew membership migration {'(dry run) ' if args.dry_run else ''}finished: {stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,6 +3,10 @@ import cloudinary
 import cloudinary.uploader
 from dotenv import load_dotenv
 import os
+from mofi_common.metrics import track_external
+from mofi_common.settings import cloudinary_options
+from mofi_common.storage import get_storage
+from mofi_common.uploads import sniff_file
 
 load_dotenv()
 
@@ -13,43 +17,47 @@ cloudinary.config(
     secure=True
 )
 
-ALLOWED = {"image/jpeg", "image/jpg", "image/png", "image/webp"}
+ALLOWED = {"image/jpeg", "image/png", "image/webp"}
 
-def upload_profile_image_file(upload_file):
+async def upload_profile_image_file(upload_file):
     # upload_file is starlette UploadFile
-    if not hasattr(upload_file, "content_type") or upload_file.content_type not in ALLOWED:
+    # checked against the file's magic bytes, not the client's content type
+    if not hasattr(upload_file, "file") or sniff_file(upload_file.file) not in ALLOWED:
         raise ValueError("Invalid image type. Allowed: JPG, PNG, WEBP")
     try:
-        # pass file.file (a file-like object)
-        res = cloudinary.uploader.upload(
+        # pass file.file (a file-like object); saved by the MEDIA_STORAGE driver
+        res = await get_storage().save(
             upload_file.file,
-            folder="producers/profile_pics",
+            "producers/profile_pics",
             resource_type="image",
+            filename=upload_file.filename,
             unique_filename=True,
             overwrite=False
         )
-        return {"url": res.get("secure_url"), "public_id": res.get("public_id")}
+        return {"url": res["url"], "public_id": res["public_id"]}
     except Exception as e:
         print("Cloudinary upload error:", e)
         return None
 
 def upload_image_from_url(image_url: str):
     try:
-        return cloudinary.uploader.upload(
-            image_url,
-            folder="producers/profile_pics",
-            use_filename=True,
-            unique_filename=True
-        )
+        with track_external("cloudinary", "upload_url"):
+            return cloudinary.uploader.upload(
+                image_url,
+                folder="producers/profile_pics",
+                use_filename=True,
+                unique_filename=True,
+                **cloudinary_options()
+            )
     except Exception as e:
         print("Cloudinary URL upload error:", e)
         return None
 
-def delete_image(public_id: str):
+async def delete_image(public_id: str):
     if not public_id:
         return True
     try:
-        cloudinary.uploader.destroy(public_id)
+        await get_storage().delete(public_id)
         return True
     except:
         return False
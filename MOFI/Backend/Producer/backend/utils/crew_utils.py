@@ -0,0 +1,48 @@
+# utils/crew_utils.py
+"""
+Producer-side helpers for the crew membership representation described in
+mofi_common.crew.
+
+Documents that still carry the legacy {"movies": {movie_id: {...}}} map are
+converted lazily on write (migrate_member) or in bulk by
+scripts/migrate_crew_memberships.py. Lookups by movie (membership_query) only
+match the array, so that script is a required deploy step: documents it has
+not converted are invisible to them.
+"""
+from pymongo import UpdateOne
+from mofi_common.crew import memberships_to_dict
+
+
+def find_membership(member: dict, movie_id: str):
+    return memberships_to_dict(member).get(movie_id)
+
+
+def migration_update(member: dict):
+    """
+    Build the UpdateOne that converts one legacy document, or None if it has
+    nothing left to convert. The filter pins the current `movies` value so a
+    concurrent write is never overwritten; such documents are simply retried.
+    """
+    legacy = member.get("movies")
+    if legacy is None:
+        return None
+
+    existing = {m["movie_id"] for m in member.get("memberships") or []}
+    converted = [
+        dict(data, movie_id=movie_id)
+        for movie_id, data in legacy.items()
+        if movie_id not in existing
+    ]
+    return UpdateOne(
+        {"_id": member["_id"], "movies": legacy},
+        {"$push": {"memberships": {"$each": converted}}, "$unset": {"movies": ""}}
+    )
+
+
+async def migrate_member(crew_collection, member: dict) -> dict:
+    """Convert a single legacy document in place and return the fresh copy"""
+    op = migration_update(member)
+    if op is None:
+        return member
+    await crew_collection.bulk_write([op])
+    return await crew_collection.find_one({"_id": member["_id"]})
@@ -1,15 +1,52 @@
+import os
+import sys
+
+# Make the backend-wide mofi_common package importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+# Imported before configuration so their Mongo command listeners see the client
+from mofi_common.metrics import MetricsMiddleware, metrics_router
+from mofi_common.tracing import TracingMiddleware
+from mofi_common.query_audit import audit_router
+from mofi_common.profiling import ProfilingMiddleware, profile_router
 from routes.auth_routes import Router
 from routes.auth_login import UserRouter
-from configuration import client
+from configuration import client, user_collection
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from mofi_common.indexes import apply_indexes
+from mofi_common import mongo
+from mofi_common import loopwatch
+from mofi_common.http import close_http_client
+from mofi_common.storage import storage_backend
+from mofi_common.images import MAX_IMAGE_UPLOAD_BYTES
+from mofi_common.uploads import UploadLimitMiddleware, UploadRule
 load_dotenv()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # user_collection is a synchronous PyMongo collection; apply_indexes
+    # and the pool warm-up run in a worker thread
+    loopwatch.start()
+    await mongo.connect(client)
+    await apply_indexes({"users": user_collection})
+    yield
+    await close_http_client()
+    loopwatch.stop()
+    mongo.close(client)
+
 
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+# Profile pictures: size and type enforced while the body arrives.
+# Added before CORS so CORS headers are also set on 413/415 rejections
+app.add_middleware(UploadLimitMiddleware, rules=[
+    UploadRule(["POST"], r"/auth/register", MAX_IMAGE_UPLOAD_BYTES + 1024 * 1024,
+               files={"file": "image"}, max_file_bytes=MAX_IMAGE_UPLOAD_BYTES),
+])
 
 
 app.add_middleware(
@@ -20,6 +57,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ProfilingMiddleware, app_name="user")
+
+# Added last so they are the outermost middleware and time every response
+app.add_middleware(MetricsMiddleware, app_name="user")
+app.add_middleware(TracingMiddleware, service_name="user")
+
 app.include_router(Router)
 app.include_router(UserRouter)
+app.include_router(metrics_router)
+app.include_router(loopwatch.loop_router)
+app.include_router(audit_router)
+app.include_router(profile_router)
+
+# Locally stored media is served by the app itself
+if storage_backend() == "local":
+    from mofi_common.storage.local import media_router
+    app.include_router(media_router)
 
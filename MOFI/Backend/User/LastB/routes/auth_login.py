@@ -4,12 +4,15 @@ from fastapi.responses import RedirectResponse
 from passlib.context import CryptContext
 from bson import ObjectId
 from datetime import datetime
-import httpx
 from jose import jwt as jose_jwt
-import os
 from configuration import user_collection
 from utils.token_utils import create_access_token, create_refresh_token, decode_token
-from utils.oauth_utils import google_auth_url, generate_username_from_name
+from utils.oauth_utils import (
+    GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI, google_auth_url, generate_username_from_name
+)
+from mofi_common.variants import avatar_srcset
+from mofi_common.http import get_http_client
+from mofi_common.metrics import track_external
 
 UserRouter = APIRouter(prefix="/auth", tags=["auth"])
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -44,7 +47,8 @@ async def login(data: dict, response: Response):
             "id": user_id,
             "email": user["email"],
             "name": user.get("name"),
-            "picture": user.get("profile_pic")
+            "picture": user.get("profile_pic"),
+            "picture_srcset": avatar_srcset(user.get("profile_pic"))
         }
     }
 
@@ -100,7 +104,8 @@ async def me(request: Request):
         "id": str(user["_id"]),
         "email": user["email"],
         "name": user.get("name"),
-        "picture": user.get("profile_pic")
+        "picture": user.get("profile_pic"),
+        "picture_srcset": avatar_srcset(user.get("profile_pic"))
     }
 
 # -------------------- GOOGLE LOGIN --------------------
@@ -117,16 +122,19 @@ async def google_callback(code: str):
     # 1️⃣ Exchange code for tokens
     token_url = "https://oauth2.googleapis.com/token"
     payload = {
-        "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-        "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
+        "client_id": GOOGLE_CLIENT_ID,
+        "client_secret": GOOGLE_CLIENT_SECRET,
         "code": code,
         "grant_type": "authorization_code",
-        "redirect_uri": os.getenv("GOOGLE_REDIRECT_URI"),
+        "redirect_uri": GOOGLE_REDIRECT_URI,
     }
 
-    async with httpx.AsyncClient() as client:
-        google_resp = await client.post(token_url, data=payload)
-        token_data = google_resp.json()
+    # Shared keep-alive client instead of a new connection per callback
+    with track_external("google_oauth", "token") as call:
+        google_resp = await get_http_client().post(token_url, data=payload)
+        if google_resp.status_code >= 400:
+            call.fail()
+    token_data = google_resp.json()
 
     if "id_token" not in token_data:
         raise HTTPException(status_code=400, detail="Google auth failed")
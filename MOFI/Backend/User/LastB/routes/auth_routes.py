@@ -54,13 +54,13 @@ async def register_user(
     cloud_id = None
 
     if file:
-        uploaded = upload_profile_image(file)
+        uploaded = await upload_profile_image(file)
 
-    if not uploaded:
-        raise HTTPException(status_code=400, detail="Image upload failed")
+        if not uploaded:
+            raise HTTPException(status_code=400, detail="Image upload failed")
 
-    cloud_url = uploaded["url"]
-    cloud_id = uploaded["public_id"]
+        cloud_url = uploaded["url"]
+        cloud_id = uploaded["public_id"]
 
 
 
@@ -88,7 +88,7 @@ async def register_user(
 
 
     if not send_verification_email(username, email, token):
-        delete_image(cloud_id)
+        await delete_image(cloud_id)
         user_collection.delete_one({"_id": inserted.inserted_id})
         raise HTTPException(status_code=500, detail="Failed to send verification email")
 
@@ -2,6 +2,10 @@ import cloudinary
 import cloudinary.uploader
 import os
 from dotenv import load_dotenv
+from mofi_common.metrics import track_external
+from mofi_common.settings import cloudinary_options
+from mofi_common.storage import get_storage
+from mofi_common.uploads import sniff_file
 
 load_dotenv()
 
@@ -13,26 +17,28 @@ cloudinary.config(
 )
 
 
-def upload_profile_image(file):
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
+async def upload_profile_image(file):
+    allowed_types = ["image/jpeg", "image/png", "image/webp"]
 
-    # Validate type
-    if not hasattr(file, "content_type") or file.content_type not in allowed_types:
+    # Validate type from the file's magic bytes, not the client's content type
+    if not hasattr(file, "file") or sniff_file(file.file) not in allowed_types:
         raise ValueError("Invalid image type. Allowed: JPG, PNG, WEBP")
 
     try:
         # 🔥 FIX: Cloudinary requires file.file, not file or coroutine
-        result = cloudinary.uploader.upload(
+        # Saved by the MEDIA_STORAGE driver off the event loop
+        result = await get_storage().save(
             file.file,   # <<< THIS FIXES THE ERROR
-            folder="users/profile_pics",
+            "users/profile_pics",
             resource_type="image",
+            filename=file.filename,
             unique_filename=True,
             overwrite=False
         )
 
         return {
-            "url": result.get("secure_url"),
-            "public_id": result.get("public_id")
+            "url": result["url"],
+            "public_id": result["public_id"]
         }
 
     except Exception as e:
@@ -41,14 +47,14 @@ def upload_profile_image(file):
 
 
 
-def delete_image(public_id: str):
+async def delete_image(public_id: str):
     """
     Delete image safely (no throw)
     """
     if not public_id:
         return True
     try:
-        cloudinary.uploader.destroy(public_id)
+        await get_storage().delete(public_id)
         return True
     except:
         return False
@@ -59,12 +65,14 @@ def upload_image_from_url(image_url: str):
     Keep this for Google login callback
     """
     try:
-        return cloudinary.uploader.upload(
-            image_url,
-            folder="users/profile_pics",
-            use_filename=True,
-            unique_filename=True
-        )
+        with track_external("cloudinary", "upload_url"):
+            return cloudinary.uploader.upload(
+                image_url,
+                folder="users/profile_pics",
+                use_filename=True,
+                unique_filename=True,
+                **cloudinary_options()
+            )
     except Exception as e:
         print("Cloudinary URL Upload Error:", e)
         return None
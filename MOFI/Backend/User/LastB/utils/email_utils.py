@@ -3,6 +3,8 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 from dotenv import load_dotenv
+from mofi_common.metrics import track_external
+from mofi_common.tracing import span
 
 load_dotenv()   
 
@@ -21,7 +23,8 @@ def send_email(to_email: str, subject: str, html_content: str):
 
         message.attach(MIMEText(html_content, "html"))
 
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
+        with span("smtp.send", "smtp"), track_external("smtp", "send"), \
+                smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
             server.starttls()
             server.login(SENDER_EMAIL, SENDER_PASSWORD)
             server.send_message(message)
@@ -0,0 +1,146 @@
+"""
+Benchmark: accessible-movies dashboard, N+1 lookups vs one $in query.
+
+Seeds a scratch database with one producer who owns/crews N movies, then times
+the legacy per-movie find_one loop against the current
+movie_api.controllers.accessible_movies_controller implementation.
+
+Usage (from MOFI/Backend):
+    python benchmarks/bench_accessible_movies.py --movies 300 --runs 20
+
+Needs a reachable MongoDB (default mongodb://localhost:27017). Everything is
+written to the BENCH_DB_NAME database (default "mofi_bench"), which is dropped
+at the end.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "Producer", "Mofi-main"))
+
+BENCH_URI = os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017")
+BENCH_DB_NAME = os.getenv("BENCH_DB_NAME", "mofi_bench")
+os.environ.setdefault("MONGO_URI", BENCH_URI)
+os.environ.setdefault("MONGO_DB_NAME", BENCH_DB_NAME)
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from movie_api.controllers import accessible_movies_controller as controller  # noqa: E402
+
+
+async def legacy_accessible_movies(db, crew_collection, linkedin_id):
+    """The pre-optimisation path: one find_one per movie, then an O(n^2) merge."""
+    accessible_movies = []
+    crew_member = await crew_collection.find_one({"linkedin_id": linkedin_id})
+    if crew_member:
+        for movie_id, movie_data in crew_member.get("movies", {}).items():
+            movie = await db.movies.find_one({"movie_id": movie_id})
+            if movie:
+                is_creator = movie_data.get("contribution") == "Creator"
+                accessible_movies.append({
+                    "movie_id": movie.get("movie_id"),
+                    "title": movie.get("title"),
+                    "access_type": "creator" if is_creator else "crew_member",
+                })
+
+    created_movies = await db.movies.find({"user_id": linkedin_id}).to_list(length=None)
+    for movie in created_movies:
+        if not any(m["movie_id"] == movie["movie_id"] for m in accessible_movies):
+            accessible_movies.append({
+                "movie_id": movie.get("movie_id"),
+                "title": movie.get("title"),
+                "access_type": "creator",
+            })
+    return accessible_movies
+
+
+async def seed(db, crew_collection, linkedin_id, count):
+    movies = []
+    memberships = {}
+    for i in range(count):
+        movie_id = str(uuid.uuid4())
+        # Every third movie predates the crew collection (backward-compat path)
+        legacy = i % 3 == 0
+        movies.append({
+            "movie_id": movie_id,
+            "user_id": linkedin_id if legacy or i % 2 == 0 else "someone-else",
+            "imdbID": f"tt{i:07d}",
+            "type": "movie",
+            "title": f"Bench Movie {i}",
+            "description": "x" * 200,
+            "directors": ["A"],
+            "writers": ["B"],
+            "genres": ["Drama"],
+            "release_date": "2025-01-01T00:00:00Z",
+            "duration": "120",
+            "image1": "https://example.com/1.jpg",
+            "image2": "https://example.com/2.jpg",
+        })
+        if not legacy:
+            memberships[movie_id] = {
+                "contribution": "Creator" if i % 2 == 0 else "Editor",
+                "permissions": {"video": True, "image": True, "live": False,
+                                "scripts": False, "crew": False},
+            }
+
+    await db.movies.insert_many(movies)
+    await db.movies.create_index("movie_id")
+    await db.movies.create_index("user_id")
+    await crew_collection.insert_one({"linkedin_id": linkedin_id, "movies": memberships})
+    await crew_collection.create_index("linkedin_id")
+
+
+async def time_it(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summary(name, samples):
+    samples = sorted(samples)
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    print(f"{name:<10} median {statistics.median(samples):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(BENCH_URI)
+    db = client[BENCH_DB_NAME]
+    crew_collection = db["crew_members"]
+
+    # Point the controller at the scratch database
+    controller.db = db
+    controller.crew_collection = crew_collection
+
+    linkedin_id = f"bench-{uuid.uuid4()}"
+    try:
+        await seed(db, crew_collection, linkedin_id, args.movies)
+
+        legacy = await legacy_accessible_movies(db, crew_collection, linkedin_id)
+        current = await controller.get_accessible_movies(linkedin_id)
+        assert sorted(m["movie_id"] for m in legacy) == \
+            sorted(m["movie_id"] for m in current["accessible_movies"])
+
+        print(f"{args.movies} movies, {args.runs} runs")
+        summary("legacy", await time_it(
+            lambda: legacy_accessible_movies(db, crew_collection, linkedin_id), args.runs))
+        summary("current", await time_it(
+            lambda: controller.get_accessible_movies(linkedin_id), args.runs))
+    finally:
+        await client.drop_database(BENCH_DB_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark: startup time and memory, seven processes vs gateway.py.
+
+Each app (and then the gateway) is started in a fresh interpreter that
+imports it and builds the ASGI app, the part of a uvicorn cold start that
+does not need the database. Reported per run:
+
+  startup   wall time from interpreter launch until the app object exists
+  import    time spent importing the app module(s)
+  rss       resident memory once the app is built
+
+The totals compare running every app as its own process with one gateway
+process; with N uvicorn workers both sides scale by N.
+
+The apps read MONGO_URI and friends at import, so run it with the same
+environment as the services (no server is contacted). The Producer and
+User projects need their configuration.py in place.
+
+Usage (from MOFI/Backend):
+    python benchmarks/bench_gateway_startup.py --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same apps as gateway.GATEWAY_MOUNTS (importing gateway would build them all)
+APPS = [
+    ("movie", "Producer/Mofi-main", "movie_api.main"),
+    ("search", "Producer/Mofi-main", "search_api.search_main"),
+    ("stream", "Producer/Mofi-main", "stream_api.main"),
+    ("ratings", "Producer/Mofi-main", "ratings_api.main"),
+    ("reaction", "Producer/Mofi-main", "reaction_api.main"),
+    ("producer", "Producer/backend", "main"),
+    ("user", "User/LastB", "main"),
+]
+
+PROBE = """
+import importlib, json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {path!r})
+os.chdir({path!r})
+importlib.import_module({module!r}).app
+imported = time.perf_counter() - start
+rss_kb = 0
+with open("/proc/self/status") as status:
+    for line in status:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+print(json.dumps({{"import": imported, "rss_mb": rss_kb / 1024}}))
+"""
+
+
+def probe(path: str, module: str) -> dict:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(path=path, module=module)],
+        capture_output=True, text=True, cwd=path
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} failed to start:\n{result.stderr[-2000:]}")
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    stats["startup"] = elapsed
+    return stats
+
+
+def measure(path: str, module: str, runs: int) -> dict:
+    samples = [probe(path, module) for _ in range(runs)]
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    for name, project, module in APPS:
+        rows.append((name, measure(os.path.join(BACKEND_DIR, project), module, args.runs)))
+    gateway = measure(BACKEND_DIR, "gateway", args.runs)
+
+    print(f"{'app':<12}{'startup s':>12}{'import s':>12}{'rss MB':>10}")
+    for name, stats in rows:
+        print(f"{name:<12}{stats['startup']:>12.2f}{stats['import']:>12.2f}{stats['rss_mb']:>10.1f}")
+
+    total = {key: sum(stats[key] for _, stats in rows) for key in ("startup", "import", "rss_mb")}
+    print("-" * 46)
+    print(f"{'7 processes':<12}{total['startup']:>12.2f}{total['import']:>12.2f}{total['rss_mb']:>10.1f}")
+    print(f"{'gateway':<12}{gateway['startup']:>12.2f}{gateway['import']:>12.2f}{gateway['rss_mb']:>10.1f}")
+    print(f"{'saved':<12}{total['startup'] - gateway['startup']:>12.2f}"
+          f"{total['import'] - gateway['import']:>12.2f}{total['rss_mb'] - gateway['rss_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
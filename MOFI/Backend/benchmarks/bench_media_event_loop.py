@@ -0,0 +1,86 @@
+"""
+Benchmark: event-loop latency while media uploads are in flight.
+
+Simulates N concurrent "large uploads" (a blocking call of --upload-seconds,
+standing in for cloudinary.uploader.upload on a slow link) and measures how
+late a 10 ms heartbeat coroutine runs:
+
+  inline        the SDK call made directly inside an async handler (old path)
+  media_client  the same call through mofi_common.media.media_client
+
+No network or Cloudinary account is needed.
+
+Usage (from MOFI/Backend):
+    python benchmarks/bench_media_event_loop.py --uploads 4 --upload-seconds 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mofi_common.media import media_client  # noqa: E402
+
+TICK = 0.01
+
+
+def blocking_upload(seconds: float):
+    time.sleep(seconds)
+    return {"secure_url": "https://example.com/file.mp4"}
+
+
+async def heartbeat(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append((time.perf_counter() - start - TICK) * 1000)
+
+
+async def inline_upload(seconds: float):
+    return blocking_upload(seconds)
+
+
+async def client_upload(seconds: float):
+    return await media_client.run(blocking_upload, seconds)
+
+
+async def measure(upload, uploads: int, seconds: float):
+    lags = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(TICK * 5)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(seconds) for _ in range(uploads)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    return lags, elapsed
+
+
+def summary(name, lags, elapsed):
+    lags = sorted(lags)
+    p99 = lags[max(0, int(len(lags) * 0.99) - 1)]
+    print(f"{name:<13} wall {elapsed:6.2f} s   loop lag median {statistics.median(lags):8.2f} ms"
+          f"   p99 {p99:8.2f} ms   max {lags[-1]:8.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uploads", type=int, default=4)
+    parser.add_argument("--upload-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{args.uploads} concurrent uploads of {args.upload_seconds}s, "
+          f"media pool of {media_client.max_workers} threads")
+    summary("inline", *await measure(inline_upload, args.uploads, args.upload_seconds))
+    summary("media_client", *await measure(client_upload, args.uploads, args.upload_seconds))
+    media_client.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,194 @@
+"""
+Single-process gateway: every backend app mounted in one ASGI app.
+
+Instead of seven uvicorn processes, each with its own imports, Mongo pool
+and HTTP client, run (from MOFI/Backend):
+
+    uvicorn gateway:app --workers 4 --port 8000
+    python gateway.py --workers 4 --port 8000
+
+Apps are mounted under path prefixes:
+
+    /movie      Producer/Mofi-main  movie_api.main
+    /search     Producer/Mofi-main  search_api.search_main
+    /stream     Producer/Mofi-main  stream_api.main
+    /ratings    Producer/Mofi-main  ratings_api.main
+    /reaction   Producer/Mofi-main  reaction_api.main
+    /producer   Producer/backend    main
+    /user       User/LastB          main
+
+GATEWAY_APPS=movie,search mounts only those. Frontends point their API base
+URL at http://host:8000/<prefix>; with MEDIA_STORAGE=local, set
+MEDIA_LOCAL_BASE_URL to http://host:8000/movie/media (or the prefix of the
+app serving the files).
+
+The Producer and User projects both have top-level main, configuration,
+utils and model modules. Each app is imported with its own directory first
+on sys.path, and the modules that clash with another project are taken out
+of sys.modules afterwards, so the next project imports its own copies. Each
+app's .env is applied (overriding) while it is imported, so module-level
+settings see it. The app also keeps those values and the Cloudinary
+credentials it configured as its mofi_common.settings.AppSettings, active
+for its requests and lifespan, so settings read later (OAuth client, cookie
+lifetimes, MEDIA_STORAGE) and Cloudinary calls use the app's own values.
+MOFI/Backend/.env holds the process-wide ones, including everything
+mofi_common reads at import (MEDIA_LOCAL_*, pool sizes, ...).
+
+Mounted apps' lifespans do not run on their own; the gateway enters all of
+them. The Mofi-main apps share one Mongo pool through mofi_common.mongo,
+and all apps share mofi_common.http's client.
+
+benchmarks/bench_gateway_startup.py compares startup time and RSS with the
+separate processes.
+"""
+import argparse
+import importlib
+import os
+import sys
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+
+from dotenv import dotenv_values, load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+
+from fastapi import FastAPI  # noqa: E402
+from mofi_common.http import close_http_client  # noqa: E402
+from mofi_common.settings import AppContext, AppSettings, activate, snapshot_cloudinary  # noqa: E402
+
+# (name, project directory, module, .env files relative to the project)
+GATEWAY_MOUNTS = [
+    ("movie", "Producer/Mofi-main", "movie_api.main", [".env", "movie_api/.env"]),
+    ("search", "Producer/Mofi-main", "search_api.search_main", [".env"]),
+    ("stream", "Producer/Mofi-main", "stream_api.main", [".env"]),
+    ("ratings", "Producer/Mofi-main", "ratings_api.main", [".env"]),
+    ("reaction", "Producer/Mofi-main", "reaction_api.main", [".env"]),
+    ("producer", "Producer/backend", "main", [".env"]),
+    ("user", "User/LastB", "main", [".env"]),
+]
+
+GATEWAY_APPS = os.getenv("GATEWAY_APPS")
+
+
+def _top_level_names(project: str) -> set:
+    names = set()
+    for entry in os.listdir(os.path.join(BACKEND_DIR, project)):
+        name, ext = os.path.splitext(entry)
+        if ext == ".py" or (not ext and os.path.isdir(os.path.join(BACKEND_DIR, project, entry))):
+            names.add(name)
+    return names
+
+
+def _clashing_names() -> set:
+    """Top-level module names defined by more than one project"""
+    seen, clashes = set(), set()
+    for project in sorted({project for _, project, _, _ in GATEWAY_MOUNTS}):
+        names = _top_level_names(project)
+        clashes |= seen & names
+        seen |= names
+    return clashes
+
+
+@contextmanager
+def _app_environment(project_dir: str, env_files):
+    """The project's .env values for the duration of its import; yields them"""
+    saved = dict(os.environ)
+    overrides = {}
+    for env_file in env_files:
+        path = os.path.join(project_dir, env_file)
+        if os.path.exists(path):
+            overrides.update({k: v for k, v in dotenv_values(path).items() if v is not None})
+    os.environ.update(overrides)
+    try:
+        yield overrides
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+def load_app(name: str, project: str, module: str, env_files, clashing: set):
+    """Import an app; returns it with the AppSettings it runs with"""
+    project_dir = os.path.join(BACKEND_DIR, project)
+    sys.path.insert(0, project_dir)
+    try:
+        with _app_environment(project_dir, env_files) as overrides:
+            app = importlib.import_module(module).app
+            # Apps call cloudinary.config() at import; the last one would win
+            settings = AppSettings(name, overrides, snapshot_cloudinary())
+    finally:
+        sys.path.remove(project_dir)
+
+    # Already-imported modules keep their references; later projects get
+    # their own copies of these names
+    for module_name in list(sys.modules):
+        if module_name.split(".")[0] in clashing:
+            del sys.modules[module_name]
+    return app, settings
+
+
+def mounted_apps() -> list:
+    selected = {name.strip() for name in GATEWAY_APPS.split(",")} if GATEWAY_APPS else None
+    clashing = _clashing_names()
+    apps = []
+    for name, project, module, env_files in GATEWAY_MOUNTS:
+        if selected is None or name in selected:
+            apps.append((name, *load_app(name, project, module, env_files, clashing)))
+    return apps
+
+
+APPS = mounted_apps()
+
+
+@asynccontextmanager
+async def _sub_app_lifespan(sub_app: FastAPI, settings: AppSettings):
+    """Run a mounted app's startup and shutdown with its settings active"""
+    context = sub_app.router.lifespan_context(sub_app)
+    with activate(settings):
+        await context.__aenter__()
+    try:
+        yield
+    finally:
+        with activate(settings):
+            await context.__aexit__(None, None, None)
+
+
+@asynccontextmanager
+async def lifespan(gateway: FastAPI):
+    async with AsyncExitStack() as stack:
+        for _, sub_app, settings in APPS:
+            await stack.enter_async_context(_sub_app_lifespan(sub_app, settings))
+        yield
+        await close_http_client()
+
+
+app = FastAPI(title="MOFI Gateway", lifespan=lifespan)
+
+for name, sub_app, settings in APPS:
+    app.mount(f"/{name}", AppContext(sub_app, settings))
+
+
+@app.get("/")
+def home():
+    return {"message": "MOFI gateway is running", "apps": [f"/{name}" for name, _, _ in APPS]}
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run every backend app in one process")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # Each worker process imports the gateway (and every app) itself
+        uvicorn.run("gateway:app", host=args.host, port=args.port, workers=args.workers, app_dir=BACKEND_DIR)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Code shared by every MOFI backend service (movie, search, stream, ratings,
+reaction, Producer and User apps).
+
+Each app puts MOFI/Backend on sys.path in its main module so this package is
+importable however the app is launched.
+"""
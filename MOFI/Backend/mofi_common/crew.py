@@ -0,0 +1,46 @@
+"""
+Crew membership representation shared by the Producer backend and movie_api.
+
+Each crew_members document keeps its movies as an array of subdocuments:
+
+    {"linkedin_id": "...", "memberships": [{"movie_id": "...", "contribution": "...",
+                                            "permissions": {...}, ...}]}
+
+indexed on (memberships.movie_id, linkedin_id) in mofi_common.indexes. Older
+documents may still carry the legacy {"movies": {movie_id: {...}}} map until
+the Producer backend's scripts/migrate_crew_memberships.py converts them;
+running it is a required deploy step because membership_query only matches
+the array.
+"""
+from datetime import datetime
+
+
+def build_membership(movie_id: str, contribution: str, permissions: dict,
+                     now: datetime, access_type: str = None) -> dict:
+    membership = {
+        "movie_id": movie_id,
+        "contribution": contribution,
+        "permissions": permissions,
+        "created_at": now,
+        "updated_at": now
+    }
+    if access_type:
+        membership["access_type"] = access_type
+    return membership
+
+
+def memberships_to_dict(member: dict) -> dict:
+    """Return {movie_id: movie_data} merging legacy `movies` keys and `memberships`"""
+    movies = dict(member.get("movies") or {})
+    for membership in member.get("memberships") or []:
+        data = {k: v for k, v in membership.items() if k != "movie_id"}
+        movies[membership["movie_id"]] = data
+    return movies
+
+
+def membership_query(movie_id: str) -> dict:
+    """
+    Crew documents on movie_id, served by the (memberships.movie_id,
+    linkedin_id) index. Legacy `movies` maps are not matched.
+    """
+    return {"memberships.movie_id": movie_id}
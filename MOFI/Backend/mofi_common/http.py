@@ -0,0 +1,44 @@
+"""
+Shared outbound HTTP client.
+
+Opening an httpx.AsyncClient per request pays for a new connection pool,
+DNS lookup and TLS handshake every time (Google's token endpoint on each
+OAuth callback). get_http_client() returns one client per process with
+keep-alive connections; the app's lifespan calls close_http_client() on
+shutdown.
+
+    HTTP_MAX_CONNECTIONS        total connections (100)
+    HTTP_MAX_KEEPALIVE          idle connections kept open (20)
+    HTTP_TIMEOUT_SECONDS        connect/read/write/pool timeout (10)
+"""
+import os
+from typing import Optional
+
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", 10))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The process-wide client, created on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE
+            ),
+            timeout=HTTP_TIMEOUT_SECONDS
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,203 @@
+"""
+Image processing stage run before uploads reach storage.
+
+Re-encoding is CPU bound, so it runs on a process pool (IMAGE_PROCESS_WORKERS
+processes, started on first use) instead of a thread. Each image is:
+
+- rotated according to its EXIF orientation, then saved without EXIF/XMP
+  metadata (camera, GPS, ...)
+- scaled down to fit IMAGE_MAX_DIMENSION pixels on its longest side
+- re-encoded as IMAGE_FORMAT (webp, avif or original) at IMAGE_QUALITY
+
+Animated images are passed through unchanged, and so is an image the
+re-encode would make bigger when there is nothing to strip or resize (no
+EXIF/XMP, within IMAGE_MAX_DIMENSION). Totals are kept in image_stats; each
+image's original and stored sizes are returned to the caller.
+
+The same worker also returns the final width and height and a low-quality
+placeholder (LQIP): the image scaled to LQIP_SIZE pixels, as a WebP data URI of
+a few hundred bytes that clients can blur-up while the real image loads.
+"""
+import asyncio
+import base64
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from mofi_common.media import media_client
+from mofi_common.uploads import ACCEPTED_TYPES, sniff_file
+
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp").lower()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 80))
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 2560))
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", 2))
+LQIP_SIZE = int(os.getenv("LQIP_SIZE", 16))
+LQIP_QUALITY = 40
+
+ALLOWED_IMAGE_TYPES = ACCEPTED_TYPES["image"]
+MAX_IMAGE_UPLOAD_BYTES = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", 10 * 1024 * 1024))
+
+CONTENT_TYPES = {
+    "WEBP": "image/webp",
+    "AVIF": "image/avif",
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "GIF": "image/gif",
+}
+
+image_stats = {"processed": 0, "passed_through": 0, "kept_original": 0, "bytes_in": 0, "bytes_out": 0}
+
+_executor = None
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS)
+    return _executor
+
+
+def validate_image_upload(upload_file):
+    """Raise ValueError for a non-image file or one over MAX_IMAGE_UPLOAD_BYTES"""
+    # Judge the type by the file's magic bytes, not the client's Content-Type
+    if sniff_file(upload_file.file) not in ALLOWED_IMAGE_TYPES:
+        raise ValueError("Invalid file type. Only PNG, JPG, GIF, WEBP are allowed")
+
+    upload_file.file.seek(0, 2)
+    size = upload_file.file.tell()
+    upload_file.file.seek(0)
+    if size > MAX_IMAGE_UPLOAD_BYTES:
+        raise ValueError(f"File too large. Maximum size is {MAX_IMAGE_UPLOAD_BYTES // (1024 * 1024)}MB")
+
+
+def placeholder_data_uri(image, size: int) -> str:
+    """Tiny WebP of the image as a data: URI"""
+    from PIL import Image
+
+    tiny = image.convert("RGBA" if "A" in image.mode else "RGB")
+    tiny.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    tiny.save(buffer, format="WEBP", quality=LQIP_QUALITY)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _has_metadata(image) -> bool:
+    return bool(image.getexif()) or any(key in image.info for key in ("xmp", "XML:com.adobe.xmp"))
+
+
+def reencode_image(data: bytes, target_format: str, quality: int, max_dimension: int,
+                   placeholder_size: int = LQIP_SIZE) -> dict:
+    """Runs in a worker process; returns the new bytes and their details"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        source_format = original.format or "PNG"
+        if getattr(original, "is_animated", False):
+            return {
+                "data": data,
+                "format": source_format,
+                "width": original.width,
+                "height": original.height,
+                "placeholder": placeholder_data_uri(original, placeholder_size),
+                "processed": False,
+            }
+
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        out_format = source_format if target_format == "original" else target_format.upper()
+        if out_format == "JPEG" or image.mode not in ("RGB", "RGBA", "L", "LA"):
+            has_alpha = "A" in image.mode or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha and out_format != "JPEG" else "RGB")
+
+        options = {}
+        if out_format in ("WEBP", "AVIF", "JPEG"):
+            options["quality"] = quality
+        if out_format == "PNG":
+            options["optimize"] = True
+
+        # No exif=/xmp= arguments: the metadata is not carried over
+        buffer = io.BytesIO()
+        image.save(buffer, format=out_format, **options)
+
+        if (buffer.tell() >= len(data) and image.size == original.size
+                and not _has_metadata(original)):
+            # Re-encoding only made it bigger and there is nothing to strip
+            return {
+                "data": data,
+                "format": source_format,
+                "width": original.width,
+                "height": original.height,
+                "placeholder": placeholder_data_uri(image, placeholder_size),
+                "processed": False,
+                "kept_original": True,
+            }
+
+        return {
+            "data": buffer.getvalue(),
+            "format": out_format,
+            "width": image.width,
+            "height": image.height,
+            "placeholder": placeholder_data_uri(image, placeholder_size),
+            "processed": True,
+        }
+
+
+async def process_image(upload_file) -> dict:
+    """
+    Re-encode an UploadFile's image on the process pool.
+
+    Returns {"file", "filename", "content_type", "width", "height",
+    "placeholder", "original_bytes", "bytes", "bytes_saved"} where "file" is a
+    file object holding the processed image, ready for storage.
+    """
+    def read():
+        upload_file.file.seek(0)
+        return upload_file.file.read()
+
+    data = await media_client.run(read)
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(
+        _process_pool(), reencode_image, data, IMAGE_FORMAT, IMAGE_QUALITY, IMAGE_MAX_DIMENSION
+    )
+
+    output = result["data"]
+    name = os.path.splitext(upload_file.filename or "image")[0]
+    extension = "jpg" if result["format"] == "JPEG" else result["format"].lower()
+
+    if result.get("kept_original"):
+        image_stats["kept_original"] += 1
+    else:
+        image_stats["processed" if result["processed"] else "passed_through"] += 1
+    image_stats["bytes_in"] += len(data)
+    image_stats["bytes_out"] += len(output)
+    saved = len(data) - len(output)
+
+    return {
+        "file": io.BytesIO(output),
+        "filename": f"{name}.{extension}",
+        "content_type": CONTENT_TYPES.get(result["format"], "application/octet-stream"),
+        "width": result["width"],
+        "height": result["height"],
+        "placeholder": result["placeholder"],
+        "original_bytes": len(data),
+        "bytes": len(output),
+        "bytes_saved": saved,
+    }
+
+
+def stats() -> dict:
+    saved = image_stats["bytes_in"] - image_stats["bytes_out"]
+    return {
+        "format": IMAGE_FORMAT,
+        "quality": IMAGE_QUALITY,
+        "max_dimension": IMAGE_MAX_DIMENSION,
+        **image_stats,
+        "bytes_saved": saved,
+        "saved_ratio": round(saved / image_stats["bytes_in"], 4) if image_stats["bytes_in"] else 0.0,
+    }
+
+
+def shutdown():
+    if _executor is not None:
+        _executor.shutdown(wait=False)
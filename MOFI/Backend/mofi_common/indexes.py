@@ -0,0 +1,237 @@
+"""
+Declarative MongoDB index registry for every backend service.
+
+Each FastAPI app calls apply_indexes() from its lifespan hook with the
+collections it owns or reads; create_indexes is a no-op for indexes that
+already exist, so every app can safely declare the collections it queries.
+
+The module is also a CLI that compares the registry against a live cluster and
+reports missing indexes and indexes that $indexStats shows as unused:
+
+    python -m mofi_common.indexes report [--apply] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+
+UNVERIFIED_DELETE_DAYS = int(os.getenv("UNVERIFIED_DELETE_DAYS", 7))
+
+INDEXES = {
+    # movie_api / search_api / ratings_api / reaction_api
+    "movies": [
+        IndexModel([("movie_id", ASCENDING)], name="movie_id", unique=True),
+        IndexModel([("imdbID", ASCENDING)], name="imdbID", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("type", ASCENDING)], name="type"),
+    ],
+    "trailers": [
+        IndexModel([("trailer_id", ASCENDING)], name="trailer_id", unique=True),
+        IndexModel([("movie_id", ASCENDING)], name="movie_id"),
+    ],
+    "trailer_jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id", unique=True),
+        # Finished jobs get expires_at; stale queued/running ones are requeued
+        # or failed on startup (TrailerJobService.recover)
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "movie_images": [
+        IndexModel([("image_id", ASCENDING)], name="image_id", unique=True),
+        IndexModel([("movie_id", ASCENDING), ("uploaded_at", DESCENDING)],
+                   name="movie_id_uploaded_at"),
+    ],
+    "media_hashes": [
+        IndexModel([("sha256", ASCENDING)], name="sha256", unique=True),
+        IndexModel([("url", ASCENDING)], name="url", unique=True),
+    ],
+    "direct_uploads": [
+        IndexModel([("upload_id", ASCENDING)], name="upload_id", unique=True),
+        # Upload notifications find their upload by the asset's public id
+        IndexModel([("public_ids", ASCENDING)], name="public_ids"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    # stream_api
+    "streams": [
+        IndexModel([("stream_id", ASCENDING)], name="stream_id", unique=True),
+        IndexModel([("stream_key", ASCENDING)], name="stream_key", unique=True),
+        IndexModel([("movie_id", ASCENDING)], name="movie_id"),
+        IndexModel([("is_live", ASCENDING)], name="is_live_true",
+                   partialFilterExpression={"is_live": True}),
+    ],
+    "pre_ratings": [
+        IndexModel([("movie_id", ASCENDING), ("user_id", ASCENDING)], name="movie_id_user_id"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "post_ratings": [
+        IndexModel([("movie_id", ASCENDING), ("user_id", ASCENDING)], name="movie_id_user_id"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "reactions": [
+        IndexModel([("movie_id", ASCENDING), ("created_at", DESCENDING)], name="movie_id_created_at"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    # Producer backend (auth_db)
+    "crew_members": [
+        IndexModel([("memberships.movie_id", ASCENDING), ("linkedin_id", ASCENDING)],
+                   name="memberships_movie_id_linkedin_id"),
+        IndexModel([("linkedin_id", ASCENDING), ("memberships.movie_id", ASCENDING)],
+                   name="linkedin_id_memberships_movie_id"),
+    ],
+    "Producers": [
+        IndexModel([("email", ASCENDING)], name="email", unique=True),
+        # Unverified producer accounts are removed after UNVERIFIED_DELETE_DAYS
+        IndexModel([("created_at", ASCENDING)], name="unverified_created_at_ttl",
+                   expireAfterSeconds=UNVERIFIED_DELETE_DAYS * 24 * 60 * 60,
+                   partialFilterExpression={"email_verified": False}),
+    ],
+    # User backend
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email", unique=True),
+        IndexModel([("username", ASCENDING)], name="username", unique=True),
+        # register_user sets expires_at on unverified accounts; verify unsets it
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Database each registered collection lives in, as (env var, default)
+COLLECTION_DATABASES = {
+    "movies": ("MONGO_DB_NAME", None),
+    "trailers": ("MONGO_DB_NAME", None),
+    "trailer_jobs": ("MONGO_DB_NAME", None),
+    "movie_images": ("MONGO_DB_NAME", None),
+    "media_hashes": ("MONGO_DB_NAME", None),
+    "direct_uploads": ("MONGO_DB_NAME", None),
+    "streams": ("MONGO_DB_NAME", None),
+    "pre_ratings": ("MONGO_DB_NAME", None),
+    "post_ratings": ("MONGO_DB_NAME", None),
+    "reactions": ("MONGO_DB_NAME", None),
+    "crew_members": ("AUTH_DB_NAME", "auth_db"),
+    "Producers": ("AUTH_DB_NAME", "auth_db"),
+    "users": ("USERS_DB_NAME", None),
+}
+
+# Physical collection name when it differs from the registry key
+COLLECTION_NAMES = {
+    "users": os.getenv("USERS_COLLECTION", "users"),
+}
+
+
+async def apply_indexes(collections: dict) -> dict:
+    """
+    Create the registered indexes for {registry_name: collection}.
+
+    Works with Motor and plain PyMongo collections (the latter are run in a
+    worker thread). A failing index (duplicate data under a unique index,
+    conflicting options, unreachable server) is reported and skipped so the
+    app still starts.
+    """
+    applied, failed = [], []
+
+    for name, collection in collections.items():
+        for model in INDEXES.get(name, []):
+            index_name = model.document["name"]
+            try:
+                if type(collection).__module__.startswith("motor"):
+                    await collection.create_indexes([model])
+                else:
+                    await asyncio.to_thread(collection.create_indexes, [model])
+                applied.append(f"{name}.{index_name}")
+            except (OperationFailure, PyMongoError) as e:
+                failed.append(f"{name}.{index_name}")
+                print(f"Index bootstrap failed for {name}.{index_name}: {e}")
+
+    return {"applied": applied, "failed": failed}
+
+
+def _database_name(collection_name: str):
+    env_var, default = COLLECTION_DATABASES[collection_name]
+    return os.getenv(env_var, default)
+
+
+def report(client, apply: bool = False) -> list:
+    """Compare the registry with the live indexes and their $indexStats usage"""
+    rows = []
+
+    for name, models in INDEXES.items():
+        db_name = _database_name(name)
+        if not db_name:
+            rows.append({"collection": name, "status": "skipped",
+                         "detail": f"{COLLECTION_DATABASES[name][0]} not set"})
+            continue
+
+        collection = client[db_name][COLLECTION_NAMES.get(name, name)]
+        existing = collection.index_information()
+        usage = {
+            stat["name"]: stat["accesses"]
+            for stat in collection.aggregate([{"$indexStats": {}}])
+        }
+
+        for model in models:
+            index_name = model.document["name"]
+            if index_name in existing:
+                continue
+            if apply:
+                try:
+                    collection.create_indexes([model])
+                    rows.append({"collection": name, "index": index_name, "status": "created"})
+                    continue
+                except OperationFailure as e:
+                    rows.append({"collection": name, "index": index_name,
+                                 "status": "missing", "detail": str(e)})
+                    continue
+            rows.append({"collection": name, "index": index_name, "status": "missing"})
+
+        registered = {model.document["name"] for model in models}
+        for index_name in existing:
+            if index_name == "_id_":
+                continue
+            accesses = usage.get(index_name, {})
+            ops = accesses.get("ops", 0)
+            since = accesses.get("since")
+            row = {
+                "collection": name,
+                "index": index_name,
+                "ops": ops,
+                "since": since.isoformat() if since else None,
+            }
+            if ops == 0:
+                row["status"] = "unused"
+            elif index_name not in registered:
+                row["status"] = "unregistered"
+            else:
+                row["status"] = "ok"
+            rows.append(row)
+
+    return rows
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="MongoDB index registry tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report_parser = sub.add_parser("report", help="report missing and unused indexes")
+    report_parser.add_argument("--apply", action="store_true", help="create missing indexes")
+    report_parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv("MONGO_URI"))
+    rows = report(client, apply=args.apply)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    for row in rows:
+        print(f"{row['status']:<13} {row['collection']:<14} {row.get('index', ''):<36} "
+              f"{'ops=' + str(row['ops']) if 'ops' in row else row.get('detail', '')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Event-loop stall detector.
+
+A blocking call inside an `async def` handler (a sync Cloudinary upload,
+smtplib, bcrypt, a PyMongo query) freezes every request on the worker until
+it returns. With LOOP_WATCH=1 each app's lifespan starts:
+
+  - a heartbeat task that sleeps LOOP_WATCH_INTERVAL_MS at a time and
+    records how late it wakes up (the loop lag), and
+  - a watchdog thread that, once the heartbeat is LOOP_LAG_THRESHOLD_MS
+    overdue, takes the loop thread's stack with sys._current_frames(), i.e.
+    the code blocking the loop while it is still blocking it.
+
+Stalls are grouped by call site: the innermost frame in backend code (the
+route or service line that made the blocking call), with the innermost
+frame overall (where it was blocked, e.g. ssl.py or bcrypt) kept alongside
+and one full stack as an example. Nothing is captured while the loop is
+healthy, so the cost is one timer wake-up per interval.
+
+GET /debug/loop returns the per-site counts and durations (DELETE resets
+them); Prometheus gets event_loop_lag_seconds and event_loop_stalls_total /
+event_loop_stall_seconds_total by site. The endpoints expose stack frames, so
+they take the same admin token as /debug/profiles (mofi_common.profiling,
+`sign --admin`) and return 404 unless PROFILE_SECRET is set.
+
+    LOOP_WATCH                 1 to enable (0)
+    LOOP_LAG_THRESHOLD_MS      stall threshold (100)
+    LOOP_WATCH_INTERVAL_MS     heartbeat interval (25)
+    LOOP_WATCH_STACK_DEPTH     frames kept per example stack (30)
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+from fastapi import APIRouter, Depends
+from prometheus_client import Counter, Histogram
+
+from mofi_common.profiling import require_profile_admin
+
+LOOP_WATCH = os.getenv("LOOP_WATCH", "0") == "1"
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", 100))
+LOOP_WATCH_INTERVAL_MS = float(os.getenv("LOOP_WATCH_INTERVAL_MS", 25))
+LOOP_WATCH_STACK_DEPTH = int(os.getenv("LOOP_WATCH_STACK_DEPTH", 30))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNKNOWN_SITE = "<not captured>"
+
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds", "How late the event loop heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+event_loop_stalls = Counter(
+    "event_loop_stalls_total", "Event loop stalls over the threshold", ["site"]
+)
+event_loop_stall_seconds = Counter(
+    "event_loop_stall_seconds_total", "Time the event loop spent stalled", ["site"]
+)
+
+
+def _is_backend(filename: str) -> bool:
+    return (filename.startswith(BACKEND_DIR) and "site-packages" not in filename
+            and not filename.endswith("loopwatch.py"))
+
+
+def _where(frame) -> str:
+    filename = frame.filename
+    if filename.startswith(BACKEND_DIR):
+        filename = os.path.relpath(filename, BACKEND_DIR)
+    return f"{filename}:{frame.lineno} in {frame.name}"
+
+
+def describe_stack(frame) -> dict:
+    stack = traceback.extract_stack(frame)
+    site = next((f for f in reversed(stack) if _is_backend(f.filename)), None)
+    return {
+        "site": _where(site) if site else _where(stack[-1]),
+        "blocked_in": _where(stack[-1]),
+        "stack": [_where(f) for f in stack[-LOOP_WATCH_STACK_DEPTH:]],
+    }
+
+
+class LoopWatch:
+    def __init__(self, threshold_ms: float, interval_ms: float):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self._lock = threading.Lock()
+        self._sites = {}
+        self._beat = time.perf_counter()
+        self._captured_beat = None
+        self._captured = None
+        self._stopped = threading.Event()
+        self._task = None
+        self._thread = None
+        self._loop_thread_id = None
+        self.beats = 0
+        self.stalls = 0
+        self.max_lag = 0.0
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loopwatch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(now - self._beat - self.interval, 0.0)
+            self.beats += 1
+            self.max_lag = max(self.max_lag, lag)
+            event_loop_lag.observe(lag)
+            if lag >= self.threshold:
+                with self._lock:
+                    captured = self._captured if self._captured_beat == self._beat else None
+                    self._captured = None
+                self._record(captured, lag)
+            self._beat = now
+
+    def _watch(self):
+        check = max(self.threshold / 4, 0.005)
+        while not self._stopped.wait(check):
+            beat = self._beat
+            overdue = time.perf_counter() - beat - self.interval
+            if overdue < self.threshold or self._captured_beat == beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            captured = describe_stack(frame)
+            with self._lock:
+                self._captured_beat = beat
+                self._captured = captured
+
+    def _record(self, captured, lag: float):
+        site = captured["site"] if captured else UNKNOWN_SITE
+        with self._lock:
+            self.stalls += 1
+            entry = self._sites.get(site)
+            if entry is None:
+                entry = self._sites[site] = {
+                    "site": site,
+                    "blocked_in": captured["blocked_in"] if captured else None,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "example_stack": captured["stack"] if captured else [],
+                }
+            entry["count"] += 1
+            entry["total_ms"] += lag * 1000
+            entry["max_ms"] = max(entry["max_ms"], lag * 1000)
+        event_loop_stalls.labels(site).inc()
+        event_loop_stall_seconds.labels(site).inc(lag)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sites = sorted(
+                ({**entry, "total_ms": round(entry["total_ms"], 1), "max_ms": round(entry["max_ms"], 1)}
+                 for entry in self._sites.values()),
+                key=lambda entry: entry["total_ms"], reverse=True
+            )
+        return {
+            "enabled": True,
+            "threshold_ms": self.threshold * 1000,
+            "interval_ms": self.interval * 1000,
+            "beats": self.beats,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.stalls,
+            "sites": sites,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+            self.stalls = 0
+            self.max_lag = 0.0
+
+
+# One watcher per process; the gateway's sub-apps all share it
+_watch = None
+
+
+def start():
+    """Start watching the running loop (lifespan startup); no-op unless LOOP_WATCH=1"""
+    global _watch
+    if not LOOP_WATCH or _watch is not None:
+        return
+    _watch = LoopWatch(LOOP_LAG_THRESHOLD_MS, LOOP_WATCH_INTERVAL_MS)
+    _watch.start()
+
+
+def stop():
+    global _watch
+    if _watch is not None:
+        _watch.stop()
+        _watch = None
+
+
+def stats() -> dict:
+    if _watch is None:
+        return {"enabled": False}
+    return _watch.stats()
+
+
+loop_router = APIRouter(prefix="/debug/loop", tags=["Debug"], dependencies=[Depends(require_profile_admin)])
+
+
+@loop_router.get("")
+def loop_stats():
+    return stats()
+
+
+@loop_router.delete("")
+def reset_loop_stats():
+    if _watch is not None:
+        _watch.reset()
+    return {"message": "Loop stall statistics reset"}
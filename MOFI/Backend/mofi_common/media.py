@@ -0,0 +1,83 @@
+"""
+Async media client shared by every service that talks to Cloudinary.
+
+The Cloudinary SDK is synchronous; calling it from an `async def` handler
+freezes the event loop for the whole upload. MediaClient runs SDK calls on a
+dedicated, bounded thread pool (MEDIA_UPLOAD_WORKERS threads) so uploads
+neither block the loop nor compete with Motor for the default executor.
+
+Every Cloudinary call is timed in the external_call_* Prometheus metrics
+(service "cloudinary", operation = method name) and traced as a "storage"
+span. Calls run with a copy of the caller's context, so anything traced
+inside them nests under the request.
+
+Each service still configures the cloudinary module itself (cloud name and
+credentials) the way it always has. Under the gateway that global config is
+whichever app was imported last, so every call also passes the credentials
+of the app making it (mofi_common.settings).
+"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary.api
+import cloudinary.uploader
+
+from mofi_common.metrics import track_external
+from mofi_common.settings import cloudinary_options
+from mofi_common.tracing import span
+
+MEDIA_UPLOAD_WORKERS = int(os.getenv("MEDIA_UPLOAD_WORKERS", 8))
+# Bytes held in memory per chunked upload; Cloudinary rejects chunks under 5 MB
+MEDIA_CHUNK_SIZE = max(int(os.getenv("MEDIA_CHUNK_SIZE", 20 * 1024 * 1024)), 5 * 1024 * 1024)
+
+
+class MediaClient:
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="media")
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking media call on the media thread pool"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, fn, *args, **kwargs))
+
+    async def _call(self, operation: str, fn, *args, **kwargs):
+        for key, value in cloudinary_options().items():
+            kwargs.setdefault(key, value)
+        with span(f"cloudinary.{operation}", "storage"), track_external("cloudinary", operation):
+            return await self.run(fn, *args, **kwargs)
+
+    async def upload(self, file, **options) -> dict:
+        return await self._call("upload", cloudinary.uploader.upload, file, **options)
+
+    async def upload_large(self, file, **options) -> dict:
+        """
+        Upload a path or file object in MEDIA_CHUNK_SIZE parts, so only one
+        chunk is in memory at a time instead of the whole file.
+        """
+        options.setdefault("chunk_size", MEDIA_CHUNK_SIZE)
+        return await self._call("upload_large", cloudinary.uploader.upload_large, file, **options)
+
+    async def destroy(self, public_id: str, **options) -> dict:
+        return await self._call("destroy", cloudinary.uploader.destroy, public_id, **options)
+
+    async def resource(self, public_id: str, **options) -> dict:
+        """Admin API details (bytes, format, width, height, ...) of a stored asset"""
+        return await self._call("resource", cloudinary.api.resource, public_id, **options)
+
+    async def resources(self, **options) -> dict:
+        """One page of the Admin API asset listing"""
+        return await self._call("resources", cloudinary.api.resources, **options)
+
+    async def delete_resources(self, public_ids, **options) -> dict:
+        return await self._call("delete_resources", cloudinary.api.delete_resources, public_ids, **options)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+media_client = MediaClient(MEDIA_UPLOAD_WORKERS)
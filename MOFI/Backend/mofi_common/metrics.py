@@ -0,0 +1,188 @@
+"""
+Prometheus metrics shared by every backend app.
+
+Each app adds MetricsMiddleware (outermost, so 413s from the upload limits
+and CORS preflights are counted too) and includes metrics_router for
+GET /metrics:
+
+    http_request_duration_seconds{app, method, route, status}   histogram
+    http_requests_in_progress{app, method}                      gauge
+    mongo_command_duration_seconds{command, collection}         histogram
+    mongo_command_failures_total{command, collection}           counter
+    external_call_duration_seconds{service, operation}          histogram
+    external_call_errors_total{service, operation}              counter
+
+route is the route template (/movie_details/{movie_id}), never the raw path,
+so label cardinality stays bounded; unmatched requests are "<unmatched>".
+
+Mongo timings come from a pymongo CommandListener registered globally when
+this module is imported, so it sees every client created afterwards,
+including the ones built in configuration.py; apps import it before their
+database modules. External calls (Cloudinary through mofi_common.media, SMTP,
+Google OAuth) are timed with track_external().
+
+With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR to an empty
+directory shared by the workers; /metrics then aggregates all of them.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from pymongo import monitoring
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Commands without a collection (hello, ping, endSessions, ...) and
+# handshakes are not worth a series each
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue",
+                    "endSessions", "buildInfo", "getLastError"}
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["app", "method", "route", "status"], buckets=HTTP_BUCKETS
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "HTTP requests being served",
+    ["app", "method"], multiprocess_mode="livesum"
+)
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency",
+    ["command", "collection"], buckets=MONGO_BUCKETS
+)
+mongo_command_failures = Counter(
+    "mongo_command_failures_total", "MongoDB commands that failed",
+    ["command", "collection"]
+)
+external_call_duration = Histogram(
+    "external_call_duration_seconds", "Latency of calls to external services",
+    ["service", "operation"], buckets=EXTERNAL_BUCKETS
+)
+external_call_errors = Counter(
+    "external_call_errors_total", "Calls to external services that failed",
+    ["service", "operation"]
+)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command by name and collection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else ""
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), None)
+        if collection is None:
+            return
+        labels = (event.command_name, collection)
+        mongo_command_duration.labels(*labels).observe(event.duration_micros / 1_000_000)
+        if failed:
+            mongo_command_failures.labels(*labels).inc()
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+mongo_command_metrics = MongoCommandMetrics()
+monitoring.register(mongo_command_metrics)
+
+
+class _ExternalCall:
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        """Count the call as an error without raising (e.g. an HTTP 4xx/5xx)"""
+        self.failed = True
+
+
+@contextmanager
+def track_external(service: str, operation: str):
+    """Time a call to an external service; exceptions count as errors and propagate"""
+    call = _ExternalCall()
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call.fail()
+        raise
+    finally:
+        external_call_duration.labels(service, operation).observe(time.perf_counter() - start)
+        if call.failed:
+            external_call_errors.labels(service, operation).inc()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight requests per route"""
+
+    def __init__(self, app, app_name: str):
+        self.app = app
+        self.app_name = app_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].endswith("/metrics"):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_progress = http_requests_in_progress.labels(self.app_name, method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            http_request_duration.labels(self.app_name, method, template, status).observe(
+                time.perf_counter() - start
+            )
+
+
+def _registry():
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
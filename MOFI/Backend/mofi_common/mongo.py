@@ -0,0 +1,199 @@
+"""
+Shared MongoDB client and connection pool.
+
+get_client() hands out one AsyncIOMotorClient per URI for the whole process,
+so apps (and every db/mongo.py module within an app) share a single pool
+instead of each building their own with driver defaults. The pool is
+configured from the environment:
+
+    MONGO_MAX_POOL_SIZE                 connections per server (100)
+    MONGO_MIN_POOL_SIZE                 kept open while idle (0)
+    MONGO_MAX_IDLE_TIME_MS              idle connections closed after (300000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS         longest wait for a free connection (10000)
+    MONGO_CONNECT_TIMEOUT_MS            (5000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS   (10000)
+    MONGO_SOCKET_TIMEOUT_MS             (unset: no timeout)
+    MONGO_COMPRESSORS                   e.g. "zstd,zlib" (unset: none)
+
+Creating a client does no I/O. Each app's lifespan calls connect(), which
+pings the server and opens MONGO_MIN_POOL_SIZE connections so the first
+request does not pay for server selection and the handshake, and close()
+on shutdown. The User service and the gitignored configuration.py modules
+can build their clients with get_sync_client() / get_client() to get the
+same settings; connect() also accepts a plain PyMongo client.
+
+Pool events feed a ConnectionPoolListener; pool_stats() reports open and
+checked-out connections and how long checkouts waited for one. Importing
+this module also registers the command listeners of mofi_common.metrics,
+mofi_common.tracing and (with QUERY_AUDIT=1) mofi_common.query_audit, so
+every client gets per-command Prometheus timings, spans and query plans.
+"""
+import asyncio
+import functools
+import os
+import threading
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.monitoring import ConnectionPoolListener
+
+from mofi_common import metrics, query_audit, tracing  # noqa: F401  register the command listeners
+
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+MONGO_SOCKET_TIMEOUT_MS = os.getenv("MONGO_SOCKET_TIMEOUT_MS")
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS")
+
+
+class PoolMetrics(ConnectionPoolListener):
+    """Per-server connection pool counters, updated from driver threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _pool(self, address):
+        key = f"{address[0]}:{address[1]}"
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = {
+                "open": 0,
+                "checked_out": 0,
+                "max_checked_out": 0,
+                "checkouts": 0,
+                "checkout_failures": 0,
+                "wait_ms_total": 0.0,
+                "wait_ms_max": 0.0,
+                "cleared": 0,
+            }
+        return pool
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._pool(event.address)["open"] -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._pool(event.address)["checkout_failures"] += 1
+
+    def connection_checked_out(self, event):
+        # duration covers the wait for a free connection (and creating one)
+        wait_ms = getattr(event, "duration", 0) * 1000
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checkouts"] += 1
+            pool["checked_out"] += 1
+            pool["max_checked_out"] = max(pool["max_checked_out"], pool["checked_out"])
+            pool["wait_ms_total"] += wait_ms
+            pool["wait_ms_max"] = max(pool["wait_ms_max"], wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._pool(event.address)["checked_out"] -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            pools = {}
+            for key, pool in self._pools.items():
+                checkouts = pool["checkouts"]
+                pools[key] = {
+                    **pool,
+                    "wait_ms_total": round(pool["wait_ms_total"], 3),
+                    "wait_ms_max": round(pool["wait_ms_max"], 3),
+                    "wait_ms_avg": round(pool["wait_ms_total"] / checkouts, 3) if checkouts else 0.0,
+                }
+            return pools
+
+
+pool_metrics = PoolMetrics()
+
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [pool_metrics],
+    }
+    if MONGO_SOCKET_TIMEOUT_MS:
+        options["socketTimeoutMS"] = int(MONGO_SOCKET_TIMEOUT_MS)
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
+
+@functools.lru_cache(maxsize=None)
+def get_client(uri: str) -> AsyncIOMotorClient:
+    """The process-wide client for uri"""
+    return AsyncIOMotorClient(uri, **client_options())
+
+
+@functools.lru_cache(maxsize=None)
+def get_sync_client(uri: str) -> MongoClient:
+    """The process-wide PyMongo client for uri (User service)"""
+    return MongoClient(uri, **client_options())
+
+
+async def _ping(client):
+    if type(client).__module__.startswith("motor"):
+        await client.admin.command("ping")
+    else:
+        await asyncio.to_thread(client.admin.command, "ping")
+
+
+async def connect(client) -> bool:
+    """
+    Warm the pool from a lifespan hook: ping (server selection and the first
+    connection), then open up to MONGO_MIN_POOL_SIZE connections at once. A
+    failure is reported and the app still starts; requests retry as usual.
+    """
+    try:
+        await _ping(client)
+        if MONGO_MIN_POOL_SIZE > 1:
+            await asyncio.gather(*(_ping(client) for _ in range(MONGO_MIN_POOL_SIZE)))
+        return True
+    except Exception as e:
+        print(f"MongoDB warm-up failed: {e}")
+        return False
+
+
+def close(client):
+    """Close a shared client at process shutdown"""
+    client.close()
+
+
+def pool_stats() -> dict:
+    settings = client_options()
+    settings.pop("event_listeners")
+    return {"settings": settings, "pools": pool_metrics.snapshot()}
@@ -0,0 +1,465 @@
+"""
+On-demand request profiling.
+
+ProfilingMiddleware profiles a request when either
+
+  - it carries a signed X-Profile header, minted for one path with
+        python -m mofi_common.profiling sign --path /movies/getfull_movie/42/full [--mode cpu,memory] [--ttl 300]
+    (HMAC-SHA256 with PROFILE_SECRET over mode, expiry and path), or
+  - a sampling rule matches: PROFILE_SAMPLE_ROUTES="GET /ratings/{movie_id}=5,POST /ratings=1"
+    profiles 5% / 1% of those routes; rules can be changed at runtime with
+    PUT /debug/profiles/sampling.
+
+Modes:
+
+  cpu      a speedscope profile (open it at https://www.speedscope.app).
+           With pyinstrument installed its async mode is used, which also
+           shows time spent awaiting; otherwise a sampler thread records the
+           event-loop thread's stack every PROFILE_INTERVAL_MS while this
+           request's task is the one running (CPU on the loop only; I/O waits
+           are in the Server-Timing header and traces).
+  memory   tracemalloc snapshots before and after the request; the file lists
+           the allocation sites that grew the most. tracemalloc is process
+           wide, so the diff also holds whatever requests running at the
+           same time allocated; profile on a quiet worker for clean numbers.
+
+One request is profiled at a time per process; others pass through
+untouched. The response carries X-Profile-Result with the file name (or
+"busy"). Files go to PROFILE_DIR, keeping the newest PROFILE_MAX_FILES.
+
+Admin endpoints need an X-Profile header minted with `sign --admin`:
+
+    GET    /debug/profiles                 list stored profiles
+    GET    /debug/profiles/{name}          download one
+    DELETE /debug/profiles/{name}
+    GET    /debug/profiles/sampling        current sampling rules
+    PUT    /debug/profiles/sampling        {"route": "GET /ratings/{movie_id}", "percent": 5, "mode": "cpu"}
+    POST   /debug/profiles/heap            process-wide tracemalloc snapshot, diffed with the previous one
+
+Nothing is profiled, and the admin endpoints return 404, unless
+PROFILE_SECRET is set.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:
+    Profiler = None
+
+PROFILE_SECRET = os.getenv("PROFILE_SECRET")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "mofi-profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 200))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 2))
+PROFILE_SAMPLE_ROUTES = os.getenv("PROFILE_SAMPLE_ROUTES", "")
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", 10))
+PROFILE_MEMORY_TOP = 30
+
+MODES = {"cpu", "memory"}
+PROFILE_NAME = re.compile(r"^[\w.-]+\.json$")
+
+
+def sign(mode: str, expires: int, path: str, secret: str = None) -> str:
+    """X-Profile header value for mode ("cpu", "cpu,memory" or "admin")"""
+    secret = secret or PROFILE_SECRET
+    message = f"{mode}:{expires}:{path}".encode()
+    signature = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return f"{mode}:{expires}:{signature}"
+
+
+def verify(header: str, path: str):
+    """The modes a header grants for path, or None"""
+    if not PROFILE_SECRET or not header:
+        return None
+    try:
+        mode, expires, _ = header.split(":")
+        if int(expires) < time.time():
+            return None
+    except ValueError:
+        return None
+    if not hmac.compare_digest(sign(mode, int(expires), path), header):
+        return None
+    return set(mode.split(","))
+
+
+class SamplingRule:
+    def __init__(self, route: str, percent: float, modes: set):
+        method, _, template = route.partition(" ")
+        self.route = route
+        self.method = method.upper()
+        self.percent = percent
+        self.modes = modes
+        # /ratings/{movie_id} -> ^/ratings/[^/]+$, {name:path} matches across slashes
+        parts = re.split(r"(\{[^}]+\})", template)
+        self.pattern = re.compile("^" + "".join(
+            (".*" if part.endswith(":path}") else "[^/]+") if part.startswith("{") else re.escape(part)
+            for part in parts
+        ) + "$")
+
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and bool(self.pattern.match(path))
+
+    def to_dict(self) -> dict:
+        return {"route": self.route, "percent": self.percent, "mode": ",".join(sorted(self.modes))}
+
+
+def _parse_rules(spec: str) -> dict:
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, percent = item.rpartition("=")
+        rules[route] = SamplingRule(route, float(percent), {"cpu"})
+    return rules
+
+
+sampling_rules = _parse_rules(PROFILE_SAMPLE_ROUTES)
+
+
+class LoopSampler:
+    """Samples the event-loop thread's stack while one task is running"""
+
+    def __init__(self, interval_ms: float):
+        self.interval = interval_ms / 1000
+        self._stopped = threading.Event()
+        self._frames = {}
+        self.frames = []
+        self.samples = []
+        self.weights = []
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._thread_id = threading.get_ident()
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._start
+
+    def _frame_index(self, code) -> int:
+        key = (code.co_filename, code.co_firstlineno, code.co_name)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            if asyncio.current_task(self._loop) is not self._task:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_index(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(elapsed)
+
+    def speedscope(self, name: str) -> str:
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "mofi_common.profiling",
+            "name": name,
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        })
+
+
+class CpuProfile:
+    def __init__(self):
+        if Profiler is not None:
+            self._profiler = Profiler(interval=PROFILE_INTERVAL_MS / 1000, async_mode="enabled")
+        else:
+            self._profiler = LoopSampler(PROFILE_INTERVAL_MS)
+
+    def start(self):
+        self._profiler.start()
+
+    def stop(self):
+        self._profiler.stop()
+
+    def render(self, name: str) -> str:
+        if Profiler is not None:
+            return self._profiler.output(SpeedscopeRenderer())
+        return self._profiler.speedscope(name)
+
+
+def _trace_filters():
+    return [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        # The CPU sampler's own allocations
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ]
+
+
+def _memory_diff(before, after) -> dict:
+    diffs = after.filter_traces(_trace_filters()).compare_to(before.filter_traces(_trace_filters()), "traceback")
+    return {
+        "allocated_bytes": sum(diff.size_diff for diff in diffs),
+        "top": [
+            {
+                "size_diff": diff.size_diff,
+                "count_diff": diff.count_diff,
+                "size": diff.size,
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in diff.traceback],
+            }
+            for diff in diffs[:PROFILE_MEMORY_TOP]
+        ],
+    }
+
+
+class MemoryProfile:
+    def start(self):
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        self._before = tracemalloc.take_snapshot()
+
+    def stop(self):
+        self._after = tracemalloc.take_snapshot()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        if self._started:
+            tracemalloc.stop()
+
+    def render(self, name: str) -> str:
+        return json.dumps({"name": name, "peak_traced_bytes": self.peak, **_memory_diff(self._before, self._after)})
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^\w-]+", "_", text).strip("_")[:60] or "root"
+
+
+def _save(files: dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    for name, content in files.items():
+        with open(os.path.join(PROFILE_DIR, name), "w") as f:
+            f.write(content)
+    stored = sorted(os.scandir(PROFILE_DIR), key=lambda entry: entry.stat().st_mtime)
+    for entry in stored[:max(len(stored) - PROFILE_MAX_FILES, 0)]:
+        os.unlink(entry.path)
+
+
+# One profile at a time per process
+_busy = threading.Lock()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling signed or sampled requests"""
+
+    def __init__(self, app, app_name: str):
+        self.app = app
+        self.app_name = app_name
+
+    def _modes(self, scope):
+        header = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                header = value.decode("latin-1")
+                break
+        modes = verify(header, scope["path"])
+        if modes is not None:
+            return modes & MODES
+
+        path = scope["path"][len(scope.get("root_path", "")):] if scope.get("root_path") else scope["path"]
+        for rule in list(sampling_rules.values()):
+            if rule.matches(scope["method"], path):
+                return rule.modes if random.random() * 100 < rule.percent else set()
+        return set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILE_SECRET:
+            await self.app(scope, receive, send)
+            return
+
+        modes = self._modes(scope)
+        if not modes:
+            await self.app(scope, receive, send)
+            return
+
+        if not _busy.acquire(blocking=False):
+            await self.app(scope, receive, self._with_result(send, "busy"))
+            return
+
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        base = f"{stamp}-{self.app_name}-{scope['method']}-{_slug(scope['path'])}-{secrets.token_hex(3)}"
+        profiles = {}
+        if "memory" in modes:
+            profiles[f"{base}.memory.json"] = MemoryProfile()
+        if "cpu" in modes:
+            profiles[f"{base}.speedscope.json"] = CpuProfile()
+
+        try:
+            for profile in profiles.values():
+                profile.start()
+            try:
+                await self.app(scope, receive, self._with_result(send, ",".join(profiles)))
+            finally:
+                for profile in reversed(list(profiles.values())):
+                    profile.stop()
+        finally:
+            _busy.release()
+
+        name = f"{scope['method']} {scope['path']}"
+        try:
+            # Rendering (snapshot diffs, speedscope JSON) is CPU work; keep it off the loop
+            await asyncio.to_thread(lambda: _save({file: profile.render(name) for file, profile in profiles.items()}))
+        except Exception as e:
+            print(f"Saving profile {base} failed: {e}")
+
+    @staticmethod
+    def _with_result(send, result: str):
+        async def send_with_result(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-result", result.encode("latin-1"))
+                ]
+            await send(message)
+        return send_with_result
+
+
+def require_profile_admin(request: Request):
+    if not PROFILE_SECRET:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if verify(request.headers.get("x-profile"), "admin") != {"admin"}:
+        raise HTTPException(status_code=403, detail="Invalid or expired profiling token")
+
+
+class SamplingUpdate(BaseModel):
+    route: str
+    percent: float
+    mode: str = "cpu"
+
+
+profile_router = APIRouter(prefix="/debug/profiles", tags=["Debug"], dependencies=[Depends(require_profile_admin)])
+
+
+@profile_router.get("")
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return {"profiles": []}
+    entries = sorted(os.scandir(PROFILE_DIR), key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return {"profiles": [
+        {"name": entry.name, "bytes": entry.stat().st_size,
+         "created_at": datetime.utcfromtimestamp(entry.stat().st_mtime).isoformat()}
+        for entry in entries
+    ]}
+
+
+@profile_router.get("/sampling")
+def get_sampling():
+    return {"rules": [rule.to_dict() for rule in sampling_rules.values()]}
+
+
+@profile_router.put("/sampling")
+def update_sampling(data: SamplingUpdate):
+    modes = set(data.mode.split(","))
+    if not modes <= MODES or " " not in data.route.strip():
+        raise HTTPException(status_code=400, detail="route is 'METHOD /template', mode cpu and/or memory")
+    if data.percent <= 0:
+        sampling_rules.pop(data.route, None)
+    else:
+        sampling_rules[data.route] = SamplingRule(data.route, min(data.percent, 100), modes)
+    return get_sampling()
+
+
+_heap = {"snapshot": None, "taken_at": None}
+
+
+@profile_router.post("/heap")
+def heap_snapshot():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    result = {"traced_bytes": current, "peak_traced_bytes": peak, "previous": _heap["taken_at"]}
+    if _heap["snapshot"] is not None:
+        result.update(_memory_diff(_heap["snapshot"], snapshot))
+        name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-heap-{secrets.token_hex(3)}.memory.json"
+        _save({name: json.dumps(result)})
+        result["file"] = name
+    else:
+        result["message"] = "tracemalloc started; take another snapshot to see what grew"
+    _heap["snapshot"], _heap["taken_at"] = snapshot, datetime.utcnow().isoformat()
+    return result
+
+
+@profile_router.get("/{name}")
+def get_profile(name: str):
+    path = os.path.join(PROFILE_DIR, name)
+    if not PROFILE_NAME.match(name) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=name)
+
+
+@profile_router.delete("/{name}")
+def delete_profile(name: str):
+    path = os.path.join(PROFILE_DIR, name)
+    if not PROFILE_NAME.match(name) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    os.unlink(path)
+    return {"message": "Profile deleted"}
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Mint X-Profile headers")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sign_parser = sub.add_parser("sign", help="print an X-Profile header value")
+    target = sign_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--path", help="request path to profile, e.g. /movies/getfull_movie/42/full")
+    target.add_argument("--admin", action="store_true", help="token for the /debug/profiles endpoints")
+    sign_parser.add_argument("--mode", default="cpu", help="cpu, memory or cpu,memory")
+    sign_parser.add_argument("--ttl", type=int, default=300, help="seconds the token is valid")
+    args = parser.parse_args()
+
+    secret = os.getenv("PROFILE_SECRET")
+    if not secret:
+        parser.error("PROFILE_SECRET is not set")
+    expires = int(time.time()) + args.ttl
+    if args.admin:
+        print(sign("admin", expires, "admin", secret))
+    else:
+        print(sign(args.mode, expires, args.path, secret))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+Query-plan auditor: explains the queries the services actually send.
+
+With QUERY_AUDIT=1 a pymongo CommandListener (registered globally, like the
+metrics and tracing ones, so it sees Motor and PyMongo clients alike) groups
+every find / aggregate / count / distinct / update / delete / findAndModify
+by query shape: the filter with values replaced by "?" and per-document ids
+in field names replaced by <id>, so
+
+    {"movies.65f0c2...": {"$exists": True}}  ->  {"movies.<id>": {"$exists": "?"}}
+
+A sample of each shape (QUERY_AUDIT_SAMPLE_RATE, at most
+QUERY_AUDIT_SAMPLES_PER_SHAPE) is explained with executionStats on a
+background thread, and, if QUERY_AUDIT_FILE is set, appended there so it can
+be replayed later. The report lists per shape: executions, COLLSCANs, docs
+examined per document returned, the winning plan's stages and indexes, and
+an index suggestion (equality fields, then sort, then ranges), marked when
+mofi_common.indexes already declares it.
+
+    GET /debug/queries          report for this process (filters, plans);
+                                needs the /debug/profiles admin token
+                                (mofi_common.profiling `sign --admin`),
+                                404 unless PROFILE_SECRET is set
+
+    python -m mofi_common.query_audit report --file query_audit.jsonl [--uri URI] [--json]
+                                explain the recorded samples against URI
+                                (a seeded local mongod) and print the report
+
+explain executionStats runs the query, so this is meant for development and
+staging; QUERY_AUDIT_URI (default MONGO_URI) is the server explained against.
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import re
+import threading
+
+from bson import json_util
+from bson.regex import Regex
+from fastapi import APIRouter, Depends
+from pymongo import monitoring
+
+from mofi_common.profiling import require_profile_admin
+
+QUERY_AUDIT = os.getenv("QUERY_AUDIT", "0") == "1"
+QUERY_AUDIT_SAMPLE_RATE = float(os.getenv("QUERY_AUDIT_SAMPLE_RATE", 0.1))
+QUERY_AUDIT_SAMPLES_PER_SHAPE = int(os.getenv("QUERY_AUDIT_SAMPLES_PER_SHAPE", 3))
+QUERY_AUDIT_MAX_SHAPES = int(os.getenv("QUERY_AUDIT_MAX_SHAPES", 1000))
+QUERY_AUDIT_FILE = os.getenv("QUERY_AUDIT_FILE")
+QUERY_AUDIT_URI = os.getenv("QUERY_AUDIT_URI") or os.getenv("MONGO_URI")
+# Shapes examining more documents than this per document returned are flagged
+QUERY_AUDIT_RATIO_THRESHOLD = float(os.getenv("QUERY_AUDIT_RATIO_THRESHOLD", 10))
+
+AUDITED_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+SYSTEM_DATABASES = {"admin", "config", "local"}
+# Not accepted (or not meaningful) inside an explain
+STRIPPED_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+DYNAMIC_SEGMENT = re.compile(r"^([0-9a-f]{24}|\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$")
+
+
+def _normalize_key(key: str) -> str:
+    return ".".join("<id>" if DYNAMIC_SEGMENT.match(part) else part for part in key.split("."))
+
+
+def query_shape(value):
+    """The filter with its values replaced by "?" (operators and fields kept)"""
+    if isinstance(value, dict):
+        shape = {}
+        for key, inner in value.items():
+            if key == "$options":
+                # Part of $regex (stored samples decode both as one Regex)
+                continue
+            if key in ("$and", "$or", "$nor") and isinstance(inner, list):
+                shape[key] = [query_shape(branch) for branch in inner]
+            elif isinstance(inner, dict) or isinstance(inner, (re.Pattern, Regex)):
+                shape[_normalize_key(key)] = query_shape(inner)
+            else:
+                shape[_normalize_key(key)] = "?"
+        return shape
+    if isinstance(value, (re.Pattern, Regex)):
+        return {"$regex": "?"}
+    return "?"
+
+
+def command_filter(command_name: str, command: dict):
+    """(filter, sort) of a command, None when there is nothing to audit"""
+    if command_name == "find":
+        return command.get("filter", {}), command.get("sort") or {}
+    if command_name in ("count", "distinct"):
+        return command.get("query", {}), {}
+    if command_name == "findAndModify":
+        return command.get("query", {}), command.get("sort") or {}
+    if command_name == "update" and command.get("updates"):
+        return command["updates"][0].get("q", {}), {}
+    if command_name == "delete" and command.get("deletes"):
+        return command["deletes"][0].get("q", {}), {}
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline", [])
+        if any("$out" in stage or "$merge" in stage for stage in pipeline):
+            return None
+        query, sort = {}, {}
+        for stage in pipeline:
+            if "$match" in stage and not query and not sort:
+                query = stage["$match"]
+            elif "$sort" in stage and not sort:
+                sort = stage["$sort"]
+            else:
+                break
+        return query, sort
+    return None
+
+
+def explainable(command_name: str, command: dict) -> dict:
+    """A copy of the command that can be sent inside explain"""
+    cleaned = {key: value for key, value in command.items()
+               if not key.startswith("$") and key not in STRIPPED_FIELDS}
+    # explain takes a single update/delete statement
+    if command_name == "update":
+        cleaned["updates"] = cleaned["updates"][:1]
+    elif command_name == "delete":
+        cleaned["deletes"] = cleaned["deletes"][:1]
+    return cleaned
+
+
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+
+
+def summarize_explain(explain: dict) -> dict:
+    """Winning-plan stages, indexes used and execution counts of an explain"""
+    stages, indexes = [], []
+    docs_examined = keys_examined = returned = millis = 0
+    for node in _walk(explain):
+        if isinstance(node.get("winningPlan"), dict):
+            for stage in _walk(node["winningPlan"]):
+                if isinstance(stage.get("stage"), str):
+                    stages.append(stage["stage"])
+                if stage.get("indexName") and stage["indexName"] not in indexes:
+                    indexes.append(stage["indexName"])
+        stats = node.get("executionStats")
+        if isinstance(stats, dict) and "totalDocsExamined" in stats:
+            docs_examined += stats.get("totalDocsExamined", 0)
+            keys_examined += stats.get("totalKeysExamined", 0)
+            returned += stats.get("nReturned", 0)
+            millis = max(millis, stats.get("executionTimeMillis", 0))
+    return {
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages,
+        "indexes": indexes,
+        "docs_examined": docs_examined,
+        "keys_examined": keys_examined,
+        "returned": returned,
+        "millis": millis,
+    }
+
+
+def suggest_index(shape: dict, sort: dict):
+    """Equality, sort, range (ESR) key order for a shape, plus caveats"""
+    equality, ranges, notes = [], [], []
+
+    def visit(query):
+        for key, value in query.items():
+            if key == "$and":
+                for branch in value:
+                    visit(branch)
+            elif key in ("$or", "$nor"):
+                notes.append(f"{key}: every branch needs its own index")
+            elif key.startswith("$"):
+                continue
+            elif "<id>" in key:
+                notes.append(f"{key}: field names built from ids cannot be indexed; "
+                             f"store them in an array and use a multikey index")
+            elif isinstance(value, dict) and not set(value) <= {"$eq", "$in"}:
+                ranges.append(key)
+                if "$regex" in value:
+                    notes.append(f"{key}: $regex only uses an index when anchored (^...) and "
+                                 f"case-sensitive; consider a text index")
+            else:
+                equality.append(key)
+
+    visit(shape)
+    keys = [(field, 1) for field in equality]
+    keys += [(field, direction) for field, direction in sort.items()
+             if field not in equality and "<id>" not in field]
+    keys += [(field, 1) for field in ranges if field not in equality and field not in sort]
+    if not keys or keys == [("_id", 1)]:
+        return None, notes
+    return keys, notes
+
+
+def _declared(collection: str, keys) -> bool:
+    """Whether mofi_common.indexes declares an index starting with these fields"""
+    from mofi_common.indexes import COLLECTION_NAMES, INDEXES
+
+    registry_name = next((name for name, physical in COLLECTION_NAMES.items()
+                          if physical == collection), collection)
+    fields = [field for field, _ in keys]
+    for model in INDEXES.get(registry_name, []):
+        declared = list(model.document["key"])
+        if declared[:len(fields)] == fields:
+            return True
+    return False
+
+
+class QueryAudit(monitoring.CommandListener):
+    def __init__(self, sample_rate: float, samples_per_shape: int):
+        self.sample_rate = sample_rate
+        self.samples_per_shape = samples_per_shape
+        self._lock = threading.Lock()
+        self._shapes = {}
+        self._queue = None
+
+    def record(self, database: str, command_name: str, command: dict, count: int = 1, sample=True):
+        """Count one execution; returns the shape entry when it should be explained"""
+        parts = command_filter(command_name, command)
+        if parts is None:
+            return None
+        query, sort = parts
+        shape = query_shape(query)
+        sort_shape = {_normalize_key(field): direction for field, direction in dict(sort).items()}
+        collection = command.get(command_name)
+        key = json.dumps([database, collection, command_name, shape, sort_shape], sort_keys=True)
+
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                if len(self._shapes) >= QUERY_AUDIT_MAX_SHAPES:
+                    return None
+                entry = self._shapes[key] = {
+                    "database": database,
+                    "collection": collection,
+                    "command": command_name,
+                    "shape": shape,
+                    "sort": sort_shape,
+                    "executions": 0,
+                    "sampled": 0,
+                    "explains": [],
+                }
+            entry["executions"] += count
+            if not sample or entry["sampled"] >= self.samples_per_shape:
+                return None
+            if entry["sampled"] and random.random() >= self.sample_rate:
+                return None
+            entry["sampled"] += 1
+        return entry
+
+    def started(self, event):
+        if event.command_name not in AUDITED_COMMANDS or event.database_name in SYSTEM_DATABASES:
+            return
+        entry = self.record(event.database_name, event.command_name, event.command)
+        if entry is None:
+            return
+        command = explainable(event.command_name, event.command)
+        if QUERY_AUDIT_FILE:
+            self._save_sample(event.database_name, event.command_name, command)
+        if QUERY_AUDIT_URI:
+            self._explain_later(entry, event.database_name, command)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def _save_sample(self, database: str, command_name: str, command: dict):
+        line = json_util.dumps({"database": database, "command_name": command_name, "command": command})
+        with self._lock:
+            with open(QUERY_AUDIT_FILE, "a") as f:
+                f.write(line + "\n")
+
+    def _explain_later(self, entry: dict, database: str, command: dict):
+        if self._queue is None:
+            with self._lock:
+                if self._queue is None:
+                    self._queue = queue.Queue(maxsize=1000)
+                    threading.Thread(target=self._explain_worker, name="query-audit", daemon=True).start()
+        try:
+            self._queue.put_nowait((entry, database, command))
+        except queue.Full:
+            pass
+
+    def _explain_worker(self):
+        from mofi_common.mongo import get_sync_client
+
+        client = get_sync_client(QUERY_AUDIT_URI)
+        while True:
+            entry, database, command = self._queue.get()
+            self.explain(client, entry, database, command)
+
+    def explain(self, client, entry: dict, database: str, command: dict):
+        try:
+            explained = client[database].command({"explain": command, "verbosity": "executionStats"})
+            summary = summarize_explain(explained)
+        except Exception as e:
+            summary = {"error": str(e)}
+        with self._lock:
+            entry["explains"].append(summary)
+
+    def report(self) -> list:
+        with self._lock:
+            entries = [dict(entry, explains=list(entry["explains"])) for entry in self._shapes.values()]
+        rows = [_report_row(entry) for entry in entries]
+        order = {"COLLSCAN": 0, "inefficient": 1, "unexplained": 2, "ok": 3}
+        rows.sort(key=lambda row: (order[row["status"]], -row["executions"] * (row["examined_per_returned"] or 1)))
+        return rows
+
+
+def _report_row(entry: dict) -> dict:
+    explains = [summary for summary in entry["explains"] if "error" not in summary]
+    docs_examined = sum(summary["docs_examined"] for summary in explains)
+    returned = sum(summary["returned"] for summary in explains)
+    collscans = sum(1 for summary in explains if summary["collscan"])
+    ratio = round(docs_examined / max(returned, 1), 1) if explains else None
+
+    if not explains:
+        status = "unexplained"
+    elif collscans:
+        status = "COLLSCAN"
+    elif ratio > QUERY_AUDIT_RATIO_THRESHOLD:
+        status = "inefficient"
+    else:
+        status = "ok"
+
+    row = {
+        "status": status,
+        "namespace": f"{entry['database']}.{entry['collection']}",
+        "command": entry["command"],
+        "shape": entry["shape"],
+        "sort": entry["sort"],
+        "executions": entry["executions"],
+        "explained": len(explains),
+        "collscans": collscans,
+        "docs_examined": docs_examined,
+        "keys_examined": sum(summary["keys_examined"] for summary in explains),
+        "returned": returned,
+        "examined_per_returned": ratio,
+        "max_ms": max((summary["millis"] for summary in explains), default=None),
+        "stages": explains[-1]["stages"] if explains else [],
+        "indexes_used": sorted({name for summary in explains for name in summary["indexes"]}),
+        "errors": [summary["error"] for summary in entry["explains"] if "error" in summary],
+    }
+    if status in ("COLLSCAN", "inefficient"):
+        keys, notes = suggest_index(entry["shape"], entry["sort"])
+        row["suggested_index"] = keys
+        row["index_declared"] = _declared(entry["collection"], keys) if keys else False
+        row["notes"] = notes
+    return row
+
+
+query_audit = QueryAudit(QUERY_AUDIT_SAMPLE_RATE, QUERY_AUDIT_SAMPLES_PER_SHAPE)
+if QUERY_AUDIT:
+    monitoring.register(query_audit)
+
+
+audit_router = APIRouter(prefix="/debug/queries", tags=["Debug"], dependencies=[Depends(require_profile_admin)])
+
+
+@audit_router.get("")
+def query_report():
+    return {"enabled": QUERY_AUDIT, "shapes": query_audit.report()}
+
+
+def replay(path: str, uri: str) -> list:
+    """Explain every recorded sample against uri and build the report"""
+    from pymongo import MongoClient
+
+    auditor = QueryAudit(sample_rate=1.0, samples_per_shape=QUERY_AUDIT_SAMPLES_PER_SHAPE)
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    try:
+        client.admin.command("ping")
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                sample = json_util.loads(line)
+                entry = auditor.record(sample["database"], sample["command_name"], sample["command"])
+                if entry is not None:
+                    auditor.explain(client, entry, sample["database"], sample["command"])
+    finally:
+        client.close()
+    return auditor.report()
+
+
+def _format_index(keys) -> str:
+    return "{" + ", ".join(f"{field}: {direction}" for field, direction in keys) + "}"
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Explain recorded queries and report collection scans")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report_parser = sub.add_parser("report", help="explain the samples in a QUERY_AUDIT_FILE")
+    report_parser.add_argument("--file", default=QUERY_AUDIT_FILE or "query_audit.jsonl")
+    report_parser.add_argument("--uri", default=QUERY_AUDIT_URI or "mongodb://localhost:27017")
+    report_parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    try:
+        rows = replay(args.file, args.uri)
+    except Exception as e:
+        print(f"Query audit failed: {e}")
+        return
+
+    if args.json:
+        print(json.dumps(rows, indent=2, default=str))
+        return
+
+    for row in rows:
+        ratio = row["examined_per_returned"]
+        print(f"{row['status']:<12} {row['namespace']:<28} {row['command']:<10} "
+              f"samples={row['executions']:<4} ratio={'-' if ratio is None else ratio:<7} "
+              f"stages={'>'.join(reversed(row['stages']))}")
+        print(f"             shape={json.dumps(row['shape'])} sort={json.dumps(row['sort'])}")
+        if row.get("suggested_index"):
+            declared = " (declared in mofi_common.indexes; run `python -m mofi_common.indexes report --apply`)" \
+                if row["index_declared"] else ""
+            print(f"             suggest {_format_index(row['suggested_index'])}{declared}")
+        for note in row.get("notes", []):
+            print(f"             note: {note}")
+        for error in row["errors"]:
+            print(f"             error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Orphaned media reconciliation.
+
+Uploads that fail halfway (a register_user whose insert never happens, a
+cleanup that errored) leave files in storage that no document points to.
+reconcile() lists every media folder page by page, builds the set of files
+MongoDB still references and deletes the difference:
+
+    orphans = stored - referenced - recent
+
+A file is only an orphan when it is older than the grace period, so uploads
+that are still on their way to a document (a trailer job between its
+thumbnail and its trailer, a pending direct upload) are left alone. Content
+hashes (media_hashes) touched within the grace period count as references,
+and the hash entries of deleted files are removed with them so deduplication
+never hands out a deleted URL.
+
+Every collection is checked against every folder: deduplication can point a
+movie still at a file stored under movie_db/movies. A folder is skipped when
+one of the collections that may reference it was not supplied.
+
+Runs from movie_api every MEDIA_RECONCILE_INTERVAL_HOURS (off by default) or
+as a CLI, which only reports unless --apply is given:
+
+    python -m mofi_common.reconcile [--apply] [--grace-hours 24] [--folder F] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+from mofi_common.storage import get_storage
+
+MEDIA_RECONCILE_GRACE_HOURS = int(os.getenv("MEDIA_RECONCILE_GRACE_HOURS", 24))
+MEDIA_RECONCILE_INTERVAL_HOURS = float(os.getenv("MEDIA_RECONCILE_INTERVAL_HOURS", 0))
+
+# Fields holding media URLs, per registry collection name
+MEDIA_REFERENCES = {
+    "movies": ("image1", "image2"),
+    "trailers": ("thumbnail_url", "video_url"),
+    "movie_images": ("image_url",),
+    "Producers": ("profile_pic",),
+    "users": ("profile_pic",),
+}
+
+# Collections whose URLs can point into each folder
+MEDIA_FOLDERS = {
+    "movie_db/movies": ("movies", "movie_images"),
+    "movie_db/trailers": ("trailers",),
+    "movie_db/movie_images": ("movie_images", "movies"),
+    "producers/profile_pics": ("Producers",),
+    "users/profile_pics": ("users",),
+}
+
+# Orphans handed to storage per delete
+RECONCILE_BATCH_SIZE = 100
+
+
+def _key(storage, url: str):
+    """(resource_type, public_id) of a URL, or None for foreign URLs"""
+    try:
+        public_id, resource_type = storage.locate(url)
+    except ValueError:
+        return None
+    return resource_type, public_id
+
+
+async def referenced_keys(storage, collections: dict, cutoff: datetime) -> set:
+    """Every stored file a document, a recent content hash or a pending direct upload uses"""
+    keys = set()
+
+    for name, fields in MEDIA_REFERENCES.items():
+        collection = collections.get(name)
+        if collection is None:
+            continue
+        projection = {field: 1 for field in fields}
+        projection["_id"] = 0
+        async for doc in collection.find({}, projection):
+            for field in fields:
+                if doc.get(field):
+                    keys.add(_key(storage, doc[field]))
+
+    media_hashes = collections.get("media_hashes")
+    if media_hashes is not None:
+        async for entry in media_hashes.find({"updated_at": {"$gte": cutoff}}, {"_id": 0, "url": 1}):
+            keys.add(_key(storage, entry["url"]))
+
+    direct_uploads = collections.get("direct_uploads")
+    if direct_uploads is not None:
+        pending = direct_uploads.find({"status": {"$in": ["pending", "recording"]}}, {"_id": 0, "assets": 1})
+        async for upload in pending:
+            for asset in upload["assets"].values():
+                keys.add((asset["resource_type"], asset["public_id"]))
+
+    keys.discard(None)
+    return keys
+
+
+async def _delete(storage, orphans: list, media_hashes, cutoff: datetime) -> dict:
+    urls = [asset["url"] for asset in orphans]
+    if media_hashes is not None:
+        # A hash re-acquired since the scan keeps its file
+        reused = await media_hashes.distinct("url", {"url": {"$in": urls}, "updated_at": {"$gte": cutoff}})
+        urls = [url for url in urls if url not in set(reused)]
+        await media_hashes.delete_many({"url": {"$in": urls}, "updated_at": {"$lt": cutoff}})
+    summary = await storage.delete_urls(urls)
+    summary["skipped"] = len(orphans) - len(urls)
+    return summary
+
+
+async def reconcile(collections: dict, dry_run: bool = True,
+                    grace_hours: int = MEDIA_RECONCILE_GRACE_HOURS, folders=None) -> dict:
+    """
+    Find (and unless dry_run, delete) stored files nothing references.
+
+    collections maps registry names (movies, trailers, movie_images,
+    Producers, users, media_hashes, direct_uploads) to Motor collections.
+    """
+    storage = get_storage()
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    referenced = await referenced_keys(storage, collections, cutoff)
+
+    report = {
+        "dry_run": dry_run,
+        "grace_hours": grace_hours,
+        "referenced": len(referenced),
+        "folders": {},
+    }
+
+    for folder in folders or MEDIA_FOLDERS:
+        missing = [name for name in MEDIA_FOLDERS.get(folder, ()) if name not in collections]
+        if folder not in MEDIA_FOLDERS or missing:
+            report["folders"][folder] = {"status": "skipped", "missing": missing or ["unknown folder"]}
+            continue
+
+        stats = {"status": "ok", "stored": 0, "orphaned": 0, "recent": 0, "orphaned_bytes": 0,
+                 "deleted": 0, "failed": 0, "orphans": []}
+        pending = []
+
+        async for page in storage.list_assets(folder):
+            stats["stored"] += len(page)
+            listed = {(asset["resource_type"], asset["public_id"]): asset for asset in page}
+            for key in listed.keys() - referenced:
+                asset = listed[key]
+                if asset["created_at"] >= cutoff:
+                    stats["recent"] += 1
+                    continue
+                stats["orphaned"] += 1
+                stats["orphaned_bytes"] += asset.get("bytes") or 0
+                stats["orphans"].append(asset["url"])
+                pending.append(asset)
+
+            if not dry_run and len(pending) >= RECONCILE_BATCH_SIZE:
+                result = await _delete(storage, pending, collections.get("media_hashes"), cutoff)
+                stats["deleted"] += result["deleted"]
+                stats["failed"] += result["failed"]
+                pending = []
+
+        if not dry_run and pending:
+            result = await _delete(storage, pending, collections.get("media_hashes"), cutoff)
+            stats["deleted"] += result["deleted"]
+            stats["failed"] += result["failed"]
+
+        report["folders"][folder] = stats
+
+    return report
+
+
+async def run_periodically(collections: dict, interval_hours: float = MEDIA_RECONCILE_INTERVAL_HOURS):
+    """Background loop for an app's lifespan; each pass deletes what it finds"""
+    while True:
+        await asyncio.sleep(interval_hours * 60 * 60)
+        try:
+            report = await reconcile(collections, dry_run=False)
+            for folder, stats in report["folders"].items():
+                if stats.get("orphaned"):
+                    print(f"Media reconcile {folder}: deleted {stats['deleted']} of {stats['orphaned']} orphans")
+        except Exception as e:
+            print(f"Media reconcile failed: {str(e)}")
+
+
+async def _run(args) -> dict:
+    from mofi_common.indexes import COLLECTION_DATABASES, COLLECTION_NAMES, _database_name
+    from mofi_common.mongo import get_client
+
+    client = get_client(os.getenv("MONGO_URI"))
+    collections = {}
+    for name in list(MEDIA_REFERENCES) + ["media_hashes", "direct_uploads"]:
+        db_name = _database_name(name)
+        if db_name:
+            collections[name] = client[db_name][COLLECTION_NAMES.get(name, name)]
+        else:
+            print(f"Skipping {name}: {COLLECTION_DATABASES[name][0]} not set")
+
+    try:
+        return await reconcile(collections, dry_run=not args.apply,
+                               grace_hours=args.grace_hours, folders=args.folder)
+    finally:
+        client.close()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Find and delete media files nothing references")
+    parser.add_argument("--apply", action="store_true", help="delete orphans (default: report only)")
+    parser.add_argument("--grace-hours", type=int, default=MEDIA_RECONCILE_GRACE_HOURS,
+                        help="ignore files younger than this")
+    parser.add_argument("--folder", action="append", help="only this folder (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a summary")
+    args = parser.parse_args()
+
+    report = asyncio.run(_run(args))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for folder, stats in report["folders"].items():
+        if stats["status"] == "skipped":
+            print(f"skipped  {folder:<24} missing {', '.join(stats['missing'])}")
+            continue
+        print(f"{'applied' if args.apply else 'dry-run'}  {folder:<24} stored={stats['stored']} "
+              f"orphaned={stats['orphaned']} ({stats['orphaned_bytes'] // 1024} KB) "
+              f"recent={stats['recent']} deleted={stats['deleted']} failed={stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
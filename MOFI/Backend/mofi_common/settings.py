@@ -0,0 +1,86 @@
+"""
+Per-app settings for apps sharing one process (gateway.py).
+
+Run on its own, an app reads os.environ and the cloudinary module's global
+config, and nothing here changes that. Under the gateway every mounted app
+gets an AppSettings holding its .env values and the Cloudinary credentials
+it configured at import; AppContext makes it the active one for each
+request (and background tasks started from it), and the gateway activates it
+around the app's lifespan. Code that reads a setting after import, or talks
+to Cloudinary, goes through getenv() / cloudinary_config() /
+cloudinary_options() so each app keeps its own values.
+"""
+import os
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+
+CLOUDINARY_CREDENTIALS = ("cloud_name", "api_key", "api_secret")
+
+_current = ContextVar("app_settings", default=None)
+
+
+class AppSettings:
+    def __init__(self, name: str, env: dict, cloudinary: dict = None):
+        self.name = name
+        self.env = env
+        self.cloudinary = cloudinary or {}
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def activate(settings: AppSettings):
+    token = _current.set(settings)
+    try:
+        yield settings
+    finally:
+        _current.reset(token)
+
+
+def getenv(key: str, default=None):
+    """os.getenv, with the active app's .env values taking precedence"""
+    settings = _current.get()
+    if settings is not None and key in settings.env:
+        return settings.env[key]
+    return os.getenv(key, default)
+
+
+def cloudinary_options() -> dict:
+    """Credentials to pass to a Cloudinary SDK call ({} outside the gateway)"""
+    settings = _current.get()
+    return dict(settings.cloudinary) if settings is not None else {}
+
+
+def cloudinary_config():
+    """cloud_name / api_key / api_secret / signature_algorithm in effect"""
+    import cloudinary
+
+    config = cloudinary.config()
+    values = {name: getattr(config, name, None) for name in CLOUDINARY_CREDENTIALS}
+    values.update(cloudinary_options())
+    values["signature_algorithm"] = getattr(config, "signature_algorithm", None) or "sha1"
+    return SimpleNamespace(**values)
+
+
+def snapshot_cloudinary() -> dict:
+    """The cloudinary module's credentials right now (taken after an app's import)"""
+    if "cloudinary" not in sys.modules:
+        return {}
+    config = sys.modules["cloudinary"].config()
+    return {name: getattr(config, name) for name in CLOUDINARY_CREDENTIALS if getattr(config, name, None)}
+
+
+class AppContext:
+    """ASGI wrapper activating an app's settings for every request"""
+
+    def __init__(self, app, settings: AppSettings):
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope, receive, send):
+        with activate(self.settings):
+            await self.app(scope, receive, send)
@@ -0,0 +1,37 @@
+"""
+Pluggable media storage.
+
+MEDIA_STORAGE selects the driver for every service:
+
+    cloudinary (default)  CloudinaryStorage, files on Cloudinary
+    local                 LocalStorage, one file per upload under
+                          MEDIA_LOCAL_ROOT served by local.media_router
+
+Services call get_storage() when they need it, after their .env is loaded.
+Under the gateway MEDIA_STORAGE is read from the .env of the app making the
+call (mofi_common.settings); the local driver's MEDIA_LOCAL_* settings are
+process-wide.
+"""
+import functools
+
+from mofi_common.settings import getenv
+from mofi_common.storage.base import MediaStorage
+
+
+def storage_backend() -> str:
+    return getenv("MEDIA_STORAGE", "cloudinary").lower()
+
+
+def get_storage() -> MediaStorage:
+    return _storage(storage_backend())
+
+
+@functools.lru_cache(maxsize=None)
+def _storage(backend: str) -> MediaStorage:
+    if backend == "local":
+        from mofi_common.storage.local import LocalStorage
+        return LocalStorage()
+    if backend == "cloudinary":
+        from mofi_common.storage.cloudinary_driver import CloudinaryStorage
+        return CloudinaryStorage()
+    raise ValueError(f"Unknown MEDIA_STORAGE backend: {backend}")
@@ -0,0 +1,54 @@
+"""
+Interface shared by the media storage drivers.
+
+Drivers store a file under a folder and hand back
+{"url", "public_id", "resource_type", "bytes"}; the URL is what services keep
+in MongoDB, the public_id is what profile documents keep for deletes.
+
+list_assets() pages through what is stored under a folder, as
+{"url", "public_id", "resource_type", "bytes", "created_at"} dicts.
+
+A driver missing one of the abstract methods fails when it is instantiated.
+"""
+from abc import ABC, abstractmethod
+
+
+class MediaStorage(ABC):
+    name = None
+
+    @abstractmethod
+    async def save(self, file, folder: str, resource_type: str = "image",
+                   filename: str = None, **options) -> dict:
+        """Store a path or readable file object"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, public_id: str, resource_type: str = "image") -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list_assets(self, folder: str):
+        """Async iterator over pages (lists) of the assets stored under folder"""
+        raise NotImplementedError
+        yield []
+
+    @abstractmethod
+    def locate(self, url: str):
+        """Return (public_id, resource_type) for a URL this driver produced"""
+        raise NotImplementedError
+
+    async def delete_url(self, url: str) -> bool:
+        public_id, resource_type = self.locate(url)
+        return await self.delete(public_id, resource_type)
+
+    async def delete_urls(self, urls) -> dict:
+        """Delete many files by URL; failures are reported, not raised"""
+        summary = {"deleted": 0, "failed": 0}
+        for url in set(urls):
+            try:
+                deleted = await self.delete_url(url)
+            except Exception as e:
+                print(f"Failed to delete media {url}: {str(e)}")
+                deleted = False
+            summary["deleted" if deleted else "failed"] += 1
+        return summary
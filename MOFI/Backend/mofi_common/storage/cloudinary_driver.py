@@ -0,0 +1,144 @@
+"""
+Cloudinary storage driver.
+
+SDK calls run on the shared media thread pool; videos are sent in
+MEDIA_CHUNK_SIZE parts. Each service still configures the cloudinary module
+(cloud name and credentials) itself.
+"""
+import re
+from datetime import datetime
+
+from mofi_common.media import media_client
+from mofi_common.storage.base import MediaStorage
+
+# Cloudinary's Admin API deletes at most 100 public ids per call
+DELETE_BATCH_SIZE = 100
+# and lists at most 500 resources per page
+LIST_PAGE_SIZE = 500
+
+
+def extract_public_id_from_url(url: str) -> str:
+    """Extract public ID from Cloudinary URL"""
+    # Remove protocol and split
+    url_parts = url.split('/')
+    
+    # Find the index of 'upload'
+    try:
+        upload_index = url_parts.index('upload')
+        # Get everything after upload
+        if len(url_parts) > upload_index + 1:
+            # Check if next part is a version (starts with 'v')
+            if url_parts[upload_index + 1].startswith('v'):
+                public_id_parts = url_parts[upload_index + 2:]
+            else:
+                public_id_parts = url_parts[upload_index + 1:]
+            
+            # Join parts and remove file extension
+            public_id = '/'.join(public_id_parts)
+            # Remove file extension if present
+            public_id = re.sub(r'\.[^/.]+$', '', public_id)
+            return public_id
+    except (ValueError, IndexError):
+        pass
+    
+    # Fallback: try to extract from URL pattern
+    pattern = r'/(?:v\d+/)?([^/]+/)*[^/.]+(?=\.\w+$)'
+    match = re.search(pattern, url)
+    if match:
+        return match.group(0).lstrip('/v0123456789/')
+    
+    raise ValueError(f"Cannot extract public ID from URL: {url}")
+
+
+class CloudinaryStorage(MediaStorage):
+    name = "cloudinary"
+
+    async def save(self, file, folder: str, resource_type: str = "image",
+                   filename: str = None, **options) -> dict:
+        if resource_type == "video":
+            result = await media_client.upload_large(
+                file,
+                folder=folder,
+                resource_type="video",
+                filename=filename or "video",
+                **options
+            )
+        else:
+            if filename:
+                options.setdefault("filename", filename)
+            result = await media_client.upload(
+                file,
+                folder=folder,
+                resource_type=resource_type,
+                **options
+            )
+
+        return {
+            "url": result.get("secure_url"),
+            "public_id": result.get("public_id"),
+            "resource_type": resource_type,
+            "bytes": result.get("bytes"),
+        }
+
+    async def delete(self, public_id: str, resource_type: str = "image") -> bool:
+        result = await media_client.destroy(public_id, resource_type=resource_type)
+        return result.get("result") == "ok"
+
+    async def list_assets(self, folder: str):
+        for resource_type in ("image", "video"):
+            cursor = None
+            while True:
+                options = {"next_cursor": cursor} if cursor else {}
+                result = await media_client.resources(
+                    type="upload",
+                    prefix=f"{folder.strip('/')}/",
+                    resource_type=resource_type,
+                    max_results=LIST_PAGE_SIZE,
+                    **options
+                )
+                yield [
+                    {
+                        "url": resource["secure_url"],
+                        "public_id": resource["public_id"],
+                        "resource_type": resource_type,
+                        "bytes": resource.get("bytes"),
+                        "created_at": datetime.strptime(resource["created_at"], "%Y-%m-%dT%H:%M:%SZ"),
+                    }
+                    for resource in result.get("resources", [])
+                ]
+                cursor = result.get("next_cursor")
+                if not cursor:
+                    break
+
+    def locate(self, url: str):
+        resource_type = "video" if "/video/upload/" in url else "image"
+        return extract_public_id_from_url(url), resource_type
+
+    async def delete_urls(self, urls) -> dict:
+        """Admin API batch delete, DELETE_BATCH_SIZE ids per call per resource type"""
+        public_ids = {}
+        for url in urls:
+            try:
+                public_id, resource_type = self.locate(url)
+            except ValueError as e:
+                print(f"Skipping Cloudinary delete: {str(e)}")
+                continue
+            public_ids.setdefault(resource_type, set()).add(public_id)
+
+        summary = {"deleted": 0, "failed": 0}
+        for resource_type, ids in public_ids.items():
+            ids = sorted(ids)
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                batch = ids[start:start + DELETE_BATCH_SIZE]
+                try:
+                    result = await media_client.delete_resources(batch, resource_type=resource_type)
+                    for status in result.get("deleted", {}).values():
+                        if status in ("deleted", "not_found"):
+                            summary["deleted"] += 1
+                        else:
+                            summary["failed"] += 1
+                except Exception as e:
+                    summary["failed"] += len(batch)
+                    print(f"Failed to batch delete files from Cloudinary: {str(e)}")
+
+        return summary
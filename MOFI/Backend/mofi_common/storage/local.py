@@ -0,0 +1,174 @@
+"""
+Local filesystem storage driver.
+
+Every upload gets its own file, <MEDIA_LOCAL_ROOT>/<folder>/<sha256[:2]>/<sha256>-<nonce><ext>,
+so deleting one record's file never removes another's; deduplication is left
+to the services that reference-count it (media_hashes). Names never change
+(served with an immutable Cache-Control). URLs are MEDIA_LOCAL_BASE_URL + "/"
++ that key.
+
+media_router serves the files. Starlette's FileResponse answers Range requests
+(trailer seeking) and hands the path to the server for zero-copy sendfile when
+the ASGI server supports the pathsend extension. Behind nginx, set
+MEDIA_LOCAL_ACCEL_REDIRECT to an internal location and nginx sends the file
+itself.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, Response
+
+from mofi_common.media import media_client
+from mofi_common.storage.base import MediaStorage
+from mofi_common.tracing import span
+
+MEDIA_LOCAL_ROOT = os.path.abspath(os.getenv("MEDIA_LOCAL_ROOT", "media"))
+MEDIA_LOCAL_BASE_URL = os.getenv("MEDIA_LOCAL_BASE_URL", "http://localhost:8000/media").rstrip("/")
+MEDIA_LOCAL_ACCEL_REDIRECT = os.getenv("MEDIA_LOCAL_ACCEL_REDIRECT")
+
+COPY_CHUNK_SIZE = 1024 * 1024
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+
+def _extension(filename) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _EXTENSION.match(ext) else ""
+
+
+def resolve_path(public_id: str) -> str:
+    """Absolute path for a key, refusing anything outside MEDIA_LOCAL_ROOT"""
+    path = os.path.realpath(os.path.join(MEDIA_LOCAL_ROOT, public_id))
+    if not path.startswith(MEDIA_LOCAL_ROOT + os.sep):
+        raise ValueError(f"Invalid media key: {public_id}")
+    return path
+
+
+def _store(file, folder: str, filename) -> dict:
+    """Stream file into a temp file while hashing it, then move it into place"""
+    tmp_dir = os.path.join(MEDIA_LOCAL_ROOT, ".tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+    source = open(file, "rb") if isinstance(file, str) else file
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    finally:
+        if source is not file:
+            source.close()
+
+    sha256 = digest.hexdigest()
+    # The nonce keeps identical uploads in separate files: nothing counts
+    # references at this level, so a shared file could be deleted under
+    # another record
+    public_id = f"{folder.strip('/')}/{sha256[:2]}/{sha256}-{uuid.uuid4().hex[:12]}{_extension(filename)}"
+    path = resolve_path(public_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+
+    return {"public_id": public_id, "bytes": size, "sha256": sha256}
+
+
+def _list_dir(directory: str) -> list:
+    """Files in one <folder>/<sha256[:2]> directory as (key, bytes, mtime)"""
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                key = os.path.relpath(entry.path, MEDIA_LOCAL_ROOT).replace(os.sep, "/")
+                files.append((key, stat.st_size, stat.st_mtime))
+    return files
+
+
+class LocalStorage(MediaStorage):
+    name = "local"
+
+    async def save(self, file, folder: str, resource_type: str = "image",
+                   filename: str = None, **options) -> dict:
+        if filename is None:
+            filename = file if isinstance(file, str) else getattr(file, "name", None)
+        if not isinstance(filename, str):
+            filename = None
+
+        with span("local.save", "storage", folder=folder):
+            stored = await media_client.run(_store, file, folder, filename)
+        return {
+            "url": f"{MEDIA_LOCAL_BASE_URL}/{stored['public_id']}",
+            "public_id": stored["public_id"],
+            "resource_type": resource_type,
+            "bytes": stored["bytes"],
+        }
+
+    async def delete(self, public_id: str, resource_type: str = "image") -> bool:
+        path = resolve_path(public_id)
+        try:
+            with span("local.delete", "storage"):
+                await media_client.run(os.unlink, path)
+        except FileNotFoundError:
+            pass
+        return True
+
+    async def list_assets(self, folder: str):
+        root = resolve_path(folder.strip("/"))
+        if not os.path.isdir(root):
+            return
+        # One page per hash-prefix directory
+        for prefix in sorted(await media_client.run(os.listdir, root)):
+            directory = os.path.join(root, prefix)
+            if not os.path.isdir(directory):
+                continue
+            page = []
+            for public_id, size, mtime in await media_client.run(_list_dir, directory):
+                page.append({
+                    "url": f"{MEDIA_LOCAL_BASE_URL}/{public_id}",
+                    "public_id": public_id,
+                    "resource_type": self.locate(f"{MEDIA_LOCAL_BASE_URL}/{public_id}")[1],
+                    "bytes": size,
+                    "created_at": datetime.utcfromtimestamp(mtime),
+                })
+            yield page
+
+    def locate(self, url: str):
+        if not url.startswith(MEDIA_LOCAL_BASE_URL + "/"):
+            raise ValueError(f"Not a local media URL: {url}")
+        public_id = url[len(MEDIA_LOCAL_BASE_URL) + 1:]
+        media_type = mimetypes.guess_type(public_id)[0] or ""
+        return public_id, "video" if media_type.startswith("video/") else "image"
+
+
+media_router = APIRouter(tags=["Media"])
+
+
+@media_router.get("/media/{public_id:path}")
+async def serve_media(public_id: str):
+    try:
+        path = resolve_path(public_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="File not found")
+    # Partially written uploads live under .tmp
+    if public_id.startswith(".") or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+    if MEDIA_LOCAL_ACCEL_REDIRECT:
+        headers["X-Accel-Redirect"] = f"{MEDIA_LOCAL_ACCEL_REDIRECT.rstrip('/')}/{public_id}"
+        return Response(headers=headers)
+
+    return FileResponse(path, headers=headers)
@@ -0,0 +1,372 @@
+"""
+Request tracing and Server-Timing headers.
+
+TracingMiddleware opens a span per request; inside it, span() (storage
+calls, SMTP sends) and a pymongo CommandListener (every Mongo command) open
+child spans. The span in progress lives in a contextvar, which Motor, the
+media pool (mofi_common.media) and asyncio.to_thread carry into their worker
+threads, so spans nest under the request that caused them.
+
+Every response gets a Server-Timing header that devtools show as a bar
+chart, summing the child spans by category:
+
+    Server-Timing: db;dur=41.2;desc="MongoDB", storage;dur=310.5;desc="Media storage",
+                   app;dur=12.8;desc="Python", total;dur=364.5, trace;desc="<trace id>"
+
+app is what remains of the total. Concurrent commands (asyncio.gather) each
+count, so db can exceed total.
+
+Finished spans are exported from a background thread (the request never
+waits on it), span names and attributes follow OpenTelemetry's:
+
+    TRACE_EXPORT          none | file | otlp (none)
+    TRACE_FILE            JSON lines, one span each (traces.jsonl)
+    TRACE_OTLP_ENDPOINT   OTLP/HTTP JSON collector (http://localhost:4318/v1/traces)
+    TRACE_SAMPLE_RATIO    share of traces exported (1.0); Server-Timing is always set
+    TRACE_QUEUE_SIZE      spans buffered before new ones are dropped (10000)
+
+An incoming W3C traceparent header continues the caller's trace.
+"""
+import atexit
+import json
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from pymongo import monitoring
+
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", 1.0))
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", 10000))
+TRACE_BATCH_SIZE = 512
+TRACE_FLUSH_SECONDS = 2.0
+
+# Server-Timing entries, in header order
+CATEGORIES = {
+    "db": "MongoDB",
+    "storage": "Media storage",
+    "smtp": "Email",
+}
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class RequestTrace:
+    """Per-request totals by category, updated from driver threads too"""
+
+    def __init__(self, service: str):
+        self.service = service
+        self._lock = threading.Lock()
+        self.timings = {}
+
+    def add(self, category: str, seconds: float):
+        with self._lock:
+            self.timings[category] = self.timings.get(category, 0.0) + seconds
+
+
+class Span:
+    def __init__(self, name: str, category: str = None, kind: int = KIND_INTERNAL,
+                 parent=None, trace_id: str = None, parent_id: str = None,
+                 sampled: bool = None, request: RequestTrace = None, **attributes):
+        self.name = name
+        self.category = category
+        self.kind = kind
+        self.span_id = secrets.token_hex(8)
+        if parent is not None:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.sampled = parent.sampled
+            self.request = parent.request
+        else:
+            self.trace_id = trace_id or secrets.token_hex(16)
+            self.parent_id = parent_id
+            self.sampled = random.random() < TRACE_SAMPLE_RATIO if sampled is None else sampled
+            self.request = request
+        self.attributes = attributes
+        self.error = None
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.duration = None
+
+    @property
+    def service(self) -> str:
+        return self.request.service if self.request else "mofi"
+
+    def end(self, error: BaseException = None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.category and self.request:
+            self.request.add(self.category, self.duration)
+        if self.sampled and exporter:
+            exporter.submit(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "service": self.service,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "category": self.category,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> dict:
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.start_ns + int(self.duration * 1e9)),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def current_span():
+    return _current_span.get()
+
+
+def start_span(name: str, category: str = None, kind: int = KIND_CLIENT, **attributes):
+    """A child of the current span, or None outside a traced request"""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(name, category, kind, parent=parent, **attributes)
+
+
+@contextmanager
+def span(name: str, category: str = None, kind: int = KIND_CLIENT, **attributes):
+    """Trace the enclosed block as a child span (no-op outside a request)"""
+    child = start_span(name, category, kind, **attributes)
+    if child is None:
+        yield None
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.end(e)
+        raise
+    else:
+        child.end()
+    finally:
+        _current_span.reset(token)
+
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """One "db" span per Mongo command run inside a traced request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        child = start_span(
+            f"mongo.{event.command_name}", "db",
+            **{
+                "db.system": "mongodb",
+                "db.operation": event.command_name,
+                "db.name": event.database_name,
+                "db.mongodb.collection": target if isinstance(target, str) else None,
+            }
+        )
+        if child is not None:
+            with self._lock:
+                self._spans[(event.connection_id, event.request_id)] = child
+
+    def _finish(self, event, error=None):
+        with self._lock:
+            child = self._spans.pop((event.connection_id, event.request_id), None)
+        if child is not None:
+            child.end(error)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, RuntimeError(str(event.failure.get("errmsg", event.failure))))
+
+
+monitoring.register(MongoCommandTracer())
+
+
+class SpanExporter:
+    """Batches finished spans to a file or an OTLP collector from a daemon thread"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def submit(self, finished: Span):
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, wait: float) -> list:
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=wait))
+            while len(batch) < TRACE_BATCH_SIZE:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._drain(TRACE_FLUSH_SECONDS)
+            if batch:
+                self._export(batch)
+
+    def flush(self):
+        while True:
+            batch = self._drain(0)
+            if not batch:
+                return
+            self._export(batch)
+
+    def _export(self, batch: list):
+        try:
+            if self.mode == "file":
+                self._write_file(batch)
+            else:
+                self._post_otlp(batch)
+        except Exception as e:
+            print(f"Trace export failed ({len(batch)} spans): {e}")
+
+    @staticmethod
+    def _write_file(batch: list):
+        with open(TRACE_FILE, "a") as f:
+            for finished in batch:
+                f.write(json.dumps(finished.to_dict(), default=str) + "\n")
+
+    @staticmethod
+    def _post_otlp(batch: list):
+        by_service = {}
+        for finished in batch:
+            by_service.setdefault(finished.service, []).append(finished.to_otlp())
+        body = {"resourceSpans": [
+            {
+                "resource": {"attributes": [_otlp_attribute("service.name", service)]},
+                "scopeSpans": [{"scope": {"name": "mofi_common.tracing"}, "spans": spans}],
+            }
+            for service, spans in by_service.items()
+        ]}
+        request = urllib.request.Request(
+            TRACE_OTLP_ENDPOINT, data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=10):
+            pass
+
+
+exporter = SpanExporter(TRACE_EXPORT) if TRACE_EXPORT in ("file", "otlp") else None
+
+
+def server_timing(request: RequestTrace, total: float, trace_id: str) -> str:
+    entries = []
+    accounted = 0.0
+    with request._lock:
+        timings = dict(request.timings)
+    for category, description in CATEGORIES.items():
+        if category in timings:
+            accounted += timings[category]
+            entries.append(f'{category};dur={timings[category] * 1000:.1f};desc="{description}"')
+    entries.append(f'app;dur={max(total - accounted, 0) * 1000:.1f};desc="Python"')
+    entries.append(f"total;dur={total * 1000:.1f}")
+    entries.append(f'trace;desc="{trace_id}"')
+    return ", ".join(entries)
+
+
+class TracingMiddleware:
+    """ASGI middleware: request span, Server-Timing header, span export"""
+
+    def __init__(self, app, service_name: str):
+        self.app = app
+        self.service_name = service_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = parent_id = sampled = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                match = TRACEPARENT.match(value.decode("latin-1").strip())
+                if match:
+                    trace_id, parent_id = match.group(1), match.group(2)
+                    sampled = bool(int(match.group(3), 16) & 1)
+                break
+
+        method = scope["method"]
+        root = Span(
+            f"{method} {scope['path']}", kind=KIND_SERVER, trace_id=trace_id, parent_id=parent_id,
+            sampled=sampled, request=RequestTrace(self.service_name),
+            **{"http.method": method, "http.target": scope["path"]}
+        )
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                header = server_timing(root.request, time.perf_counter() - root._start, root.trace_id)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = _current_span.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            route = scope.get("route")
+            if getattr(route, "path", None):
+                root.name = f"{method} {route.path}"
+                root.attributes["http.route"] = route.path
+            root.end(error)
@@ -0,0 +1,265 @@
+"""
+Upload limits enforced while the request body is still arriving.
+
+Starlette spools the whole multipart body to disk before a handler runs, so a
+size check in the handler only happens after the damage is done.
+UploadLimitMiddleware sits in front of the app and, for routes matching an
+UploadRule:
+
+- answers 413 straight away when Content-Length is over the limit
+- counts body bytes as they are received and answers 413 as soon as the total
+  (or a single file, against its field's limit) goes over the limit, without
+  reading the rest
+- runs a streaming multipart parser next to the app's own, sniffs the first
+  bytes of every file part and answers 415 when they are not one of the
+  ACCEPTED_TYPES of the field's kind (the client's Content-Type header is not
+  trusted). HEIC and AVIF photos are recognised but not accepted: Pillow
+  cannot re-encode them here.
+
+sniff_file() applies the same magic-byte check to an already received file.
+"""
+import re
+from typing import Dict, Iterable, Optional
+
+from fastapi.responses import JSONResponse
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+MB = 1024 * 1024
+SNIFF_BYTES = 32
+
+# File types each kind of file field takes: what the services can process
+ACCEPTED_TYPES = {
+    "image": {"image/png", "image/jpeg", "image/gif", "image/webp"},
+    "video": {"video/mp4", "video/quicktime", "video/webm", "video/x-msvideo"},
+}
+
+# ISO base media (ftyp) major brands by MIME type
+FTYP_BRANDS = {
+    "image/avif": {b"avif", b"avis"},
+    "image/heic": {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1"},
+    "video/quicktime": {b"qt  "},
+    "video/mp4": {
+        b"isom", b"iso2", b"iso3", b"iso4", b"iso5", b"iso6", b"mp41", b"mp42",
+        b"avc1", b"dash", b"mmp4", b"M4V ", b"M4VH", b"M4VP", b"MSNV", b"f4v ",
+    },
+    "video/3gpp": {b"3gp4", b"3gp5", b"3gp6", b"3g2a"},
+    "audio/mp4": {b"M4A ", b"M4B "},
+}
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """MIME type from a file's leading bytes, or None if unrecognised"""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "video/x-msvideo"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        return next((mime for mime, brands in FTYP_BRANDS.items() if brand in brands), None)
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm"
+    return None
+
+
+def sniff_file(file) -> Optional[str]:
+    """sniff() for a file object; the position is restored"""
+    position = file.tell()
+    file.seek(0)
+    head = file.read(SNIFF_BYTES)
+    file.seek(position)
+    return sniff(head)
+
+
+class UploadRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class UploadRule:
+    """
+    Limits for requests whose method and path match.
+
+    files maps multipart field names to the kind of file they accept
+    ("image" or "video"); "*" applies to any other file field. file_limits
+    sets a size limit per field, max_file_bytes the one for the rest.
+    """
+
+    def __init__(self, methods: Iterable[str], path: str, max_bytes: int,
+                 files: Optional[Dict[str, str]] = None, max_file_bytes: Optional[int] = None,
+                 file_limits: Optional[Dict[str, int]] = None):
+        self.methods = {method.upper() for method in methods}
+        self.path = re.compile(path)
+        self.max_bytes = max_bytes
+        self.files = files or {}
+        self.max_file_bytes = max_file_bytes
+        self.file_limits = file_limits or {}
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and self.path.fullmatch(path) is not None
+
+    def kind_for(self, field: str) -> Optional[str]:
+        return self.files.get(field, self.files.get("*"))
+
+    def limit_for(self, field: str) -> Optional[int]:
+        return self.file_limits.get(field, self.max_file_bytes)
+
+
+def _describe(size: int) -> str:
+    return f"{size // MB}MB" if size >= MB else f"{size} bytes"
+
+
+class _BodyGuard:
+    """Counts and inspects body chunks for one request"""
+
+    def __init__(self, rule: UploadRule, content_type: str):
+        self.rule = rule
+        self.received = 0
+        self.error = None
+        self.parser = None
+
+        media_type, options = parse_options_header(content_type or "")
+        if media_type == b"multipart/form-data" and options.get(b"boundary") and rule.files:
+            self._reset_part()
+            self.parser = MultipartParser(options[b"boundary"], {
+                "on_part_begin": self._reset_part,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            })
+
+    def feed(self, chunk: bytes):
+        self.received += len(chunk)
+        if self.received > self.rule.max_bytes:
+            self.fail(413, f"Request body too large. Maximum is {_describe(self.rule.max_bytes)}")
+        if self.parser is not None and chunk:
+            self.parser.write(chunk)
+
+    def fail(self, status_code: int, detail: str):
+        self.error = UploadRejected(status_code, detail)
+        raise self.error
+
+    def _reset_part(self):
+        self.header_field = b""
+        self.header_value = b""
+        self.field = None
+        self.filename = None
+        self.head = b""
+        self.file_bytes = 0
+        self.checked = False
+
+    def _on_header_field(self, data, start, end):
+        self.header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self.header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self.header_field.lower() == b"content-disposition":
+            _, options = parse_options_header(self.header_value)
+            self.field = options.get(b"name", b"").decode("latin-1")
+            filename = options.get(b"filename")
+            self.filename = filename.decode("latin-1") if filename else None
+        self.header_field = b""
+        self.header_value = b""
+
+    def _on_part_data(self, data, start, end):
+        if not self.filename:
+            return
+        self.file_bytes += end - start
+        max_file_bytes = self.rule.limit_for(self.field)
+        if max_file_bytes and self.file_bytes > max_file_bytes:
+            self.fail(413, f"File '{self.filename}' too large. Maximum is {_describe(max_file_bytes)}")
+        if not self.checked:
+            self.head += data[start:min(end, start + SNIFF_BYTES)]
+            if len(self.head) >= SNIFF_BYTES:
+                self._check_type()
+
+    def _on_part_end(self):
+        if self.filename and self.head and not self.checked:
+            self._check_type()
+
+    def _check_type(self):
+        self.checked = True
+        kind = self.rule.kind_for(self.field)
+        if kind is None:
+            return
+        if sniff(self.head) not in ACCEPTED_TYPES.get(kind, ()):
+            self.fail(415, f"File '{self.filename}' is not a supported {kind}")
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware applying UploadRules; add it inside CORSMiddleware"""
+
+    def __init__(self, app, rules: Iterable[UploadRule]):
+        self.app = app
+        self.rules = list(rules)
+
+    def _rule_for(self, scope) -> Optional[UploadRule]:
+        # Under a Mount (gateway.py) path still carries the mount prefix
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        for rule in self.rules:
+            if rule.matches(scope["method"], path):
+                return rule
+        return None
+
+    async def __call__(self, scope, receive, send):
+        rule = self._rule_for(scope) if scope["type"] == "http" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > rule.max_bytes:
+            response = JSONResponse(
+                {"detail": f"Request body too large. Maximum is {_describe(rule.max_bytes)}"},
+                status_code=413,
+                headers={"Connection": "close"}
+            )
+            await response(scope, receive, send)
+            return
+
+        guard = _BodyGuard(rule, headers.get("content-type"))
+        response_started = False
+
+        async def guarded_receive():
+            message = await receive()
+            if message["type"] == "http.request" and guard.error is None:
+                guard.feed(message.get("body", b""))
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # Whatever the app answers to an aborted body is replaced below
+            if guard.error is not None:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, guarded_receive, guarded_send)
+        except Exception:
+            if guard.error is None or response_started:
+                raise
+
+        if guard.error is not None and not response_started:
+            response = JSONResponse(
+                {"detail": guard.error.detail},
+                status_code=guard.error.status_code,
+                headers={"Connection": "close"}
+            )
+            await response(scope, receive, send)
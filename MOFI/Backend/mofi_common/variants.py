@@ -0,0 +1,90 @@
+"""
+Responsive image URLs derived from stored Cloudinary URLs.
+
+Cloudinary resizes on the fly when a transformation is added after
+/image/upload/, so a single stored URL can be served at any width:
+
+    .../image/upload/v1712/movie_db/movies/abc.webp
+    .../image/upload/w_400,c_limit,f_auto,q_auto/v1712/movie_db/movies/abc.webp
+
+c_limit never upscales, f_auto/q_auto pick the best format and quality for the
+requesting browser. URLs that are not Cloudinary image URLs (local storage,
+Google profile pictures) are returned unchanged and get no srcset.
+
+List endpoints accept ?variant=<name> to swap the URL for a named width and
+?srcset=true to add a "<field>_srcset" string next to each image URL.
+"""
+import os
+from typing import Iterable, Optional
+
+IMAGE_VARIANT_WIDTHS = tuple(
+    int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "200,400,800,1200,1600").split(",")
+)
+
+VARIANTS = {
+    "thumb": 200,
+    "card": 400,
+    "medium": 800,
+    "large": 1600,
+}
+
+AVATAR_MAX_WIDTH = 400
+
+_UPLOAD_SEGMENT = "/image/upload/"
+
+
+def is_transformable(url: Optional[str]) -> bool:
+    return bool(url) and "res.cloudinary.com" in url and _UPLOAD_SEGMENT in url
+
+
+def variant_url(url: str, width: int) -> str:
+    """URL of the image scaled down to at most width pixels"""
+    if not is_transformable(url):
+        return url
+    prefix, rest = url.split(_UPLOAD_SEGMENT, 1)
+    return f"{prefix}{_UPLOAD_SEGMENT}w_{width},c_limit,f_auto,q_auto/{rest}"
+
+
+def build_srcset(url: str, max_width: Optional[int] = None) -> Optional[str]:
+    """srcset string over IMAGE_VARIANT_WIDTHS, skipping widths above the original's"""
+    if not is_transformable(url):
+        return None
+    widths = [w for w in IMAGE_VARIANT_WIDTHS if not max_width or w <= max_width]
+    if max_width and (not widths or widths[-1] < max_width):
+        widths.append(max_width)
+    return ", ".join(f"{variant_url(url, w)} {w}w" for w in widths)
+
+
+def avatar_srcset(url: Optional[str]) -> Optional[str]:
+    """srcset for profile pictures, which are never shown wider than AVATAR_MAX_WIDTH"""
+    return build_srcset(url, AVATAR_MAX_WIDTH)
+
+
+def resolve_variant(variant: Optional[str]) -> Optional[int]:
+    """Width for a variant name; ValueError for unknown names"""
+    if variant is None or variant == "original":
+        return None
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown variant '{variant}'. Use one of: original, {', '.join(VARIANTS)}")
+    return VARIANTS[variant]
+
+
+def with_variants(item: dict, fields: Iterable[str], width: Optional[int] = None,
+                  srcset: bool = False, max_widths: Optional[dict] = None) -> dict:
+    """
+    Rewrite the image URL fields of a serialized document in place.
+
+    width replaces each URL with its resized variant; srcset adds a
+    "<field>_srcset" entry. max_widths maps fields to the original's width,
+    when known, so the srcset stops there.
+    """
+    max_widths = max_widths or {}
+    for field in fields:
+        url = item.get(field)
+        if not url:
+            continue
+        if srcset:
+            item[f"{field}_srcset"] = build_srcset(url, max_widths.get(field))
+        if width:
+            item[field] = variant_url(url, width)
+    return item
@@ -0,0 +1,25 @@
+"""
+Shared test setup.
+
+Tests run from MOFI/Backend (`python -m pytest tests`) without a MongoDB
+server: Mongo collections are replaced with mongomock-motor ones, and the
+services' settings get harmless defaults before anything imports them.
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, "Producer", "Mofi-main")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "mofi_test")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
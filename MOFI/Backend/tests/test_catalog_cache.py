@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from movie_api.utils.cache import CatalogCache, MemoryBackend
+
+
+@pytest.fixture
+def cache():
+    return CatalogCache(MemoryBackend(16), ttl=60)
+
+
+@pytest.mark.anyio
+async def test_hits_are_served_from_the_cache(cache):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return {"title": "Heat"}
+
+    assert await cache.get_or_load("movie:1", load) == {"title": "Heat"}
+    assert await cache.get_or_load("movie:1", load) == {"title": "Heat"}
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_invalidate_drops_the_entry(cache):
+    titles = iter(["Heat", "Heat (1995)"])
+
+    async def load():
+        return {"title": next(titles)}
+
+    await cache.get_or_load("movie:1", load)
+    await cache.invalidate("movie:1")
+
+    assert await cache.get_or_load("movie:1", load) == {"title": "Heat (1995)"}
+
+
+@pytest.mark.anyio
+async def test_load_racing_an_invalidate_is_not_cached(cache):
+    read = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_stale_load():
+        read.set()
+        await release.wait()
+        return {"title": "old"}
+
+    async def fresh_load():
+        return {"title": "new"}
+
+    stale = asyncio.create_task(cache.get_or_load("movie:1", slow_stale_load))
+    await read.wait()
+    # The write lands while the old document is on its way back
+    await cache.invalidate("movie:1")
+    release.set()
+
+    assert await stale == {"title": "old"}
+    assert await cache.get_or_load("movie:1", fresh_load) == {"title": "new"}
+
+
+@pytest.mark.anyio
+async def test_loads_after_an_invalidate_do_not_join_the_stale_one(cache):
+    read = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_stale_load():
+        read.set()
+        await release.wait()
+        return {"title": "old"}
+
+    async def fresh_load():
+        return {"title": "new"}
+
+    stale = asyncio.create_task(cache.get_or_load("movie:1", slow_stale_load))
+    await read.wait()
+    await cache.invalidate("movie:1")
+
+    assert await cache.get_or_load("movie:1", fresh_load) == {"title": "new"}
+    release.set()
+    await stale
+    assert await cache.get_or_load("movie:1", slow_stale_load) == {"title": "new"}
+
+
+@pytest.mark.anyio
+async def test_concurrent_misses_share_one_load(cache):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return {"title": "Heat"}
+
+    results = await asyncio.gather(*(cache.get_or_load("movie:1", load) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert all(result == {"title": "Heat"} for result in results)
+
+
+@pytest.mark.anyio
+async def test_cancelled_loader_does_not_strand_waiters(cache):
+    read = asyncio.Event()
+
+    async def hanging_load():
+        read.set()
+        await asyncio.Event().wait()
+
+    async def load():
+        return {"title": "Heat"}
+
+    first = asyncio.create_task(cache.get_or_load("movie:1", hanging_load))
+    await read.wait()
+    second = asyncio.create_task(cache.get_or_load("movie:1", load))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await asyncio.wait_for(second, 1) == {"title": "Heat"}
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await cache.get_or_load("movie:1", hanging_load) == {"title": "Heat"}
@@ -0,0 +1,85 @@
+import importlib.util
+import os
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import UpdateOne
+
+from conftest import BACKEND_DIR
+from movie_api.services import movie_service
+from movie_api.services.movie_service import MovieService
+from mofi_common.crew import membership_query, memberships_to_dict
+
+
+def load_producer_crew_utils():
+    """Producer/backend's utils package clashes with movie_api's imports"""
+    path = os.path.join(BACKEND_DIR, "Producer", "backend", "utils", "crew_utils.py")
+    spec = importlib.util.spec_from_file_location("producer_crew_utils", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+MEMBERSHIP = {"contribution": "Editor", "permissions": {"video": True}}
+
+
+@pytest.fixture
+def database(monkeypatch):
+    db = AsyncMongoMockClient()["mofi_test"]
+    monkeypatch.setattr(movie_service, "db", db)
+    monkeypatch.setattr(movie_service, "crew_collection", db["crew_members"])
+    return db
+
+
+@pytest.fixture
+async def crew(database):
+    crew = database["crew_members"]
+    await crew.insert_many([
+        {"linkedin_id": "migrated", "memberships": [dict(MEMBERSHIP, movie_id="m1"), dict(MEMBERSHIP, movie_id="m2")]},
+        {"linkedin_id": "legacy", "movies": {"m1": MEMBERSHIP}},
+        {"linkedin_id": "other", "memberships": [dict(MEMBERSHIP, movie_id="m2")]},
+    ])
+    return crew
+
+
+@pytest.mark.anyio
+async def test_membership_query_only_matches_the_indexed_array(crew):
+    assert membership_query("m1") == {"memberships.movie_id": "m1"}
+
+    members = await crew.find(
+        membership_query("m1"),
+        {"linkedin_id": 1, "memberships": {"$elemMatch": {"movie_id": "m1"}}}
+    ).to_list(None)
+
+    assert [member["linkedin_id"] for member in members] == ["migrated"]
+    assert memberships_to_dict(members[0]) == {"m1": MEMBERSHIP}
+
+
+def test_memberships_to_dict_reads_the_legacy_map():
+    member = {"movies": {"m1": MEMBERSHIP}, "memberships": [dict(MEMBERSHIP, movie_id="m2")]}
+
+    assert memberships_to_dict(member) == {"m1": MEMBERSHIP, "m2": MEMBERSHIP}
+
+
+@pytest.mark.anyio
+async def test_delete_movie_removes_memberships(database, crew):
+    await database["movies"].insert_one({"movie_id": "m2", "image1": None, "image2": None})
+
+    assert await MovieService.delete_movie("m2") == []
+
+    migrated = await crew.find_one({"linkedin_id": "migrated"})
+    assert [m["movie_id"] for m in migrated["memberships"]] == ["m1"]
+    # "other" had no other movie, so the whole entry goes
+    assert await crew.find_one({"linkedin_id": "other"}) is None
+    assert await crew.count_documents({}) == 2
+
+
+def test_migration_update_converts_the_legacy_map():
+    crew_utils = load_producer_crew_utils()
+    member = {"_id": 1, "movies": {"m1": MEMBERSHIP}, "memberships": [dict(MEMBERSHIP, movie_id="m2")]}
+
+    assert crew_utils.migration_update(member) == UpdateOne(
+        {"_id": 1, "movies": {"m1": MEMBERSHIP}},
+        {"$push": {"memberships": {"$each": [dict(MEMBERSHIP, movie_id="m1")]}}, "$unset": {"movies": ""}}
+    )
+    assert crew_utils.migration_update({"_id": 1, "memberships": []}) is None
@@ -0,0 +1,38 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from mofi_common import loopwatch, profiling, query_audit
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(loopwatch.loop_router)
+    app.include_router(query_audit.audit_router)
+    return TestClient(app)
+
+
+def admin_headers(secret: str = "secret") -> dict:
+    return {"x-profile": profiling.sign("admin", int(time.time()) + 60, "admin", secret)}
+
+
+DEBUG_ENDPOINTS = [("GET", "/debug/loop"), ("DELETE", "/debug/loop"), ("GET", "/debug/queries")]
+
+
+@pytest.mark.parametrize("method, path", DEBUG_ENDPOINTS)
+def test_hidden_without_profile_secret(client, monkeypatch, method, path):
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", None)
+
+    assert client.request(method, path, headers=admin_headers()).status_code == 404
+
+
+@pytest.mark.parametrize("method, path", DEBUG_ENDPOINTS)
+def test_admin_token_required(client, monkeypatch, method, path):
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", "secret")
+
+    assert client.request(method, path).status_code == 403
+    assert client.request(method, path, headers=admin_headers("wrong")).status_code == 403
+    assert client.request(method, path, headers=admin_headers()).status_code == 200
@@ -0,0 +1,49 @@
+import cloudinary.utils
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from mofi_common import settings
+from movie_api.services import direct_upload_service
+from movie_api.services.direct_upload_service import DirectUploadError, DirectUploadService
+
+APP = settings.AppSettings("movie", {}, {"cloud_name": "demo", "api_key": "key", "api_secret": "secret"})
+
+
+def test_size_and_formats_are_signed():
+    with settings.activate(APP):
+        params = direct_upload_service._upload_params("movie_db/trailers/x_video", "video", 1700000000)
+
+    signed = {key: value for key, value in params.items() if key not in ("signature", "api_key")}
+    assert signed["max_file_size"] == direct_upload_service.MAX_ASSET_BYTES["video"]
+    assert signed["allowed_formats"] == direct_upload_service.ALLOWED_FORMATS["video"]
+    assert params["signature"] == cloudinary.utils.api_sign_request(signed, "secret")
+
+
+@pytest.mark.anyio
+async def test_oversized_asset_is_deleted_from_storage(monkeypatch):
+    uploads = AsyncMongoMockClient()["mofi_test"]["direct_uploads"]
+    deleted = []
+
+    class Storage:
+        async def delete(self, public_id, resource_type="image"):
+            deleted.append((public_id, resource_type))
+            return True
+
+    async def resource(public_id, resource_type):
+        return {"secure_url": "https://res.test/x.jpg", "bytes": direct_upload_service.MAX_ASSET_BYTES["image"] + 1}
+
+    monkeypatch.setattr(direct_upload_service, "direct_uploads_collection", uploads)
+    monkeypatch.setattr(direct_upload_service, "get_storage", lambda: Storage())
+    monkeypatch.setattr(direct_upload_service.media_client, "resource", resource)
+    upload = {
+        "upload_id": "u1", "status": "pending",
+        "assets": {"image": {"public_id": "movie_db/movie_images/u1_image", "resource_type": "image", "url": None}},
+    }
+    await uploads.insert_one(dict(upload))
+
+    with pytest.raises(DirectUploadError) as rejected:
+        await DirectUploadService._accept_asset(upload, "image")
+
+    assert rejected.value.status_code == 413
+    assert deleted == [("movie_db/movie_images/u1_image", "image")]
+    assert (await uploads.find_one({"upload_id": "u1"}))["status"] == "failed"
@@ -0,0 +1,47 @@
+import io
+
+from PIL import Image
+
+from mofi_common.images import reencode_image
+
+
+def jpeg(quality: int, exif: bool = False) -> bytes:
+    image = Image.effect_noise((300, 300), 80).convert("RGB")
+    options = {"quality": quality}
+    if exif:
+        metadata = Image.Exif()
+        metadata[0x010F] = "Camera maker"
+        options["exif"] = metadata
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", **options)
+    return buffer.getvalue()
+
+
+def test_original_is_kept_when_reencoding_grows_it():
+    data = jpeg(quality=15)
+
+    result = reencode_image(data, "webp", 80, 2560)
+
+    assert result["kept_original"]
+    assert result["data"] == data
+    assert result["format"] == "JPEG"
+
+
+def test_metadata_is_stripped_even_when_that_grows_the_file():
+    data = jpeg(quality=15, exif=True)
+
+    result = reencode_image(data, "webp", 80, 2560)
+
+    assert not result.get("kept_original")
+    assert result["format"] == "WEBP"
+    with Image.open(io.BytesIO(result["data"])) as stored:
+        assert not stored.getexif()
+
+
+def test_large_images_are_scaled_down():
+    buffer = io.BytesIO()
+    Image.new("RGB", (4000, 1000), "red").save(buffer, format="PNG")
+
+    result = reencode_image(buffer.getvalue(), "webp", 80, 2560)
+
+    assert (result["width"], result["height"]) == (2560, 640)
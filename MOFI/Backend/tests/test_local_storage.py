@@ -0,0 +1,53 @@
+import io
+import os
+
+import pytest
+
+from mofi_common.storage import local
+from mofi_common.storage.base import MediaStorage
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(local, "MEDIA_LOCAL_ROOT", str(tmp_path))
+    return local.LocalStorage()
+
+
+@pytest.mark.anyio
+async def test_identical_uploads_get_separate_files(storage):
+    first = await storage.save(io.BytesIO(b"same bytes"), "posters", filename="a.jpg")
+    second = await storage.save(io.BytesIO(b"same bytes"), "posters", filename="b.jpg")
+
+    assert first["public_id"] != second["public_id"]
+    assert first["public_id"].endswith(".jpg")
+
+
+@pytest.mark.anyio
+async def test_deleting_one_upload_keeps_the_other(storage):
+    first = await storage.save(io.BytesIO(b"same bytes"), "posters", filename="a.jpg")
+    second = await storage.save(io.BytesIO(b"same bytes"), "posters", filename="b.jpg")
+
+    await storage.delete(first["public_id"])
+
+    assert not os.path.exists(local.resolve_path(first["public_id"]))
+    assert os.path.exists(local.resolve_path(second["public_id"]))
+
+
+def test_keys_outside_the_root_are_refused(storage):
+    with pytest.raises(ValueError):
+        local.resolve_path("../etc/passwd")
+
+
+def test_incomplete_driver_fails_when_created():
+    class NoLocate(MediaStorage):
+        async def save(self, file, folder, resource_type="image", filename=None, **options):
+            return {}
+
+        async def delete(self, public_id, resource_type="image"):
+            return True
+
+        async def list_assets(self, folder):
+            yield []
+
+    with pytest.raises(TypeError, match="locate"):
+        NoLocate()
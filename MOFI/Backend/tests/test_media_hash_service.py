@@ -0,0 +1,142 @@
+import io
+import itertools
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from movie_api.services import media_hash_service
+from movie_api.services.media_hash_service import MediaHashService
+
+
+class FakeUpload:
+    def __init__(self, data: bytes, filename: str = "poster.jpg"):
+        self.file = io.BytesIO(data)
+        self.filename = filename
+
+
+class FakeStorage:
+    def __init__(self, urls=None):
+        self.urls = urls or (f"https://media.test/{n}.webp" for n in itertools.count())
+        self.saved = []
+
+    async def save(self, file, folder, resource_type="image", filename=None, **options):
+        url = next(self.urls)
+        self.saved.append(url)
+        return {"url": url, "public_id": url}
+
+
+@pytest.fixture
+async def hashes(monkeypatch):
+    collection = AsyncMongoMockClient()["mofi_test"]["media_hashes"]
+    await collection.create_index("sha256", unique=True)
+    await collection.create_index("url", unique=True)
+    monkeypatch.setattr(media_hash_service, "media_hashes_collection", collection)
+    return collection
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = FakeStorage()
+    deleted = []
+
+    async def process_image(upload_file):
+        data = upload_file.file.read()
+        return {
+            "file": io.BytesIO(data), "filename": upload_file.filename, "width": 10, "height": 10,
+            "placeholder": None, "bytes": len(data), "original_bytes": len(data),
+        }
+
+    async def delete_file(url):
+        deleted.append(url)
+        return True
+
+    async def delete_files(urls):
+        deleted.extend(urls)
+        return {"deleted": len(urls)}
+
+    monkeypatch.setattr(media_hash_service, "process_image", process_image)
+    monkeypatch.setattr(media_hash_service, "get_storage", lambda: storage)
+    monkeypatch.setattr(media_hash_service, "delete_cloudinary_file", delete_file)
+    monkeypatch.setattr(media_hash_service, "delete_cloudinary_files", delete_files)
+    storage.deleted = deleted
+    return storage
+
+
+@pytest.mark.anyio
+async def test_identical_content_shares_one_upload(hashes, storage):
+    first = await MediaHashService.upload_image(FakeUpload(b"poster"), "movies")
+    second = await MediaHashService.upload_image(FakeUpload(b"poster"), "movies")
+
+    assert first["url"] == second["url"]
+    assert len(storage.saved) == 1
+    assert (await hashes.find_one({"url": first["url"]}))["refs"] == 2
+
+
+@pytest.mark.anyio
+async def test_asset_is_deleted_with_its_last_reference(hashes, storage):
+    url = (await MediaHashService.upload_image(FakeUpload(b"poster"), "movies"))["url"]
+    await MediaHashService.upload_image(FakeUpload(b"poster"), "movies")
+
+    assert not await MediaHashService.release(url)
+    assert storage.deleted == []
+
+    assert await MediaHashService.release(url)
+    assert storage.deleted == [url]
+    assert await hashes.find_one({"url": url}) is None
+
+
+@pytest.mark.anyio
+async def test_release_many_counts_repeated_urls(hashes, storage):
+    url = (await MediaHashService.upload_image(FakeUpload(b"poster"), "movies"))["url"]
+    await MediaHashService.upload_image(FakeUpload(b"poster"), "movies")
+    await MediaHashService.upload_image(FakeUpload(b"poster"), "movies")
+
+    summary = await MediaHashService.release_many([url, url])
+    assert summary["kept"] == 2
+    assert (await hashes.find_one({"url": url}))["refs"] == 1
+
+    await MediaHashService.release_many([url])
+    assert storage.deleted == [url]
+
+
+@pytest.mark.anyio
+async def test_untracked_urls_are_deleted_on_release(hashes, storage):
+    assert await MediaHashService.release("https://media.test/legacy.jpg")
+    assert storage.deleted == ["https://media.test/legacy.jpg"]
+
+
+@pytest.mark.anyio
+async def test_url_already_tracked_for_other_content_is_shared(hashes, storage):
+    url = (await MediaHashService.upload_image(FakeUpload(b"first"), "movies"))["url"]
+    # The storage hands out the same URL for different content
+    storage.urls = iter([url])
+
+    entry = await MediaHashService.upload_image(FakeUpload(b"second"), "movies")
+
+    assert entry["url"] == url
+    assert (await hashes.find_one({"url": url}))["refs"] == 2
+    assert storage.deleted == []
+
+
+@pytest.mark.anyio
+async def test_referenced_urls_are_not_deleted(hashes, storage):
+    url = (await MediaHashService.upload_image(FakeUpload(b"poster"), "movies"))["url"]
+
+    # e.g. a release that saw no entry while an upload re-created it
+    assert not await MediaHashService._delete_unreferenced(url)
+    assert storage.deleted == []
+
+
+@pytest.mark.anyio
+async def test_upload_images_releases_the_others_on_failure(hashes, storage):
+    url = (await MediaHashService.upload_image(FakeUpload(b"poster"), "movies"))["url"]
+
+    class Broken(FakeUpload):
+        def __init__(self):
+            super().__init__(b"")
+            self.file.read = None
+
+    with pytest.raises(TypeError):
+        await MediaHashService.upload_images([FakeUpload(b"poster"), Broken()], "movies")
+
+    assert (await hashes.find_one({"url": url}))["refs"] == 1
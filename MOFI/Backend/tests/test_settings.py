@@ -0,0 +1,85 @@
+import time
+
+import cloudinary
+import cloudinary.utils
+import pytest
+
+from mofi_common import settings
+from mofi_common.media import MediaClient
+from mofi_common.storage import storage_backend
+
+MOVIE = settings.AppSettings(
+    "movie", {"MEDIA_STORAGE": "local"},
+    {"cloud_name": "movie-cloud", "api_key": "movie-key", "api_secret": "movie-secret"}
+)
+PRODUCER = settings.AppSettings(
+    "producer", {}, {"cloud_name": "producer-cloud", "api_key": "producer-key", "api_secret": "producer-secret"}
+)
+
+
+def test_app_env_takes_precedence(monkeypatch):
+    monkeypatch.setenv("MEDIA_STORAGE", "cloudinary")
+
+    with settings.activate(MOVIE):
+        assert storage_backend() == "local"
+    with settings.activate(PRODUCER):
+        assert storage_backend() == "cloudinary"
+    assert storage_backend() == "cloudinary"
+
+
+def test_cloudinary_credentials_are_per_app():
+    with settings.activate(MOVIE):
+        assert settings.cloudinary_config().cloud_name == "movie-cloud"
+    with settings.activate(PRODUCER):
+        assert settings.cloudinary_config().api_secret == "producer-secret"
+    assert settings.cloudinary_options() == {}
+
+
+@pytest.mark.anyio
+async def test_app_context_activates_settings():
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(settings.current().name)
+
+    await settings.AppContext(app, MOVIE)({"type": "http"}, None, None)
+
+    assert seen == ["movie"]
+    assert settings.current() is None
+
+
+@pytest.mark.anyio
+async def test_media_calls_carry_the_app_credentials():
+    client = MediaClient(1)
+
+    def upload(file, **options):
+        return options
+
+    try:
+        with settings.activate(MOVIE):
+            options = await client._call("upload", upload, b"", folder="posters")
+    finally:
+        client.shutdown()
+
+    assert options["cloud_name"] == "movie-cloud"
+    assert options["api_secret"] == "movie-secret"
+    assert options["folder"] == "posters"
+
+
+def test_direct_upload_signatures_use_the_app_secret(monkeypatch):
+    from movie_api.services import direct_upload_service
+
+    monkeypatch.setattr(cloudinary.config(), "api_secret", "producer-secret")
+    signature = cloudinary.utils.api_sign_request(
+        {"public_id": "a", "version": 1}, "movie-secret", "sha1", signature_version=1
+    )
+    timestamp = int(time.time())
+    body = '{"public_id": "a"}'
+    notification = cloudinary.utils.compute_hex_hash(f"{body}{timestamp}movie-secret", "sha1")
+
+    with settings.activate(MOVIE):
+        assert direct_upload_service.verify_response_signature("a", 1, signature)
+        assert direct_upload_service.verify_notification_signature(body, timestamp, notification)
+        assert not direct_upload_service.verify_notification_signature(body, timestamp - 7201, notification)
+    with settings.activate(PRODUCER):
+        assert not direct_upload_service.verify_response_signature("a", 1, signature)
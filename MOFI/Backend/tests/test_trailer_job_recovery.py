@@ -0,0 +1,75 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from movie_api.services import trailer_job_service
+from movie_api.services.trailer_job_service import TrailerJobService
+
+
+@pytest.fixture
+def jobs(monkeypatch, tmp_path):
+    collection = AsyncMongoMockClient()["mofi_test"]["trailer_jobs"]
+    monkeypatch.setattr(trailer_job_service, "trailer_jobs_collection", collection)
+    monkeypatch.setattr(trailer_job_service, "TRAILER_JOB_DIR", str(tmp_path))
+    return collection
+
+
+def spool(tmp_path, job_id: str, age: timedelta = timedelta(hours=2)) -> dict:
+    job_dir = tmp_path / job_id
+    job_dir.mkdir()
+    paths = {"thumbnail_path": str(job_dir / "thumbnail.jpg"), "video_path": str(job_dir / "video.mp4")}
+    for path in paths.values():
+        with open(path, "wb") as f:
+            f.write(b"data")
+    old = (datetime.now() - age).timestamp()
+    os.utime(job_dir, (old, old))
+    return paths
+
+
+def job(job_id: str, status: str, paths: dict, updated: timedelta = timedelta(hours=2)) -> dict:
+    return {
+        "job_id": job_id, "movie_id": "m1", "trailer_name": "Teaser", "status": status,
+        "stage": status, "progress": 0, "bytes_total": 4, **paths,
+        "updated_at": datetime.utcnow() - updated,
+    }
+
+
+@pytest.mark.anyio
+async def test_stale_jobs_are_requeued_or_failed(jobs, tmp_path, monkeypatch):
+    started = []
+
+    async def run(job_id):
+        started.append(job_id)
+
+    monkeypatch.setattr(TrailerJobService, "run", run)
+    missing = {"thumbnail_path": str(tmp_path / "gone" / "t.jpg"), "video_path": str(tmp_path / "gone" / "v.mp4")}
+    await jobs.insert_many([
+        job("spooled", "running", spool(tmp_path, "spooled")),
+        job("lost", "queued", missing),
+        job("live", "running", spool(tmp_path, "live"), updated=timedelta(minutes=1)),
+    ])
+
+    summary = await TrailerJobService.recover()
+    await asyncio.sleep(0)
+
+    assert summary == {"requeued": 1, "failed": 1, "spools_removed": 0}
+    assert started == ["spooled"]
+    assert (await jobs.find_one({"job_id": "spooled"}))["status"] == "queued"
+    lost = await jobs.find_one({"job_id": "lost"})
+    assert lost["status"] == "failed" and lost["expires_at"] > datetime.utcnow()
+    assert (await jobs.find_one({"job_id": "live"}))["status"] == "running"
+
+
+@pytest.mark.anyio
+async def test_orphaned_spools_are_removed(jobs, tmp_path):
+    spool(tmp_path, "finished")
+    spool(tmp_path, "just-submitted", age=timedelta(0))
+    await jobs.insert_one(job("finished", "completed", {}))
+
+    summary = await TrailerJobService.recover()
+
+    assert summary["spools_removed"] == 1
+    assert sorted(os.listdir(tmp_path)) == ["just-submitted"]
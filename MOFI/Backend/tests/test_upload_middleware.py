@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from mofi_common.uploads import UploadLimitMiddleware, UploadRule, sniff
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+MP4 = b"\x00\x00\x00\x20ftypisom" + b"\x00" * 64
+HEIC = b"\x00\x00\x00\x18ftypheic" + b"\x00" * 64
+
+
+def ftyp(brand: bytes) -> bytes:
+    return b"\x00\x00\x00\x18ftyp" + brand + b"\x00" * 20
+
+
+@pytest.mark.parametrize("brand, expected", [
+    (b"isom", "video/mp4"),
+    (b"mp42", "video/mp4"),
+    (b"qt  ", "video/quicktime"),
+    (b"heic", "image/heic"),
+    (b"avif", "image/avif"),
+    (b"M4A ", "audio/mp4"),
+    (b"crx ", None),
+])
+def test_sniff_reads_the_ftyp_brand(brand, expected):
+    assert sniff(ftyp(brand)) == expected
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.post("/trailers/create")
+    async def create(thumbnail: UploadFile = File(...), video: UploadFile = File(...)):
+        return {"thumbnail": thumbnail.filename, "video": video.filename}
+
+    app.add_middleware(UploadLimitMiddleware, rules=[
+        UploadRule(["POST"], r"/trailers/create", 10_000,
+                   files={"thumbnail": "image", "video": "video"},
+                   file_limits={"thumbnail": 200, "video": 5_000}),
+    ])
+    return TestClient(app)
+
+
+def post(client, thumbnail: bytes, video: bytes):
+    return client.post("/trailers/create", files={
+        "thumbnail": ("thumb.png", thumbnail, "image/png"),
+        "video": ("trailer.mp4", video, "video/mp4"),
+    })
+
+
+def test_accepted_upload_reaches_the_app(client):
+    response = post(client, PNG, MP4)
+
+    assert response.status_code == 200
+    assert response.json() == {"thumbnail": "thumb.png", "video": "trailer.mp4"}
+
+
+def test_each_field_has_its_own_limit(client):
+    # Well under the video limit, but over the thumbnail's
+    response = post(client, PNG + b"\x00" * 1_000, MP4)
+
+    assert response.status_code == 413
+    assert "thumb.png" in response.json()["detail"]
+    assert post(client, PNG, MP4 + b"\x00" * 1_000).status_code == 200
+
+
+def test_heic_is_rejected(client):
+    response = post(client, HEIC, MP4)
+
+    assert response.status_code == 415
+
+
+def test_unknown_ftyp_brand_is_not_taken_for_video(client):
+    assert post(client, PNG, ftyp(b"M4A ")).status_code == 415
+
+
+def test_content_length_over_the_total_is_refused(client):
+    assert post(client, PNG, MP4 + b"\x00" * 20_000).status_code == 413